@@ -1,695 +1,4737 @@
-import random
-import sys
-import os
-import json
-
-# Try to import tkinter for GUI mode
-try:
-    import tkinter as tk
-    from tkinter import messagebox, simpledialog
-    TK_AVAILABLE = True
-except ImportError:
-    TK_AVAILABLE = False
-
-FEATURES_LIST = [
-    "Game mode selection (Single Player with Easy/Medium/Hard AI, Two Player)",
-    "Player name entry and customization (choose X/O, color, avatar in GUI)",
-    "Undo/redo (stack-based, animated in GUI)",
-    "Scoreboard (persistent, tracks wins/losses/ties)",
-    "Input validation loop (never crashes, always prompts again)",
-    "Position guide (1-9 mapping beside board in console)",
-    "Animated transitions (console: text, GUI: grid/buttons)",
-    "Responsive, modern GUI (themes, color selection, animated grid, highlight winning line)",
-    "Features/help modal"
-]
-
-SCOREBOARD_FILE = 'scoreboard.json'
-
-def load_scoreboard():
-    if os.path.exists(SCOREBOARD_FILE):
-        with open(SCOREBOARD_FILE, 'r') as f:
-            return json.load(f)
-    return {}
-
-def save_scoreboard(scoreboard):
-    with open(SCOREBOARD_FILE, 'w') as f:
-        json.dump(scoreboard, f)
-
-scoreboard = load_scoreboard()
-
-def update_scoreboard(winner, player1, player2):
-    global scoreboard
-    for player in [player1, player2]:
-        if player.name not in scoreboard:
-            scoreboard[player.name] = {'wins': 0, 'losses': 0, 'ties': 0}
-    if winner == 'tie':
-        scoreboard[player1.name]['ties'] += 1
-        scoreboard[player2.name]['ties'] += 1
-    elif winner == player1.name:
-        scoreboard[player1.name]['wins'] += 1
-        scoreboard[player2.name]['losses'] += 1
-    elif winner == player2.name:
-        scoreboard[player2.name]['wins'] += 1
-        scoreboard[player1.name]['losses'] += 1
-    save_scoreboard(scoreboard)
-
-def print_scoreboard():
-    print("\n==== SCOREBOARD ====")
-    if not scoreboard:
-        print("No games played yet.")
-        return
-    for player, stats in scoreboard.items():
-        print(f"{player}: {stats['wins']} Wins, {stats['losses']} Losses, {stats['ties']} Ties")
-    print("====================\n")
-
-class Player:
-    def __init__(self, name, symbol, is_ai=False):
-        self.name = name
-        self.symbol = symbol
-        self.is_ai = is_ai
-
-class TicTacToeGame:
-    def __init__(self, player1, player2, ai_mode=None):
-        self.board = [["-" for _ in range(3)] for _ in range(3)]
-        self.players = [player1, player2]
-        self.current = 0
-        self.turns = 0
-        self.ai_mode = ai_mode  # None, 'easy', etc.
-        self.move_history = []  # Stack for undo
-        self.redo_stack = []    # Stack for redo
-
-    def print_board(self):
-        for row in self.board:
-            print(" ".join(row))
-        print()
-
-    def is_taken(self, row, col):
-        return self.board[row][col] != "-"
-
-    def add_to_board(self, row, col, symbol):
-        self.board[row][col] = symbol
-
-    def remove_from_board(self, row, col):
-        self.board[row][col] = "-"
-
-    def is_win(self, symbol):
-        b = self.board
-        # Rows, columns, diagonals
-        for i in range(3):
-            if all(b[i][j] == symbol for j in range(3)):
-                return True
-            if all(b[j][i] == symbol for j in range(3)):
-                return True
-        if b[0][0] == b[1][1] == b[2][2] == symbol:
-            return True
-        if b[0][2] == b[1][1] == b[2][0] == symbol:
-            return True
-        return False
-
-    def is_tie(self):
-        return self.turns >= 9
-
-    def get_move(self, player):
-        while True:
-            user_input = input(f"{player.name} ({player.symbol}), enter position 1-9, 'undo', 'redo', or 'q' to quit: ")
-            if user_input.lower() == 'q':
-                print("Thanks for playing!")
-                return None
-            if user_input.lower() == 'undo':
-                return 'undo'
-            if user_input.lower() == 'redo':
-                return 'redo'
-            if not user_input.isdigit():
-                print("Invalid input. Enter a number 1-9, 'undo', 'redo', or 'q'.")
-                continue
-            pos = int(user_input)
-            if pos < 1 or pos > 9:
-                print("Number out of bounds. Enter 1-9.")
-                continue
-            row, col = divmod(pos - 1, 3)
-            if self.is_taken(row, col):
-                print("Position already taken.")
-                continue
-            return row, col
-
-    def get_ai_move_easy(self):
-        empty = [(r, c) for r in range(3) for c in range(3) if self.board[r][c] == "-"]
-        return random.choice(empty)
-
-    def undo(self):
-        if not self.move_history:
-            print("Nothing to undo.")
-            return False
-        row, col, symbol, player_index = self.move_history.pop()
-        self.remove_from_board(row, col)
-        self.turns -= 1
-        self.redo_stack.append((row, col, symbol, player_index))
-        self.current = player_index
-        print("Move undone.")
-        return True
-
-    def redo(self):
-        if not self.redo_stack:
-            print("Nothing to redo.")
-            return False
-        row, col, symbol, player_index = self.redo_stack.pop()
-        self.add_to_board(row, col, symbol)
-        self.turns += 1
-        self.move_history.append((row, col, symbol, player_index))
-        self.current = 1 - player_index
-        print("Move redone.")
-        return True
-
-    def play(self):
-        while True:
-            self.print_board()
-            player = self.players[self.current]
-            if self.ai_mode and self.current == 1:
-                row, col = self.get_ai_move_easy()
-                print(f"AI ({player.symbol}) chooses position {row * 3 + col + 1}")
-            else:
-                move = self.get_move(player)
-                if move is None:
-                    break
-                if move == 'undo':
-                    if self.undo():
-                        continue
-                    else:
-                        continue
-                if move == 'redo':
-                    if self.redo():
-                        continue
-                    else:
-                        continue
-                row, col = move
-            self.add_to_board(row, col, player.symbol)
-            self.move_history.append((row, col, player.symbol, self.current))
-            self.redo_stack.clear()  # Clear redo stack after a new move
-            self.turns += 1
-            if self.is_win(player.symbol):
-                self.print_board()
-                print(f"{player.name} ({player.symbol}) wins!")
-                update_scoreboard(player.name, self.players[0], self.players[1])
-                break
-            if self.is_tie():
-                self.print_board()
-                print("It's a tie!")
-                update_scoreboard('tie', self.players[0], self.players[1])
-                break
-            self.current = 1 - self.current
-
-# --- GUI Classes and Logic (from tic_tac_toe_gui.py) ---
-if TK_AVAILABLE:
-    import time
-    class TicTacToeGUI:
-        def __init__(self, root):
-            self.root = root
-            self.root.title("Tic Tac Toe")
-            self.theme = 'light'
-            self.colors = {
-                'light': {
-                    'bg': '#f7fafc',
-                    'fg': '#22223b',
-                    'btn': '#e0e1dd',
-                    'btn_active': '#a9def9',
-                    'win': '#b5ead7',
-                    'border': '#a3cef1',
-                    'logo': '#22223b',
-                },
-                'dark': {
-                    'bg': '#22223b',
-                    'fg': '#f7fafc',
-                    'btn': '#393e46',
-                    'btn_active': '#00adb5',
-                    'win': '#00b894',
-                    'border': '#00adb5',
-                    'logo': '#f7fafc',
-                }
-            }
-            self.score = {"X": 0, "O": 0}
-            self.move_history = []
-            self.redo_stack = []
-            self.setup_menu()
-
-        def fade_in(self, widget, steps=10, delay=20):
-            for i in range(steps):
-                alpha = int(255 * (i + 1) / steps)
-                try:
-                    widget.attributes('-alpha', alpha / 255)
-                except:
-                    pass
-                self.root.update()
-                self.root.after(delay)
-
-        def fade_out(self, widget, steps=10, delay=20):
-            for i in range(steps):
-                alpha = int(255 * (steps - i - 1) / steps)
-                try:
-                    widget.attributes('-alpha', alpha / 255)
-                except:
-                    pass
-                self.root.update()
-                self.root.after(delay)
-
-        def setup_menu(self):
-            self.clear_window()
-            self.menu_frame = tk.Frame(self.root, bg=self.colors[self.theme]['bg'])
-            self.menu_frame.pack(expand=True, fill='both')
-            # Subtle background gradient (simulate with canvas)
-            bg_canvas = tk.Canvas(self.menu_frame, width=420, height=540, highlightthickness=0)
-            for i in range(0, 540, 2):
-                color = self._fade_color(self.colors[self.theme]['bg'], self.colors[self.theme]['btn_active'], i / 540)
-                bg_canvas.create_rectangle(0, i, 420, i+2, fill=color, outline=color)
-            bg_canvas.place(x=0, y=0, relwidth=1, relheight=1)
-            logo = tk.Canvas(self.menu_frame, width=80, height=80, bg=self.colors[self.theme]['bg'], highlightthickness=0)
-            logo.create_oval(10, 10, 70, 70, fill=self.colors[self.theme]['logo'], outline=self.colors[self.theme]['border'], width=4)
-            logo.create_text(40, 40, text="❌⭕", font=("Segoe UI Emoji", 28, "bold"), fill=self.colors[self.theme]['bg'])
-            logo.pack(pady=(30, 10))
-            tk.Label(self.menu_frame, text="Tic Tac Toe", font=("Segoe UI", 28, "bold"), bg=self.colors[self.theme]['bg'], fg=self.colors[self.theme]['fg']).pack(pady=(0, 20))
-            btn_style = {
-                'font': ("Segoe UI", 16, "bold"),
-                'bg': self.colors[self.theme]['btn'],
-                'fg': self.colors[self.theme]['fg'],
-                'activebackground': self.colors[self.theme]['btn_active'],
-                'bd': 0,
-                'relief': 'flat',
-                'highlightthickness': 0,
-                'cursor': 'hand2',
-                'height': 2,
-                'width': 20,
-            }
-            def animate_btn(e, b):
-                b.config(bg=self.colors[self.theme]['btn_active'])
-                b.config(font=("Segoe UI", 18, "bold"))
-            def reset_btn(e, b):
-                b.config(bg=self.colors[self.theme]['btn'])
-                b.config(font=("Segoe UI", 16, "bold"))
-            for text, cmd in [
-                ("Single Player vs AI", self.setup_single_player),
-                ("Two Player (Local)", self.setup_two_player),
-                ("Replay Last Game", lambda: self.show_popup("Replay Last Game feature coming soon!")),
-                ("View Scoreboard", self.show_scoreboard),
-                ("Player Customization", self.player_customization),
-                ("View Features/Help", self.show_features),
-                ("Exit", self.root.quit)
-            ]:
-                btn = tk.Button(self.menu_frame, text=text, command=cmd, **btn_style)
-                btn.pack(pady=10)
-                btn.bind('<Enter>', lambda e, b=btn: animate_btn(e, b))
-                btn.bind('<Leave>', lambda e, b=btn: reset_btn(e, b))
-            self.fade_in(self.menu_frame)
-
-        def info_label_highlight(self):
-            # Highlight active player
-            orig_fg = self.info_label.cget('fg')
-            for i in range(3):
-                self.info_label.config(fg=self.colors[self.theme]['btn_active'])
-                self.root.update()
-                self.root.after(80)
-                self.info_label.config(fg=orig_fg)
-                self.root.update()
-                self.root.after(80)
-
-        def setup_single_player(self):
-            name = simpledialog.askstring("Player Name", "Enter your name:", parent=self.root)
-            if not name:
-                return
-            symbol = simpledialog.askstring("Symbol", "Choose your symbol (X/O):", parent=self.root)
-            if not symbol or symbol.upper() not in ['X', 'O']:
-                symbol = 'X'
-            else:
-                symbol = symbol.upper()
-            ai_symbol = 'O' if symbol == 'X' else 'X'
-            ai_choice = simpledialog.askinteger("AI Difficulty", "Select AI Difficulty:\n1. Easy (Random)\n2. Medium (Rule-based)\n3. Hard (Minimax)", parent=self.root, minvalue=1, maxvalue=3)
-            ai_mode = { 1: 'easy', 2: 'medium', 3: 'hard' }.get(ai_choice, 'easy')
-            self.player1 = Player(name, symbol)
-            self.player2 = Player("AI", ai_symbol, is_ai=True)
-            self.ai_mode = ai_mode
-            self.start_game()
-
-        def setup_two_player(self):
-            name1 = simpledialog.askstring("Player 1 Name", "Enter Player 1 name:", parent=self.root)
-            if not name1:
-                return
-            symbol1 = simpledialog.askstring("Symbol", "Player 1, choose your symbol (X/O):", parent=self.root)
-            if not symbol1 or symbol1.upper() not in ['X', 'O']:
-                symbol1 = 'X'
-            else:
-                symbol1 = symbol1.upper()
-            symbol2 = 'O' if symbol1 == 'X' else 'X'
-            name2 = simpledialog.askstring("Player 2 Name", "Enter Player 2 name:", parent=self.root)
-            if not name2:
-                return
-            self.player1 = Player(name1, symbol1)
-            self.player2 = Player(name2, symbol2)
-            self.ai_mode = None
-            self.start_game()
-
-        def start_game(self):
-            self.clear_window()
-            self.board = [["-" for _ in range(3)] for _ in range(3)]
-            self.current = 0
-            self.turns = 0
-            self.move_history.clear()
-            self.redo_stack.clear()
-            self.game_over = False
-            self.game_frame = tk.Frame(self.root, bg=self.colors[self.theme]['bg'])
-            self.game_frame.pack(expand=True, fill='both')
-            self.info_label = tk.Label(self.game_frame, text=self.get_turn_text(), font=("Segoe UI", 18, "bold"), bg=self.colors[self.theme]['bg'], fg=self.colors[self.theme]['fg'])
-            self.info_label.pack(pady=(20, 10))
-            self.score_label = tk.Label(self.game_frame, text=self.get_score_text(), font=("Segoe UI", 13, "bold"), bg=self.colors[self.theme]['bg'], fg=self.colors[self.theme]['fg'])
-            self.score_label.pack(pady=(0, 10))
-            self.grid_frame = tk.Frame(self.game_frame, bg=self.colors[self.theme]['bg'])
-            self.grid_frame.pack(pady=10)
-            self.buttons = [[None for _ in range(3)] for _ in range(3)]
-            for r in range(3):
-                for c in range(3):
-                    btn = tk.Button(self.grid_frame, text="", font=("Segoe UI", 36, "bold"), width=3, height=1,
-                                    command=lambda row=r, col=c: self.animated_handle_move(row, col),
-                                    bg=self.colors[self.theme]['btn'], fg=self.colors[self.theme]['fg'],
-                                    activebackground=self.colors[self.theme]['btn_active'],
-                                    bd=0, relief='flat', highlightthickness=0, cursor='hand2')
-                    btn.grid(row=r, column=c, padx=8, pady=8, ipadx=6, ipady=6)
-                    self.buttons[r][c] = btn
-                    btn.bind('<Enter>', lambda e, b=btn: b.config(bg=self.colors[self.theme]['btn_active']))
-                    btn.bind('<Leave>', lambda e, b=btn: b.config(bg=self.colors[self.theme]['btn']))
-            control_frame = tk.Frame(self.game_frame, bg=self.colors[self.theme]['bg'])
-            control_frame.pack(pady=18)
-            btn_style = {
-                'font': ("Segoe UI", 12, "bold"),
-                'bg': self.colors[self.theme]['btn'],
-                'fg': self.colors[self.theme]['fg'],
-                'activebackground': self.colors[self.theme]['btn_active'],
-                'bd': 0,
-                'relief': 'flat',
-                'highlightthickness': 0,
-                'cursor': 'hand2',
-                'width': 10,
-            }
-            tk.Button(control_frame, text="Undo", command=self.undo, **btn_style).pack(side='left', padx=6)
-            tk.Button(control_frame, text="Redo", command=self.redo, **btn_style).pack(side='left', padx=6)
-            tk.Button(control_frame, text="Restart", command=self.start_game, **btn_style).pack(side='left', padx=6)
-            tk.Button(control_frame, text="Menu", command=self.setup_menu, **btn_style).pack(side='left', padx=6)
-            tk.Button(control_frame, text="Theme", command=self.toggle_theme, **btn_style).pack(side='left', padx=6)
-            if self.get_current_player().is_ai:
-                self.root.after(500, self.ai_move)
-
-        def animated_handle_move(self, row, col):
-            btn = self.buttons[row][col]
-            # Animate button press (color flash)
-            orig_bg = btn.cget('bg')
-            btn.config(bg=self.colors[self.theme]['btn_active'])
-            self.root.update()
-            self.root.after(80)
-            btn.config(bg=orig_bg)
-            self.handle_move(row, col)
-
-        def get_turn_text(self):
-            p = self.get_current_player()
-            return f"{p.name}'s Turn ({p.symbol})"
-
-        def get_score_text(self):
-            return f"Score: {self.player1.name} (X): {self.score['X']}   {self.player2.name} (O): {self.score['O']}"
-
-        def get_current_player(self):
-            return self.player1 if self.current == 0 else self.player2
-
-        def handle_move(self, row, col):
-            if self.game_over or self.board[row][col] != "-":
-                return
-            player = self.get_current_player()
-            self.board[row][col] = player.symbol
-            self.buttons[row][col].config(text=player.symbol, fg=self.colors[self.theme]['fg'])
-            self.move_history.append((row, col, player.symbol, self.current))
-            self.redo_stack.clear()
-            self.turns += 1
-            if self.check_win(player.symbol):
-                self.game_over = True
-                self.score[player.symbol] += 1
-                self.info_label.config(text=f"{player.name} ({player.symbol}) wins!")
-                self.animated_highlight_win(player.symbol)
-                self.score_label.config(text=self.get_score_text())
-                self.show_popup(f"🎉 {player.name} ({player.symbol}) wins! 🎉")
-                update_scoreboard(player.name, self.players[0], self.players[1])
-                return
-            if self.turns == 9:
-                self.game_over = True
-                self.info_label.config(text="It's a tie!")
-                self.show_popup("🤝 It's a tie! 🤝")
-                update_scoreboard('tie', self.players[0], self.players[1])
-                return
-            self.current = 1 - self.current
-            self.info_label.config(text=self.get_turn_text())
-            if self.get_current_player().is_ai and not self.game_over:
-                self.root.after(500, self.ai_move)
-
-        def ai_move(self):
-            empty = [(r, c) for r in range(3) for c in range(3) if self.board[r][c] == "-"]
-            if not empty:
-                return
-            row, col = random.choice(empty)
-            self.animated_handle_move(row, col)
-
-        def check_win(self, symbol):
-            b = self.board
-            for i in range(3):
-                if all(b[i][j] == symbol for j in range(3)):
-                    self.win_line = [(i, j) for j in range(3)]
-                    return True
-                if all(b[j][i] == symbol for j in range(3)):
-                    self.win_line = [(j, i) for j in range(3)]
-                    return True
-            if b[0][0] == b[1][1] == b[2][2] == symbol:
-                self.win_line = [(0, 0), (1, 1), (2, 2)]
-                return True
-            if b[0][2] == b[1][1] == b[2][0] == symbol:
-                self.win_line = [(0, 2), (1, 1), (2, 0)]
-                return True
-            return False
-
-        def animated_highlight_win(self, symbol):
-            # Animate the winning line highlight (fade-in effect)
-            for step in range(1, 8):
-                color = self._fade_color(self.colors[self.theme]['btn'], self.colors[self.theme]['win'], step / 7)
-                for r, c in getattr(self, 'win_line', []):
-                    self.buttons[r][c].config(bg=color)
-                self.root.update()
-                self.root.after(40)
-            for r, c in getattr(self, 'win_line', []):
-                self.buttons[r][c].config(bg=self.colors[self.theme]['win'])
-
-        def _fade_color(self, start, end, t):
-            # start, end: hex color strings; t: 0.0-1.0
-            def hex_to_rgb(h):
-                h = h.lstrip('#')
-                return tuple(int(h[i:i+2], 16) for i in (0, 2, 4))
-            def rgb_to_hex(rgb):
-                return '#%02x%02x%02x' % rgb
-            s = hex_to_rgb(start)
-            e = hex_to_rgb(end)
-            rgb = tuple(int(s[i] + (e[i] - s[i]) * t) for i in range(3))
-            return rgb_to_hex(rgb)
-
-        def undo(self):
-            if not self.move_history or self.game_over:
-                return
-            row, col, symbol, player_index = self.move_history.pop()
-            self.board[row][col] = "-"
-            self.buttons[row][col].config(text="", bg=self.colors[self.theme]['btn'])
-            self.redo_stack.append((row, col, symbol, player_index))
-            self.turns -= 1
-            self.current = player_index
-            self.info_label.config(text=self.get_turn_text())
-            self.game_over = False
-            for r in range(3):
-                for c in range(3):
-                    self.buttons[r][c].config(bg=self.colors[self.theme]['btn'])
-
-        def redo(self):
-            if not self.redo_stack or self.game_over:
-                return
-            row, col, symbol, player_index = self.redo_stack.pop()
-            self.board[row][col] = symbol
-            self.buttons[row][col].config(text=symbol, fg=self.colors[self.theme]['fg'])
-            self.move_history.append((row, col, symbol, player_index))
-            self.turns += 1
-            self.current = 1 - player_index
-            self.info_label.config(text=self.get_turn_text())
-
-        def toggle_theme(self):
-            # Smooth color transition for theme switch
-            old_theme = self.theme
-            new_theme = 'dark' if self.theme == 'light' else 'light'
-            steps = 10
-            for step in range(1, steps + 1):
-                t = step / steps
-                for widget in self.root.winfo_children():
-                    self._animate_widget_bg(widget, old_theme, new_theme, t)
-                self.root.update()
-                self.root.after(20)
-            self.theme = new_theme
-            self.setup_menu() if hasattr(self, 'menu_frame') and self.menu_frame.winfo_exists() else self.start_game()
-
-        def _animate_widget_bg(self, widget, old_theme, new_theme, t):
-            if hasattr(widget, 'winfo_children'):
-                for child in widget.winfo_children():
-                    self._animate_widget_bg(child, old_theme, new_theme, t)
-            if isinstance(widget, (tk.Frame, tk.Label, tk.Button, tk.Canvas)):
-                old_bg = self.colors[old_theme]['bg']
-                new_bg = self.colors[new_theme]['bg']
-                color = self._fade_color(old_bg, new_bg, t)
-                try:
-                    widget.config(bg=color)
-                except:
-                    pass
-
-        def show_popup(self, message):
-            popup = tk.Toplevel(self.root)
-            popup.title("")
-            popup.geometry("300x120")
-            popup.configure(bg=self.colors[self.theme]['bg'])
-            tk.Label(popup, text=message, font=("Segoe UI Emoji", 20, "bold"), bg=self.colors[self.theme]['bg'], fg=self.colors[self.theme]['fg']).pack(expand=True, pady=20)
-            btn = tk.Button(popup, text="OK", font=("Segoe UI", 12, "bold"), command=popup.destroy, bg=self.colors[self.theme]['btn'], fg=self.colors[self.theme]['fg'], activebackground=self.colors[self.theme]['btn_active'], bd=0, relief='flat', highlightthickness=0, cursor='hand2')
-            btn.pack(pady=5)
-            self.fade_in(popup)
-            popup.transient(self.root)
-            popup.grab_set()
-            self.root.wait_window(popup)
-
-        def clear_window(self):
-            for widget in self.root.winfo_children():
-                widget.destroy()
-
-        def show_features(self):
-            features = "\n".join([f"• {feat}" for feat in FEATURES_LIST])
-            self.show_popup(f"Features:\n{features}")
-
-        def player_customization(self):
-            self.show_popup("Player Customization: Change names, symbols, and (in future) colors/avatars!")
-
-        def show_scoreboard(self):
-            if not scoreboard:
-                self.show_popup("No games played yet.")
-                return
-            lines = [f"{player}: {stats['wins']} Wins, {stats['losses']} Losses, {stats['ties']} Ties" for player, stats in scoreboard.items()]
-            popup = tk.Toplevel(self.root)
-            popup.title("")
-            popup.geometry("350x250")
-            popup.configure(bg=self.colors[self.theme]['bg'])
-            tk.Label(popup, text="Scoreboard", font=("Segoe UI", 18, "bold"), bg=self.colors[self.theme]['bg'], fg=self.colors[self.theme]['fg']).pack(pady=10)
-            for line in lines:
-                tk.Label(popup, text=line, font=("Segoe UI", 13), bg=self.colors[self.theme]['bg'], fg=self.colors[self.theme]['fg']).pack(anchor='w', padx=20)
-            btn = tk.Button(popup, text="OK", font=("Segoe UI", 12, "bold"), command=popup.destroy, bg=self.colors[self.theme]['btn'], fg=self.colors[self.theme]['fg'], activebackground=self.colors[self.theme]['btn_active'], bd=0, relief='flat', highlightthickness=0, cursor='hand2')
-            btn.pack(pady=10)
-            self.fade_in(popup)
-            popup.transient(self.root)
-            popup.grab_set()
-            self.root.wait_window(popup)
-
-# --- Startup Menu ---
-def main_menu():
-    print("Welcome to Tic Tac Toe!")
-    print("\nFeatures:")
-    for feat in FEATURES_LIST:
-        print(f"- {feat}")
-    print("\n1. Console Version")
-    if TK_AVAILABLE:
-        print("2. GUI Version")
-    while True:
-        choice = input("Select mode (1 for Console{}): ".format(", 2 for GUI" if TK_AVAILABLE else ""))
-        if choice == '1':
-            console_main_menu()
-            break
-        elif choice == '2' and TK_AVAILABLE:
-            run_gui()
-            break
-        else:
-            print("Invalid choice. Please enter a valid option.")
-
-# --- Console Game Menu ---
-def console_menu():
-    print("Console Tic Tac Toe!")
-    print("1. Single Player vs AI")
-    print("2. Two Player (Local)")
-    while True:
-        choice = input("Select game mode (1 or 2): ")
-        if choice == '1':
-            name = input("Enter your name: ")
-            symbol = input("Choose your symbol (X/O): ").upper()
-            if symbol not in ['X', 'O']:
-                print("Invalid symbol. Defaulting to X.")
-                symbol = 'X'
-            ai_symbol = 'O' if symbol == 'X' else 'X'
-            print("Select AI Difficulty:")
-            print("1. Easy (Random)")
-            print("2. Medium (Rule-based)")
-            print("3. Hard (Minimax)")
-            while True:
-                ai_choice = input("Enter 1, 2, or 3: ")
-                if ai_choice in ['1', '2', '3']:
-                    break
-                print("Invalid choice. Please enter 1, 2, or 3.")
-            ai_mode = { '1': 'easy', '2': 'medium', '3': 'hard' }[ai_choice]
-            player1 = Player(name, symbol)
-            player2 = Player("AI", ai_symbol, is_ai=True)
-            game = TicTacToeGame(player1, player2, ai_mode=ai_mode)
-            game.play()
-            break
-        elif choice == '2':
-            name1 = input("Player 1, enter your name: ")
-            symbol1 = input("Player 1, choose your symbol (X/O): ").upper()
-            if symbol1 not in ['X', 'O']:
-                print("Invalid symbol. Defaulting to X.")
-                symbol1 = 'X'
-            symbol2 = 'O' if symbol1 == 'X' else 'X'
-            name2 = input("Player 2, enter your name: ")
-            player1 = Player(name1, symbol1)
-            player2 = Player(name2, symbol2)
-            game = TicTacToeGame(player1, player2)
-            game.play()
-            break
-        else:
-            print("Invalid choice. Please enter 1 or 2.")
-
-# --- Console Main Menu ---
-def console_main_menu():
-    while True:
-        print("\n==== TIC TAC TOE ====")
-        print("1. Start Game")
-        print("2. Replay Last Game")
-        print("3. View Scoreboard")
-        print("4. Player Customization")
-        print("5. View Features/Help")
-        print("6. Exit")
-        choice = input("Select an option (1-6): ")
-        if choice == '1':
-            console_menu()
-        elif choice == '2':
-            print("Replay Last Game feature coming soon!")
-        elif choice == '3':
-            print_scoreboard()
-        elif choice == '4':
-            print("Player Customization feature coming soon!")
-        elif choice == '5':
-            print("\nFeatures:")
-            for feat in FEATURES_LIST:
-                print(f"- {feat}")
-        elif choice == '6':
-            print("Goodbye!")
-            exit()
-        else:
-            print("Invalid choice. Please enter a valid option.")
-
-# --- GUI Runner ---
-def run_gui():
-    if not TK_AVAILABLE:
-        print("tkinter is not available. Please install it to use the GUI version.")
-        return
-    root = tk.Tk()
-    root.geometry("420x540")
-    app = TicTacToeGUI(root)
-    root.mainloop()
-
-if __name__ == "__main__":
-    main_menu()
- 
+import random
+import sys
+import os
+import json
+import functools
+import mmap
+import struct
+import math
+import argparse
+import importlib
+import threading
+import time
+import atexit
+import collections
+import bisect
+
+# tkinter and NumPy are imported on first use so headless commands start fast
+tk = messagebox = simpledialog = None
+np = None
+
+def load_tk():
+    # Returns True if tkinter is available for GUI mode
+    global tk, messagebox, simpledialog
+    if tk is None:
+        try:
+            import tkinter
+            from tkinter import messagebox, simpledialog
+        except ImportError:
+            return False
+        tk = tkinter
+    return True
+
+def load_numpy():
+    # Returns True if NumPy is available for the batch simulator
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            return False
+        np = numpy
+    return True
+
+FEATURES_LIST = [
+    "Game mode selection (Single Player with Easy/Medium/Hard AI, Two Player)",
+    "Board size selection (3x3, rows x cols x win length, or Ultimate tic-tac-toe)",
+    "Player name entry and customization (choose X/O, color, avatar in GUI)",
+    "Undo/redo (history tree that keeps undone variations, animated in GUI)",
+    "Scoreboard (persistent, tracks wins/losses/ties)",
+    "Replay last game (console and GUI, from the game archive)",
+    "Spectator mode (watch archived or live AI self-play games at 1x-1000x in the GUI)",
+    "Archive analytics (win rate by opening move, losing openings, tie rate per AI)",
+    "Input validation loop (never crashes, always prompts again)",
+    "Position guide (1-9 mapping beside board in console)",
+    "Animated transitions (console: text, GUI: grid/buttons)",
+    "Responsive, modern GUI (themes, color selection, animated grid, highlight winning line)",
+    "Features/help modal"
+]
+
+# --- Metrics ---
+# Hooks call METRICS.count/timing only when METRICS is set, so with metrics off each
+# hook costs one global lookup and a comparison.
+METRICS = None
+METRICS_PORT = 9464
+
+class MetricsRegistry:
+    # In-process counters and timing summaries keyed by (name, labels); every
+    # observation is also passed on to the attached sinks.
+    def __init__(self, sinks=()):
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.counters = {}  # (name, labels) -> total
+        self.timings = {}   # (name, labels) -> [count, total seconds, max seconds]
+        self.sinks = list(sinks)
+
+    def count(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+        for sink in self.sinks:
+            sink.emit(name, 'counter', value, labels)
+
+    def timing(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            entry = self.timings.get(key)
+            if entry is None:
+                self.timings[key] = [1, seconds, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+                entry[2] = max(entry[2], seconds)
+        for sink in self.sinks:
+            sink.emit(name, 'timing', seconds, labels)
+
+    def total(self, name):
+        with self.lock:
+            return sum(value for (metric, _), value in self.counters.items() if metric == name)
+
+    def snapshot(self):
+        elapsed = time.monotonic() - self.started
+        with self.lock:
+            counters = {format_metric(name, labels): value for (name, labels), value in self.counters.items()}
+            timings = {format_metric(name, labels): {'count': n, 'sum': total, 'mean': total / n, 'max': peak}
+                       for (name, labels), (n, total, peak) in self.timings.items()}
+        games = self.total('games_finished_total')
+        return {'uptime_seconds': elapsed, 'games_per_second': games / elapsed if elapsed else 0.0,
+                'counters': counters, 'timings': timings}
+
+    def prometheus_text(self):
+        lines = []
+        with self.lock:
+            counters = sorted(self.counters.items())
+            timings = sorted(self.timings.items())
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE tictactoe_{name} counter")
+            lines.append(f"tictactoe_{format_metric(name, labels)} {value}")
+        # Every metric family is one contiguous block: the summary's _sum/_count samples,
+        # then the peaks as a separate <name>_max gauge family
+        by_name = {}
+        for (name, labels), entry in timings:
+            by_name.setdefault(name, []).append((labels, entry))
+        for name, series in by_name.items():
+            lines.append(f"# TYPE tictactoe_{name} summary")
+            for labels, (n, total, peak) in series:
+                lines.append(f"tictactoe_{format_metric(name + '_sum', labels)} {total}")
+                lines.append(f"tictactoe_{format_metric(name + '_count', labels)} {n}")
+            lines.append(f"# TYPE tictactoe_{name}_max gauge")
+            for labels, (n, total, peak) in series:
+                lines.append(f"tictactoe_{format_metric(name + '_max', labels)} {peak}")
+        return "".join(line + "\n" for line in lines)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+def format_metric(name, labels):
+    # Prometheus style: name{key="value",...}
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{key}="{escape_label(value)}"' for key, value in labels) + "}"
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class JsonLinesSink:
+    # One JSON object per observation, appended to a file
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.file = open(path, 'a', buffering=1 << 16)
+
+    def emit(self, name, kind, value, labels):
+        line = json.dumps({'ts': time.time(), 'metric': name, 'type': kind, 'value': value, 'labels': labels})
+        with self.lock:
+            if self.file is not None:
+                self.file.write(line + "\n")
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+class PrometheusExporter:
+    # Serves the registry in the Prometheus text format at http://host:port/metrics
+    def __init__(self, registry, host='127.0.0.1', port=METRICS_PORT):
+        import http.server
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(handler):
+                if handler.path != '/metrics':
+                    handler.send_error(404)
+                    return
+                body = registry.prometheus_text().encode('utf-8')
+                handler.send_response(200)
+                handler.send_header('Content-Type', 'text/plain; version=0.0.4')
+                handler.send_header('Content-Length', str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, *args):
+                pass
+        self.server = http.server.ThreadingHTTPServer((host, port), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def emit(self, name, kind, value, labels):
+        pass  # scrapes read the registry directly
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def enable_metrics(jsonl_path=None, prometheus_port=None, host='127.0.0.1'):
+    global METRICS
+    registry = MetricsRegistry()
+    if jsonl_path:
+        registry.sinks.append(JsonLinesSink(jsonl_path))
+    if prometheus_port:
+        registry.sinks.append(PrometheusExporter(registry, host, prometheus_port))
+    METRICS = registry
+    return registry
+
+def disable_metrics():
+    global METRICS
+    if METRICS is not None:
+        METRICS.close()
+        METRICS = None
+
+def game_finished(winner_index, source):
+    if METRICS is not None:
+        METRICS.count('games_finished_total', result='tie' if winner_index is None else 'win', source=source)
+
+SCOREBOARD_FILE = 'scoreboard.db'
+LEGACY_SCOREBOARD_FILE = 'scoreboard.json'
+SCOREBOARD_PAGE_SIZE = 20
+ELO_START = 1500.0
+ELO_K = 32.0
+RATING_BUCKETS = 4000  # one-point buckets over ratings 0..3999 for rank queries
+
+def elo_deltas(rating_a, rating_b, score_a, k=ELO_K):
+    # Rating changes for a game where A scored score_a (1 win, 0.5 tie, 0 loss)
+    expected_a = 1.0 / (1.0 + 10 ** ((rating_b - rating_a) / 400.0))
+    delta = k * (score_a - expected_a)
+    return delta, -delta
+
+def rating_bucket(rating):
+    return min(RATING_BUCKETS - 1, max(0, int(rating)))
+
+class FenwickTree:
+    # Prefix sums with O(log n) point updates; counts players per rating bucket
+    def __init__(self, size):
+        self.size = size
+        self.tree = [0] * (size + 1)
+
+    def add(self, index, delta):
+        index += 1
+        while index <= self.size:
+            self.tree[index] += delta
+            index += index & -index
+
+    def prefix(self, index):
+        # Sum of buckets [0, index)
+        total = 0
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+class RatingIndex:
+    # Player counts per one-point rating bucket in a Fenwick tree, plus each bucket's ratings
+    # in sorted order, so counting the players rated above someone is O(log buckets) for the
+    # buckets above theirs and a bisect within their own
+    def __init__(self, ratings):
+        self.counts = FenwickTree(RATING_BUCKETS)
+        self.buckets = [[] for _ in range(RATING_BUCKETS)]
+        for rating in ratings:
+            self.buckets[rating_bucket(rating)].append(rating)
+        for bucket, values in enumerate(self.buckets):
+            if values:
+                values.sort()
+                self.counts.add(bucket, len(values))
+        self.total = len(ratings)
+
+    def add(self, rating):
+        bucket = rating_bucket(rating)
+        bisect.insort(self.buckets[bucket], rating)
+        self.counts.add(bucket, 1)
+        self.total += 1
+
+    def remove(self, rating):
+        bucket = rating_bucket(rating)
+        values = self.buckets[bucket]
+        i = bisect.bisect_left(values, rating)
+        if i < len(values) and values[i] == rating:
+            del values[i]
+            self.counts.add(bucket, -1)
+            self.total -= 1
+
+    def above(self, rating):
+        bucket = rating_bucket(rating)
+        values = self.buckets[bucket]
+        return self.total - self.counts.prefix(bucket + 1) + len(values) - bisect.bisect_right(values, rating)
+
+class ScoreboardStore:
+    # SQLite in WAL mode: readers never block the writer, and BEGIN IMMEDIATE serializes
+    # writers across processes. Results are buffered and committed in batches; a
+    # background thread flushes stragglers and checkpoints (compacts) the WAL.
+    def __init__(self, path=SCOREBOARD_FILE, batch_size=32, flush_interval=1.0, compact_interval=30.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = []  # (name, wins, losses, ties, rating change) deltas not yet committed
+        self.ratings = {}  # name -> rating as this process last saw it, including pending changes
+        self.rank_index = None  # RatingIndex, built by the first rank query
+        self.data_version = None  # PRAGMA data_version the caches above were filled under
+        self.synced_seq = 0  # with a rank index, the highest commit seq it reflects
+        self.lock = threading.Lock()
+        import sqlite3
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS scores (name TEXT PRIMARY KEY, wins INTEGER NOT NULL DEFAULT 0, losses INTEGER NOT NULL DEFAULT 0, ties INTEGER NOT NULL DEFAULT 0, rating REAL NOT NULL DEFAULT {ELO_START}, seq INTEGER NOT NULL DEFAULT 0)")
+        self._add_columns()
+        self.conn.execute("CREATE INDEX IF NOT EXISTS scores_by_rating ON scores (rating, name)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS scores_by_seq ON scores (seq)")
+        self._import_legacy()
+        self.stopped = threading.Event()
+        self.compactor = threading.Thread(target=self._background, args=(compact_interval,), daemon=True)
+        self.compactor.start()
+        atexit.register(self.close)
+
+    def _add_columns(self):
+        # Databases from before ratings existed get the column with everyone at ELO_START.
+        # seq is the commit that last changed a row; every write transaction takes the next one.
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(scores)")]
+            if 'rating' not in columns:
+                self.conn.execute(f"ALTER TABLE scores ADD COLUMN rating REAL NOT NULL DEFAULT {ELO_START}")
+            if 'seq' not in columns:
+                self.conn.execute("ALTER TABLE scores ADD COLUMN seq INTEGER NOT NULL DEFAULT 0")
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def _import_legacy(self):
+        # One-time migration from the old whole-file JSON scoreboard; the emptiness check
+        # runs inside the write transaction so concurrent first starts import it only once
+        if not os.path.exists(LEGACY_SCOREBOARD_FILE):
+            return
+        with open(LEGACY_SCOREBOARD_FILE, 'r') as f:
+            legacy = json.load(f)
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            if not self.conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]:
+                self.conn.executemany("INSERT INTO scores (name, wins, losses, ties) VALUES (?, ?, ?, ?)",
+                                      [(name, s['wins'], s['losses'], s['ties']) for name, s in legacy.items()])
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def _sync(self):
+        # Called with the lock held. data_version changes whenever another connection (e.g.
+        # another process) commits, which may have moved any rating. Without a rank index the
+        # cache is just dropped; with one, only the rows committed since synced_seq are read
+        # and moved, so concurrent writers cost O(changed rows) rather than a rebuild.
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self.data_version:
+            return
+        self.data_version = version
+        if self.rank_index is None:
+            self.ratings.clear()
+            return
+        rows = self.conn.execute("SELECT name, rating, seq FROM scores WHERE seq > ?", (self.synced_seq,)).fetchall()
+        for name, rating, seq in rows:
+            # Rows this process wrote come back too; re-applying a stored value is harmless
+            rating += self._pending_change(name)
+            old = self.ratings.get(name)
+            if old is not None:
+                self.rank_index.remove(old)
+            self.rank_index.add(rating)
+            self.ratings[name] = rating
+            self.synced_seq = max(self.synced_seq, seq)
+
+    def _pending_change(self, name):
+        # Rating change for name still waiting in the batch, so not in the database yet
+        return sum(delta[4] for delta in self.pending if delta[0] == name)
+
+    def _rating(self, name):
+        # Called with the lock held; the second value is True for names not stored yet
+        rating = self.ratings.get(name)
+        if rating is not None:
+            return rating, False
+        row = self.conn.execute("SELECT rating FROM scores WHERE name = ?", (name,)).fetchone()
+        rating = (ELO_START if row is None else row[0]) + self._pending_change(name)
+        self.ratings[name] = rating
+        return rating, row is None and not any(delta[0] == name for delta in self.pending)
+
+    def _move_rating(self, name, old, new, is_new):
+        self.ratings[name] = new
+        if self.rank_index is not None:
+            if not is_new:
+                self.rank_index.remove(old)
+            self.rank_index.add(new)
+
+    def record(self, winner, player1_name, player2_name):
+        # Win/loss/tie counts plus an incremental Elo update for both players
+        if winner == 'tie':
+            deltas = [(player1_name, 0, 0, 1), (player2_name, 0, 0, 1)]
+            score = 0.5
+        elif winner == player1_name:
+            deltas = [(player1_name, 1, 0, 0), (player2_name, 0, 1, 0)]
+            score = 1.0
+        elif winner == player2_name:
+            deltas = [(player2_name, 1, 0, 0), (player1_name, 0, 1, 0)]
+            score = 0.0
+        else:
+            deltas = [(player1_name, 0, 0, 0), (player2_name, 0, 0, 0)]
+            score = None
+        with self.lock:
+            self._sync()
+            rating1, new1 = self._rating(player1_name)
+            rating2, new2 = self._rating(player2_name)
+            change = {player1_name: 0.0, player2_name: 0.0}
+            if score is not None and player1_name != player2_name:
+                change[player1_name], change[player2_name] = elo_deltas(rating1, rating2, score)
+            self._move_rating(player1_name, rating1, rating1 + change[player1_name], new1)
+            if player2_name != player1_name:
+                self._move_rating(player2_name, rating2, rating2 + change[player2_name], new2)
+            self.pending.extend(delta + (change[delta[0]],) for delta in deltas)
+            due = len(self.pending) >= self.batch_size
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            if not self.pending or self.conn is None:
+                return
+            batch, self.pending = self.pending, []
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                seq = self._next_seq()
+                # Rating changes are applied as deltas so concurrent writers add up instead of overwriting
+                self.conn.executemany(
+                    f"INSERT INTO scores (name, wins, losses, ties, rating, seq) VALUES (?, ?, ?, ?, {ELO_START} + ?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET wins = wins + excluded.wins, "
+                    "losses = losses + excluded.losses, ties = ties + excluded.ties, "
+                    f"rating = rating + excluded.rating - {ELO_START}, seq = excluded.seq",
+                    [delta + (seq,) for delta in batch])
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                self.pending[:0] = batch
+                raise
+
+    def _next_seq(self):
+        # Inside a write transaction, which BEGIN IMMEDIATE serializes, so seqs follow commit order
+        return self.conn.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM scores").fetchone()[0]
+
+    def compact(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def _background(self, compact_interval):
+        last_compact = time.monotonic()
+        while not self.stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+                if time.monotonic() - last_compact >= compact_interval:
+                    self.compact()
+                    last_compact = time.monotonic()
+            except Exception:
+                pass  # e.g. another process holds the lock; retry next tick
+
+    def count(self):
+        self.flush()
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    def get(self, name):
+        self.flush()
+        with self.lock:
+            row = self.conn.execute("SELECT wins, losses, ties, rating FROM scores WHERE name = ?", (name,)).fetchone()
+        return {'wins': row[0], 'losses': row[1], 'ties': row[2], 'rating': row[3]} if row else None
+
+    def page(self, after=None, limit=SCOREBOARD_PAGE_SIZE):
+        # Keyset pagination by name: pass the last name of the previous page as after
+        self.flush()
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT name, wins, losses, ties, rating FROM scores WHERE name > ? ORDER BY name LIMIT ?",
+                ('' if after is None else after, limit)).fetchall()
+        return [(name, {'wins': w, 'losses': l, 'ties': t, 'rating': r}) for name, w, l, t, r in rows]
+
+    # Leaderboard queries walk the (rating, name) index, so they cost O(log n + k)
+    def top(self, k=10, before=None):
+        # Highest rated first; pass the (rating, name) of the previous page's last row as before
+        self.flush()
+        with self.lock:
+            if before is None:
+                rows = self.conn.execute("SELECT name, wins, losses, ties, rating FROM scores "
+                                         "ORDER BY rating DESC, name DESC LIMIT ?", (k,)).fetchall()
+            else:
+                rows = self.conn.execute("SELECT name, wins, losses, ties, rating FROM scores WHERE (rating, name) < (?, ?) "
+                                         "ORDER BY rating DESC, name DESC LIMIT ?", (before[0], before[1], k)).fetchall()
+        return [(name, {'wins': w, 'losses': l, 'ties': t, 'rating': r}) for name, w, l, t, r in rows]
+
+    def in_range(self, low, high, limit=SCOREBOARD_PAGE_SIZE):
+        self.flush()
+        with self.lock:
+            rows = self.conn.execute("SELECT name, wins, losses, ties, rating FROM scores WHERE rating BETWEEN ? AND ? "
+                                     "ORDER BY rating DESC, name DESC LIMIT ?", (low, high, limit)).fetchall()
+        return [(name, {'wins': w, 'losses': l, 'ties': t, 'rating': r}) for name, w, l, t, r in rows]
+
+    def _build_rank_index(self):
+        # One pass over the ratings; record() and _sync() keep it current afterwards. Called
+        # right after a flush, so the cache is reset to the stored values the index is built from.
+        self.ratings = {}
+        self.synced_seq = 0
+        for name, rating, seq in self.conn.execute("SELECT name, rating, seq FROM scores"):
+            self.ratings[name] = rating
+            self.synced_seq = max(self.synced_seq, seq)
+        self.rank_index = RatingIndex(list(self.ratings.values()))
+
+    def rank(self, name):
+        # 1-based position on the leaderboard (ties share a rank), or None for unknown players
+        self.flush()
+        with self.lock:
+            self._sync()
+            if self.rank_index is None:
+                self._build_rank_index()
+            rating = self.ratings.get(name)
+            if rating is None:
+                row = self.conn.execute("SELECT rating FROM scores WHERE name = ?", (name,)).fetchone()
+                if row is None:
+                    return None
+                rating = row[0]
+            return self.rank_index.above(rating) + 1
+
+    def rerate(self, records):
+        # Rebuild every rating from scratch by replaying finished games in order
+        self.flush()
+        ratings = {}
+        for record in records:
+            if record.result not in (RESULT_TIE, RESULT_PLAYER1, RESULT_PLAYER2):
+                continue
+            a, b = record.player1, record.player2
+            if a == b:
+                continue
+            rating_a, rating_b = ratings.get(a, ELO_START), ratings.get(b, ELO_START)
+            score = 0.5 if record.result == RESULT_TIE else 1.0 if record.result == RESULT_PLAYER1 else 0.0
+            delta_a, delta_b = elo_deltas(rating_a, rating_b, score)
+            ratings[a], ratings[b] = rating_a + delta_a, rating_b + delta_b
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                seq = self._next_seq()
+                self.conn.execute("UPDATE scores SET rating = ?, seq = ?", (ELO_START, seq))
+                self.conn.executemany("INSERT INTO scores (name, rating, seq) VALUES (?, ?, ?) "
+                                      "ON CONFLICT(name) DO UPDATE SET rating = excluded.rating, seq = excluded.seq",
+                                      [(name, rating, seq) for name, rating in ratings.items()])
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.ratings.clear()
+            self.rank_index = None
+        return len(ratings)
+
+    def iter_scores(self, page_size=SCOREBOARD_PAGE_SIZE):
+        after = None
+        while True:
+            rows = self.page(after, page_size)
+            if not rows:
+                return
+            yield from rows
+            after = rows[-1][0]
+
+    def close(self):
+        if self.conn is None:
+            return
+        atexit.unregister(self.close)  # or every store ever opened stays alive until exit
+        self.stopped.set()
+        self.compactor.join()
+        self.flush()
+        with self.lock:
+            self.conn.close()
+            self.conn = None
+
+_scoreboard = None
+
+def get_scoreboard():
+    # Opened on first use so importing the game never touches the database
+    global _scoreboard
+    if _scoreboard is None:
+        _scoreboard = ScoreboardStore()
+    return _scoreboard
+
+def update_scoreboard(winner, player1, player2):
+    if METRICS is None:
+        get_scoreboard().record(winner, player1.name, player2.name)
+        return
+    started = time.perf_counter()
+    get_scoreboard().record(winner, player1.name, player2.name)
+    METRICS.timing('scoreboard_write_seconds', time.perf_counter() - started)
+
+def format_score(player, stats):
+    return f"{player}: {stats['wins']} Wins, {stats['losses']} Losses, {stats['ties']} Ties, Rating {stats['rating']:.0f}"
+
+def print_leaderboard(top=10, player=None, rating_range=None):
+    store = get_scoreboard()
+    if player is not None:
+        rank = store.rank(player)
+        if rank is None:
+            print(f"{player} has not played yet.")
+        else:
+            print(f"#{rank} {format_score(player, store.get(player))}")
+        return
+    if rating_range is not None:
+        rows = store.in_range(rating_range[0], rating_range[1], top)
+    else:
+        rows = store.top(top)
+    print("\n==== LEADERBOARD ====")
+    if not rows:
+        print("No games played yet.")
+    for position, (name, stats) in enumerate(rows, 1):
+        print(f"{position:>3}. {format_score(name, stats)}" if rating_range is None else format_score(name, stats))
+    print("=====================\n")
+
+def print_scoreboard(page_size=SCOREBOARD_PAGE_SIZE, interactive=True):
+    print("\n==== SCOREBOARD ====")
+    store = get_scoreboard()
+    after = None
+    shown = 0
+    while True:
+        rows = store.page(after, page_size)
+        if not rows:
+            break
+        for player, stats in rows:
+            print(format_score(player, stats))
+        shown += len(rows)
+        after = rows[-1][0]
+        if len(rows) < page_size:
+            break
+        if interactive and input("-- Enter for more, 'q' to stop -- ").lower() == 'q':
+            break
+    if not shown:
+        print("No games played yet.")
+        return
+    print("====================\n")
+
+# --- Game Archive ---
+# Each finished game is one record: a fixed 12-byte header, both player names, then the
+# moves as cell indexes (one nibble each on boards of up to 16 cells, else 1 or 2 bytes).
+# Records are appended to numbered segment files that roll over at a size limit.
+GAME_ARCHIVE_DIR = 'game_archive'
+ARCHIVE_SEGMENT_SIZE = 64 * 1024 * 1024
+ARCHIVE_MAGIC = b'TTTG\x01'
+RECORD_HEADER = struct.Struct('<IBBBBHBB')  # timestamp, flags, rows, cols, win length, move count, name lengths
+RESULT_TIE, RESULT_PLAYER1, RESULT_PLAYER2 = 0, 1, 2
+FLAG_PLAYER1_O = 1 << 2     # player 1 played O (and so player 2 played X)
+FLAG_BYTE_MOVES = 1 << 3    # one byte per move
+FLAG_WORD_MOVES = 1 << 4    # two bytes per move
+
+GameRecord = collections.namedtuple('GameRecord', 'timestamp player1 player2 symbol1 symbol2 result rows cols win_length moves')
+
+def make_game_record(players, board, move_history, winner_index):
+    result = RESULT_TIE if winner_index is None else winner_index + 1
+    moves = [board.cell(row, col) for row, col, _, _ in move_history]
+    return GameRecord(int(time.time()), players[0].name, players[1].name, players[0].symbol, players[1].symbol,
+                      result, board.rows, board.cols, board.win_length, moves)
+
+def encode_game_record(record):
+    name1 = record.player1.encode('utf-8')[:255]
+    name2 = record.player2.encode('utf-8')[:255]
+    flags = record.result
+    if record.symbol1 == 'O':
+        flags |= FLAG_PLAYER1_O
+    cells = record.rows * record.cols
+    if cells <= 16:
+        padded = list(record.moves) + [0] * (len(record.moves) & 1)
+        packed = bytes(padded[i] | padded[i + 1] << 4 for i in range(0, len(padded), 2))
+    elif cells <= 256:
+        flags |= FLAG_BYTE_MOVES
+        packed = bytes(record.moves)
+    else:
+        flags |= FLAG_WORD_MOVES
+        packed = struct.pack(f'<{len(record.moves)}H', *record.moves)
+    header = RECORD_HEADER.pack(record.timestamp, flags, record.rows, record.cols, record.win_length,
+                                len(record.moves), len(name1), len(name2))
+    return header + name1 + name2 + packed
+
+def record_body_size(flags, count, len1, len2):
+    # Bytes that follow a record header: both names, then the packed moves
+    if flags & FLAG_WORD_MOVES:
+        return len1 + len2 + 2 * count
+    if flags & FLAG_BYTE_MOVES:
+        return len1 + len2 + count
+    return len1 + len2 + (count + 1) // 2
+
+def read_game_record(stream):
+    # Reads one record from a binary stream; returns None at the end of the stream
+    header = stream.read(RECORD_HEADER.size)
+    if len(header) < RECORD_HEADER.size:
+        return None
+    timestamp, flags, rows, cols, win_length, count, len1, len2 = RECORD_HEADER.unpack(header)
+    size = record_body_size(flags, count, len1, len2)
+    body = stream.read(size)
+    if len(body) < size:
+        return None  # Truncated tail, e.g. a writer was killed mid-append
+    name1 = body[:len1].decode('utf-8', 'replace')
+    name2 = body[len1:len1 + len2].decode('utf-8', 'replace')
+    packed = body[len1 + len2:]
+    if flags & FLAG_WORD_MOVES:
+        moves = list(struct.unpack(f'<{count}H', packed))
+    elif flags & FLAG_BYTE_MOVES:
+        moves = list(packed)
+    else:
+        moves = [packed[i >> 1] >> (4 * (i & 1)) & 0xF for i in range(count)]
+    symbol1, symbol2 = ('O', 'X') if flags & FLAG_PLAYER1_O else ('X', 'O')
+    return GameRecord(timestamp, name1, name2, symbol1, symbol2, flags & 3, rows, cols, win_length, moves)
+
+class GameArchive:
+    def __init__(self, directory=GAME_ARCHIVE_DIR, segment_size=ARCHIVE_SEGMENT_SIZE, max_segments=None):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.max_segments = max_segments  # oldest segments are deleted beyond this many
+        self.current = None      # unbuffered append handle on the segment being written
+        self.last_offset = None  # where this archive's latest append landed in that segment
+
+    def segments(self):
+        if not os.path.isdir(self.directory):
+            return []
+        names = sorted(n for n in os.listdir(self.directory) if n.startswith('games-') and n.endswith('.bin'))
+        return [os.path.join(self.directory, n) for n in names]
+
+    def _segment_path(self, number):
+        return os.path.join(self.directory, f'games-{number:06d}.bin')
+
+    def _roll(self, size):
+        # Only runs on the first append and when the open segment is full, so the
+        # directory is listed once per segment rather than once per game
+        os.makedirs(self.directory, exist_ok=True)
+        segments = self.segments()
+        if not segments or os.path.getsize(segments[-1]) + size > self.segment_size:
+            number = int(os.path.basename(segments[-1])[6:12]) + 1 if segments else 1
+            path = self._segment_path(number)
+            with open(path, 'ab') as f:
+                if f.tell() == 0:
+                    f.write(ARCHIVE_MAGIC)
+            segments.append(path)
+            if self.max_segments:
+                for old in segments[:-self.max_segments]:
+                    os.remove(old)
+        if self.current is not None:
+            self.current.close()
+        self.current = open(segments[-1], 'ab', buffering=0)
+        self.last_offset = None
+
+    def append(self, record):
+        data = encode_game_record(record)
+        if self.current is None or self.current.tell() + len(data) > self.segment_size:
+            self._roll(len(data))
+        # Unbuffered O_APPEND write: one small write() per record, so concurrent writers don't
+        # interleave, and tell() afterwards is the true end of the file including their records
+        self.current.write(data)
+        self.last_offset = self.current.tell() - len(data)
+
+    def last(self):
+        if self.last_offset is not None:
+            with open(self.current.name, 'rb') as f:
+                f.seek(self.last_offset)
+                return read_game_record(f)
+        # Nothing appended from this process: walk the record headers of the newest segment
+        for path in reversed(self.segments()):
+            with open(path, 'rb') as f:
+                end = os.fstat(f.fileno()).st_size
+                if end <= len(ARCHIVE_MAGIC):
+                    continue
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    pos, last = len(ARCHIVE_MAGIC), None
+                    while pos + RECORD_HEADER.size <= end:
+                        _, flags, _, _, _, count, len1, len2 = RECORD_HEADER.unpack_from(data, pos)
+                        record_end = pos + RECORD_HEADER.size + record_body_size(flags, count, len1, len2)
+                        if record_end > end:
+                            break  # Truncated tail
+                        last, pos = pos, record_end
+                if last is not None:
+                    f.seek(last)
+                    return read_game_record(f)
+        return None
+
+    def iter_segment(self, path):
+        with open(path, 'rb', buffering=1 << 16) as f:
+            if f.read(len(ARCHIVE_MAGIC)) != ARCHIVE_MAGIC:
+                raise ValueError(f"{path} is not a game archive segment")
+            while True:
+                record = read_game_record(f)
+                if record is None:
+                    return
+                yield record
+
+    def __iter__(self):
+        for path in self.segments():
+            yield from self.iter_segment(path)
+
+_archive = None
+
+def get_archive():
+    # One archive per process, so appends keep the open segment between games
+    global _archive
+    if _archive is None:
+        _archive = GameArchive()
+    return _archive
+
+def record_game(players, board, move_history, winner_index):
+    get_archive().append(make_game_record(players, board, move_history, winner_index))
+
+def replay_console(record, delay=0.5):
+    board = make_board(record.rows, record.cols, record.win_length)
+    symbols = (record.symbol1, record.symbol2)
+    names = (record.player1, record.player2)
+    print(f"\nReplay: {record.player1} ({record.symbol1}) vs {record.player2} ({record.symbol2}), "
+          f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(record.timestamp))}")
+    for turn, cell in enumerate(record.moves):
+        row, col = divmod(cell, record.cols)
+        board.add_to_board(row, col, symbols[turn % 2])
+        print(f"Move {turn + 1}: {names[turn % 2]} ({symbols[turn % 2]}) plays position {cell + 1}")
+        for line in board_lines(board):
+            print(line)
+        print()
+        time.sleep(delay)
+    if record.result == RESULT_TIE:
+        print("It was a tie!")
+    else:
+        winner = record.result - 1
+        print(f"{names[winner]} ({symbols[winner]}) won!")
+
+def replay_last_game():
+    record = get_archive().last()
+    if record is None:
+        print("No finished games to replay yet.")
+        return
+    replay_console(record)
+
+class Player:
+    __slots__ = ('name', 'symbol', 'is_ai', 'ai_mode')
+
+    def __init__(self, name, symbol, is_ai=False, ai_mode=None):
+        self.name = name
+        self.symbol = symbol
+        self.is_ai = is_ai
+        self.ai_mode = ai_mode  # overrides the game's ai_mode for this player
+
+# --- Archive Analytics ---
+# One pass over the archive segments straight from mmap (no GameRecord per game) into:
+#   openings: geometry -> trie of move prefixes up to `depth` moves; each node is
+#             [first player wins, second player wins, ties, {next cell: node}]
+#   players:  name -> [wins, losses, ties]
+#   losing:   name -> {(geometry, opening): count}, at most LOSING_LINES_KEPT entries per
+#             player (Misra-Gries, so counts are lower bounds once a player has more lines)
+# Memory depends on depth, board sizes and player count, not on the number of games. The
+# aggregates and the bytes read from each segment are cached next to the archive, so a
+# rerun only reads games appended since; segments are scanned in parallel.
+OPENING_DEPTH = 4
+LOSING_LINES_KEPT = 20
+ANALYTICS_FILE = 'analytics.json'
+
+def geometry_name(rows, cols, win_length):
+    return 'ultimate' if win_length == ULTIMATE else f"{rows}x{cols}x{win_length}"
+
+class ArchiveAnalytics:
+    def __init__(self, depth=OPENING_DEPTH):
+        self.depth = depth
+        self.games = 0
+        self.offsets = {}   # segment file name -> bytes already aggregated
+        self.openings = {}
+        self.players = {}
+        self.losing = {}
+
+    def scan(self, path, offset=0):
+        # Aggregates the complete records of one segment from offset; returns the new offset.
+        # A partly written record at the end is left for the next run. The loop only counts
+        # raw (header, names, opening bytes) keys; each distinct key is decoded once at the end.
+        header = RECORD_HEADER
+        size = header.size
+        depth = self.depth
+        seen = {}
+        with open(path, 'rb') as f:
+            end = os.fstat(f.fileno()).st_size
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if data[:len(ARCHIVE_MAGIC)] != ARCHIVE_MAGIC:
+                    raise ValueError(f"{path} is not a game archive segment")
+                pos = max(offset, len(ARCHIVE_MAGIC))
+                while pos + size <= end:
+                    _, flags, rows, cols, win_length, count, len1, len2 = header.unpack_from(data, pos)
+                    start = pos + size + len1 + len2
+                    kept = min(count, depth)
+                    if flags & FLAG_WORD_MOVES:
+                        record_end, opening_end = start + 2 * count, start + 2 * kept
+                    elif flags & FLAG_BYTE_MOVES:
+                        record_end, opening_end = start + count, start + kept
+                    else:
+                        record_end, opening_end = start + (count + 1) // 2, start + (kept + 1) // 2
+                    if record_end > end:
+                        break
+                    key = (flags, rows, cols, win_length, kept, len1, data[pos + size:opening_end])
+                    seen[key] = seen.get(key, 0) + 1
+                    pos = record_end
+        for (flags, rows, cols, win_length, kept, len1, raw), games in seen.items():
+            len2 = len(raw) - len1 - (2 * kept if flags & FLAG_WORD_MOVES else kept if flags & FLAG_BYTE_MOVES else (kept + 1) // 2)
+            packed = raw[len1 + len2:]
+            if flags & FLAG_WORD_MOVES:
+                opening = struct.unpack(f'<{kept}H', packed)
+            elif flags & FLAG_BYTE_MOVES:
+                opening = tuple(packed)
+            else:
+                opening = tuple(packed[i >> 1] >> (4 * (i & 1)) & 0xF for i in range(kept))
+            self.add(geometry_name(rows, cols, win_length), opening, flags & 3, raw[:len1].decode('utf-8', 'replace'),
+                     raw[len1:len1 + len2].decode('utf-8', 'replace'), games)
+        return pos
+
+    def add(self, geometry, opening, result, name1, name2, games=1):
+        # result is RESULT_TIE/PLAYER1/PLAYER2; player 1 always moves first
+        self.games += games
+        slot = 2 if result == RESULT_TIE else result - 1
+        node = self.openings.get(geometry)
+        if node is None:
+            node = self.openings[geometry] = [0, 0, 0, {}]
+        node[slot] += games
+        for cell in opening:
+            child = node[3].get(cell)
+            if child is None:
+                child = node[3][cell] = [0, 0, 0, {}]
+            child[slot] += games
+            node = child
+        for index, name in enumerate((name1, name2)):
+            tally = self.players.get(name)
+            if tally is None:
+                tally = self.players[name] = [0, 0, 0]
+            if result == RESULT_TIE:
+                tally[2] += games
+            elif result == index + 1:
+                tally[0] += games
+            else:
+                tally[1] += games
+                self.count_loss(name, (geometry, opening), games)
+
+    def count_loss(self, name, line, count):
+        lines = self.losing.get(name)
+        if lines is None:
+            lines = self.losing[name] = {}
+        if line in lines:
+            lines[line] += count
+        elif len(lines) < LOSING_LINES_KEPT:
+            lines[line] = count
+        else:
+            # Misra-Gries: a new line cancels one count from every kept line
+            floor = min(count, min(lines.values()))
+            for key in list(lines):
+                lines[key] -= floor
+                if not lines[key]:
+                    del lines[key]
+            if count > floor:
+                lines[line] = count - floor
+
+    def merge(self, other):
+        self.games += other.games
+        self.offsets.update(other.offsets)
+        for geometry, node in other.openings.items():
+            self.openings[geometry] = merge_opening(self.openings.get(geometry), node)
+        for name, tally in other.players.items():
+            mine = self.players.setdefault(name, [0, 0, 0])
+            for i in range(3):
+                mine[i] += tally[i]
+        for name, lines in other.losing.items():
+            for line, count in sorted(lines.items(), key=lambda item: -item[1]):
+                self.count_loss(name, line, count)
+
+    def update(self, archive=None, workers=None):
+        # Reads the games appended since the cached offsets; returns how many were new
+        archive = archive or GameArchive()
+        jobs = []
+        for path in archive.segments():
+            name = os.path.basename(path)
+            offset = self.offsets.get(name, 0)
+            if os.path.getsize(path) > max(offset, len(ARCHIVE_MAGIC)):
+                jobs.append((path, offset))
+        before = self.games
+        if len(jobs) > 1 and (workers or os.cpu_count() or 1) > 1:
+            import concurrent.futures
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+                for part in pool.map(analyze_segment, jobs, [self.depth] * len(jobs)):
+                    self.merge(part)
+        else:
+            for job in jobs:
+                self.merge(analyze_segment(job, self.depth))
+        return self.games - before
+
+    def opening(self, geometry, prefix=()):
+        # Trie node after the given cells, or None if no archived game started that way
+        node = self.openings.get(geometry)
+        for cell in prefix:
+            if node is None:
+                return None
+            node = node[3].get(cell)
+        return node
+
+    def save(self, path):
+        data = {'depth': self.depth, 'games': self.games, 'offsets': self.offsets, 'openings': self.openings,
+                'players': self.players,
+                'losing': {name: [[geometry, list(opening), count] for (geometry, opening), count in lines.items()]
+                           for name, lines in self.losing.items()}}
+        with open(path + '.tmp', 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path, depth=OPENING_DEPTH):
+        # Cached aggregates, or an empty set when there are none for this depth
+        analytics = cls(depth)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return analytics
+        if data.get('depth') != depth:
+            return analytics
+        analytics.games = data['games']
+        analytics.offsets = data['offsets']
+        analytics.openings = {geometry: opening_from_json(node) for geometry, node in data['openings'].items()}
+        analytics.players = data['players']
+        analytics.losing = {name: {(geometry, tuple(opening)): count for geometry, opening, count in lines}
+                            for name, lines in data['losing'].items()}
+        return analytics
+
+def analyze_segment(job, depth):
+    # Worker: aggregates of one segment from an offset
+    path, offset = job
+    part = ArchiveAnalytics(depth)
+    part.offsets[os.path.basename(path)] = part.scan(path, offset)
+    return part
+
+def merge_opening(node, other):
+    if node is None:
+        return other
+    for i in range(3):
+        node[i] += other[i]
+    for cell, child in other[3].items():
+        node[3][cell] = merge_opening(node[3].get(cell), child)
+    return node
+
+def opening_from_json(node):
+    # JSON object keys are strings; cells are ints again
+    return [node[0], node[1], node[2], {int(cell): opening_from_json(child) for cell, child in node[3].items()}]
+
+def update_analytics(archive=None, depth=OPENING_DEPTH, rebuild=False, workers=None):
+    archive = archive or GameArchive()
+    path = os.path.join(archive.directory, ANALYTICS_FILE)
+    analytics = ArchiveAnalytics(depth) if rebuild else ArchiveAnalytics.load(path, depth)
+    new_games = analytics.update(archive, workers)
+    if new_games or rebuild:
+        os.makedirs(archive.directory, exist_ok=True)
+        analytics.save(path)
+    return analytics, new_games
+
+def format_rates(node):
+    first, second, ties = node[0], node[1], node[2]
+    total = first + second + ties
+    return f"{total:>10,}  {first / total:>6.1%}  {second / total:>6.1%}  {ties / total:>6.1%}"
+
+def print_analytics(analytics, top=9, geometry=None, prefix=(), player=None):
+    print(f"{analytics.games:,} games analysed")
+    geometries = [geometry] if geometry else sorted(analytics.openings, key=lambda g: -sum(analytics.openings[g][:3]))
+    for name in geometries:
+        node = analytics.opening(name, prefix)
+        if node is None:
+            print(f"\nNo {name} games open with {' '.join(str(c + 1) for c in prefix)}")
+            continue
+        after = f" after {' '.join(str(c + 1) for c in prefix)}" if prefix else ""
+        print(f"\n{name}: results by next move{after} (position, games, first player / second player / tie)")
+        for cell, child in sorted(node[3].items(), key=lambda item: -sum(item[1][:3]))[:top]:
+            print(f"  {cell + 1:>4}  {format_rates(child)}")
+    print("\nMost common losing openings")
+    if player is not None:
+        names = [player] if player in analytics.losing else []
+    else:
+        names = sorted(analytics.losing, key=lambda name: -analytics.players[name][1])[:top]
+    for name in names:
+        worst = sorted(analytics.losing[name].items(), key=lambda item: -item[1])[:top]
+        print(f"  {name}: " + ", ".join(f"{g} {'-'.join(str(c + 1) for c in opening)} ({count})" for (g, opening), count in worst))
+    print("\nTie rate per AI")
+    for name, (wins, losses, ties) in sorted(analytics.players.items()):
+        if name.startswith("AI"):
+            total = wins + losses + ties
+            print(f"  {name:<20}{total:>10,} games  win {wins / total:>6.1%}  loss {losses / total:>6.1%}  tie {ties / total:>6.1%}")
+
+# --- Bitboard Core ---
+# Cells are numbered row * cols + col; each side is an int with one bit per cell.
+# The classic 3x3 constants below are what the exhaustive AIs are built on.
+WIN_MASKS = (
+    [sum(1 << (r * 3 + c) for c in range(3)) for r in range(3)] +
+    [sum(1 << (r * 3 + c) for r in range(3)) for c in range(3)] +
+    [sum(1 << (i * 3 + i) for i in range(3)), sum(1 << (i * 3 + 2 - i) for i in range(3))]
+)
+FULL_MASK = (1 << 9) - 1
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+@functools.lru_cache(maxsize=None)
+def line_runs(rows, cols, win_length):
+    # Every run of win_length cells on a rows x cols board, as (first cell, step between cells)
+    runs = []
+    for r in range(rows):
+        for c in range(cols):
+            for dr, dc in DIRECTIONS:
+                end_r, end_c = r + dr * (win_length - 1), c + dc * (win_length - 1)
+                if 0 <= end_r < rows and 0 <= end_c < cols:
+                    runs.append((r * cols + c, dr * cols + dc))
+    return tuple(runs)
+
+@functools.lru_cache(maxsize=None)
+def line_masks(rows, cols, win_length):
+    # One bitmask per run; each direction's pattern is built once and shifted into place
+    patterns = {}
+    masks = []
+    for start, step in line_runs(rows, cols, win_length):
+        pattern = patterns.get(step)
+        if pattern is None:
+            pattern = patterns[step] = sum(1 << (step * i) for i in range(win_length))
+        masks.append(pattern << start)
+    return tuple(masks)
+
+@functools.lru_cache(maxsize=None)
+def cell_lines(rows, cols, win_length):
+    # cell -> indices into line_masks() of every line through that cell, filled in one pass
+    # over the lines (each adds itself to its win_length cells)
+    table = [[] for _ in range(rows * cols)]
+    for line, (start, step) in enumerate(line_runs(rows, cols, win_length)):
+        for i in range(win_length):
+            table[start + step * i].append(line)
+    return tuple(map(tuple, table))
+
+@functools.lru_cache(maxsize=None)
+def zobrist_key(cell, symbol):
+    # Fixed random 64-bit key per (cell, symbol); string seeds keep hashes stable across runs
+    return random.Random(f"{cell}:{symbol}").getrandbits(64)
+
+def has_line(mask, cell, rows, cols, win_length):
+    # Same O(k) walk as BitBoard.line_through, on a raw mask and without building the run
+    row, col = divmod(cell, cols)
+    reach = win_length - 1
+    for dr, dc in DIRECTIONS:
+        count = 1
+        for sign in (1, -1):
+            r, c = row + dr * sign, col + dc * sign
+            steps = 0
+            while steps < reach and 0 <= r < rows and 0 <= c < cols and mask >> (r * cols + c) & 1:
+                count += 1
+                r, c = r + dr * sign, c + dc * sign
+                steps += 1
+        if count >= win_length:
+            return True
+    return False
+
+MAX_BOARD_SIDE = 255  # rows, cols and win length are single bytes in archive records
+
+def parse_board_spec(spec):
+    # "15x15x5" -> (15, 15, 5); "4" -> (4, 4, 4); "" -> classic 3x3; "ultimate" -> 9x9 Ultimate
+    if spec.strip().lower() in ('u', 'ultimate'):
+        return 9, 9, ULTIMATE
+    parts = [int(p) for p in spec.lower().replace(' ', '').split('x') if p] if spec.strip() else [3]
+    if len(parts) == 1:
+        parts = parts * 3
+    elif len(parts) == 2:
+        parts.append(min(parts))
+    rows, cols, win_length = parts
+    if rows > MAX_BOARD_SIDE or cols > MAX_BOARD_SIDE:
+        raise ValueError(f"Boards are at most {MAX_BOARD_SIDE}x{MAX_BOARD_SIDE}")
+    if rows < 1 or cols < 1 or win_length < 1 or win_length > max(rows, cols):
+        raise ValueError("Win length must fit on the board")
+    return rows, cols, win_length
+
+class BitBoard:
+    def __init__(self, rows=3, cols=3, win_length=3):
+        self.rows = rows
+        self.cols = cols
+        self.win_length = win_length
+        self.size = rows * cols
+        self.full_mask = (1 << self.size) - 1
+        self.masks = {}         # symbol -> bitmask of that symbol's cells
+        self.occupied = 0       # union of all masks
+        self.last_move = None   # (cell, symbol) of the latest add_to_board
+        self.hash = 0           # Zobrist hash: XOR of zobrist_key(cell, symbol) over all pieces
+        self.lines = line_masks(rows, cols, win_length)
+        self.cell_lines = cell_lines(rows, cols, win_length)
+        self.reset_counters()
+
+    def reset_counters(self):
+        # Per-line piece counts, kept up to date by add_to_board/remove_from_board so
+        # threat lookups only touch the lines through the cell that changed.
+        self.line_totals = [0] * len(self.lines)
+        self.line_counts = {}   # symbol -> pieces of that symbol on each line
+        self.threats = {}       # symbol -> lines one move from complete with no opposing piece
+        self.builds = {}        # symbol -> lines two moves from complete with no opposing piece
+
+    def update_counters(self, cell, symbol, delta):
+        counts = self.line_counts.get(symbol)
+        if counts is None:
+            counts = self.line_counts[symbol] = [0] * len(self.lines)
+            self.threats[symbol] = set()
+            self.builds[symbol] = set()
+        totals = self.line_totals
+        need = self.win_length
+        for line in self.cell_lines[cell]:
+            counts[line] += delta
+            totals[line] += delta
+            total = totals[line]
+            for sym, sym_counts in self.line_counts.items():
+                n = sym_counts[line]
+                if n and n == total and n == need - 1:
+                    self.threats[sym].add(line)
+                else:
+                    self.threats[sym].discard(line)
+                if n and n == total and n == need - 2:
+                    self.builds[sym].add(line)
+                else:
+                    self.builds[sym].discard(line)
+
+    def is_classic(self):
+        return self.rows == 3 and self.cols == 3 and self.win_length == 3
+
+    def cell(self, row, col):
+        return row * self.cols + col
+
+    def is_taken(self, row, col):
+        return (self.occupied >> (row * self.cols + col)) & 1 == 1
+
+    def is_legal(self, cell):
+        return not self.occupied >> cell & 1
+
+    def add_to_board(self, row, col, symbol):
+        cell = row * self.cols + col
+        bit = 1 << cell
+        if not self.occupied & bit:
+            self.update_counters(cell, symbol, 1)
+            self.hash ^= zobrist_key(cell, symbol)
+        self.masks[symbol] = self.masks.get(symbol, 0) | bit
+        self.occupied |= bit
+        self.last_move = (cell, symbol)
+
+    def remove_from_board(self, row, col):
+        cell = row * self.cols + col
+        bit = 1 << cell
+        for symbol in self.masks:
+            if self.masks[symbol] & bit:
+                self.update_counters(cell, symbol, -1)
+                self.hash ^= zobrist_key(cell, symbol)
+            self.masks[symbol] &= ~bit
+        self.occupied &= ~bit
+        self.last_move = None
+
+    def threat_cells(self, symbol):
+        # Empty cells that would complete a line for symbol
+        if self.win_length == 1:
+            return {i for i in range(self.size) if not self.occupied >> i & 1}
+        free = self.full_mask & ~self.occupied
+        return {(self.lines[line] & free).bit_length() - 1 for line in self.threats.get(symbol, ())}
+
+    def fork_cells(self, symbol):
+        # Empty cells that would give symbol two lines one move from complete
+        free = self.full_mask & ~self.occupied
+        tally = collections.Counter()
+        for line in self.builds.get(symbol, ()):
+            rest = self.lines[line] & free
+            while rest:
+                low = rest & -rest
+                tally[low.bit_length() - 1] += 1
+                rest ^= low
+        return {cell for cell, n in tally.items() if n >= 2}
+
+    def center_cells(self):
+        # The middle cell, or the middle two or four on even-sized boards, if still empty
+        return {r * self.cols + c for r in {(self.rows - 1) // 2, self.rows // 2}
+                for c in {(self.cols - 1) // 2, self.cols // 2} if not self.occupied >> (r * self.cols + c) & 1}
+
+    def symbol_at(self, row, col):
+        bit = 1 << (row * self.cols + col)
+        for symbol, mask in self.masks.items():
+            if mask & bit:
+                return symbol
+        return "-"
+
+    def line_through(self, cell, symbol):
+        # Longest run of symbol through cell in any direction, if it reaches win_length.
+        # Each direction stops after win_length - 1 steps, so this costs O(k).
+        mask = self.masks.get(symbol, 0)
+        row, col = divmod(cell, self.cols)
+        reach = self.win_length - 1
+        for dr, dc in DIRECTIONS:
+            run = [(row, col)]
+            for sign in (1, -1):
+                r, c = row + dr * sign, col + dc * sign
+                steps = 0
+                while steps < reach and 0 <= r < self.rows and 0 <= c < self.cols and mask >> (r * self.cols + c) & 1:
+                    run.append((r, c))
+                    r, c = r + dr * sign, c + dc * sign
+                    steps += 1
+            if len(run) >= self.win_length:
+                return sorted(run)
+        return []
+
+    def winning_line(self, symbol):
+        if self.last_move is not None and self.last_move[1] == symbol:
+            return self.line_through(self.last_move[0], symbol)
+        # No last move to go on (e.g. after an undo): fall back to a full scan
+        mask = self.masks.get(symbol, 0)
+        for line in line_masks(self.rows, self.cols, self.win_length):
+            if mask & line == line:
+                return [divmod(i, self.cols) for i in range(self.size) if line >> i & 1]
+        return []
+
+    def is_win(self, symbol):
+        return bool(self.winning_line(symbol))
+
+    def empty_cells(self):
+        return [divmod(i, self.cols) for i in range(self.size) if not (self.occupied >> i) & 1]
+
+    def is_full(self):
+        return self.occupied == self.full_mask
+
+    def clear(self):
+        self.masks = {}
+        self.occupied = 0
+        self.last_move = None
+        self.hash = 0
+        self.reset_counters()
+
+    def copy(self):
+        board = BitBoard.__new__(BitBoard)
+        board.__dict__.update(self.__dict__)
+        board.masks = dict(self.masks)
+        board.line_totals = list(self.line_totals)
+        board.line_counts = {symbol: list(counts) for symbol, counts in self.line_counts.items()}
+        board.threats = {symbol: set(lines) for symbol, lines in self.threats.items()}
+        board.builds = {symbol: set(lines) for symbol, lines in self.builds.items()}
+        return board
+
+    def grid(self):
+        return [[self.symbol_at(r, c) for c in range(self.cols)] for r in range(self.rows)]
+
+# --- Game History ---
+class GameState:
+    # One position in a game's history tree. States are never modified: each one
+    # stores only the move that led to it and shares everything else with its
+    # parent, so taking a snapshot after a move is O(1).
+    __slots__ = ('parent', 'cell', 'symbol', 'player_index', 'turns', 'hash')
+
+    def __init__(self, parent, cell, symbol, player_index):
+        self.parent = parent
+        self.cell = cell
+        self.symbol = symbol
+        self.player_index = player_index
+        if parent is None:
+            self.turns, self.hash = 0, 0
+        else:
+            self.turns = parent.turns + 1
+            self.hash = parent.hash ^ zobrist_key(cell, symbol)  # same value as BitBoard.hash
+
+class GameHistory:
+    # Every line played in a game. Undo moves to the parent; playing a move that was
+    # played here before re-enters that variation instead of discarding it.
+    def __init__(self):
+        self.root = GameState(None, None, None, None)
+        self.current = self.root
+        self.children = {}  # state -> child states, oldest first
+        self.redo_to = {}   # state -> the child redo follows (the one most recently left)
+
+    def play(self, cell, symbol, player_index):
+        for child in self.children.get(self.current, ()):
+            if child.cell == cell and child.symbol == symbol:
+                break
+        else:
+            child = GameState(self.current, cell, symbol, player_index)
+            self.children.setdefault(self.current, []).append(child)
+        self.redo_to[self.current] = child
+        self.current = child
+        return child
+
+    def undo(self):
+        state = self.current
+        if state.parent is None:
+            return None
+        self.redo_to[state.parent] = state
+        self.current = state.parent
+        return state
+
+    def redo(self):
+        state = self.redo_to.get(self.current)
+        if state is not None:
+            self.current = state
+        return state
+
+    def peek_redo(self, count=1):
+        # The next count states redo would replay, or None if the line is shorter
+        states, state = [], self.current
+        for _ in range(count):
+            state = self.redo_to.get(state)
+            if state is None:
+                return None
+            states.append(state)
+        return states
+
+    def variations(self, state=None):
+        return list(self.children.get(state or self.current, ()))
+
+    def line(self, state=None):
+        # States from the first move up to state (default: the current one)
+        states = []
+        state = state or self.current
+        while state.parent is not None:
+            states.append(state)
+            state = state.parent
+        states.reverse()
+        return states
+
+    def moves(self, cols):
+        # The current line as (row, col, symbol, player_index) tuples
+        return [(state.cell // cols, state.cell % cols, state.symbol, state.player_index) for state in self.line()]
+
+    def move_to(self, state):
+        # Switch to any state in the tree; returns the states to take back and the ones to replay
+        ancestors = set()
+        node = state
+        while node is not None:
+            ancestors.add(node)
+            node = node.parent
+        undone = []
+        node = self.current
+        while node not in ancestors:
+            undone.append(node)
+            node = node.parent
+        replayed = self.line(state)[node.turns:]
+        self.current = state
+        return undone, replayed
+
+# --- Minimax AI ---
+# WINNING[mask] is 1 when the mask contains a complete line.
+WINNING = bytearray(1 if any(m & line == line for line in WIN_MASKS) else 0 for m in range(FULL_MASK + 1))
+
+def _symmetry_maps():
+    # The 8 rotations/reflections of the board as cell -> cell maps
+    maps = []
+    for flip in (False, True):
+        for turns in range(4):
+            mapping = []
+            for cell in range(9):
+                r, c = divmod(cell, 3)
+                if flip:
+                    c = 2 - c
+                for _ in range(turns):
+                    r, c = c, 2 - r
+                mapping.append(r * 3 + c)
+            maps.append(mapping)
+    return maps
+
+def _permute_table(mapping):
+    # Built from smaller masks: mask = (mask without its lowest bit) + lowest bit
+    table = [0] * (FULL_MASK + 1)
+    for mask in range(1, FULL_MASK + 1):
+        low = mask & -mask
+        table[mask] = table[mask ^ low] | 1 << mapping[low.bit_length() - 1]
+    return table
+
+SYMMETRY_MAPS = _symmetry_maps()
+SYMMETRY_INVERSE = [[m.index(cell) for cell in range(9)] for m in SYMMETRY_MAPS]
+SYMMETRY_TABLES = [_permute_table(m) for m in SYMMETRY_MAPS]
+
+def canonical_key(me, opp):
+    # Smallest (me, opp) encoding over all 8 symmetries, plus the symmetry that produced it
+    best_key, best_sym = None, 0
+    for sym, table in enumerate(SYMMETRY_TABLES):
+        key = table[me] << 9 | table[opp]
+        if best_key is None or key < best_key:
+            best_key, best_sym = key, sym
+    return best_key, best_sym
+
+MOVE_ORDER = (4, 0, 2, 6, 8, 1, 3, 5, 7)  # center, corners, edges
+EXACT, LOWER, UPPER = 0, 1, 2
+
+class MinimaxAI:
+    # Negamax with alpha-beta pruning. Scores are from the side to move:
+    # a win scores 1 + the number of empty cells left, so faster wins rank higher.
+    def __init__(self):
+        self.table = {}  # canonical key -> (value, flag, best cell in canonical orientation)
+        self.nodes = 0
+        self.cache_hits = 0
+
+    def reset_stats(self):
+        self.nodes = 0
+        self.cache_hits = 0
+
+    def choose(self, board, symbol, opponent):
+        cell = self.best_move(board.masks.get(symbol, 0), board.masks.get(opponent, 0))
+        return divmod(cell, 3)
+
+    def best_move(self, me, opp):
+        key, sym = canonical_key(me, opp)
+        entry = self.table.get(key)
+        if entry is not None and entry[1] == EXACT:
+            self.cache_hits += 1
+        else:
+            self.negamax(me, opp, -100, 100)
+            entry = self.table[key]
+        return SYMMETRY_INVERSE[sym][entry[2]]
+
+    def value(self, me, opp):
+        return self.negamax(me, opp, -100, 100)
+
+    def ordered_moves(self, me, opp):
+        occupied = me | opp
+        blocks, rest = [], []
+        for cell in MOVE_ORDER:
+            bit = 1 << cell
+            if occupied & bit:
+                continue
+            if WINNING[opp | bit]:
+                blocks.append(cell)
+            else:
+                rest.append(cell)
+        return blocks + rest
+
+    def negamax(self, me, opp, alpha, beta):
+        self.nodes += 1
+        key, sym = canonical_key(me, opp)
+        entry = self.table.get(key)
+        if entry is not None:
+            value, flag, _ = entry
+            if flag == EXACT or (flag == LOWER and value >= beta) or (flag == UPPER and value <= alpha):
+                self.cache_hits += 1
+                return value
+        occupied = me | opp
+        empties = 9 - bin(occupied).count("1")
+        # An immediate win is always the best move
+        for cell in MOVE_ORDER:
+            bit = 1 << cell
+            if not occupied & bit and WINNING[me | bit]:
+                value = empties
+                self.table[key] = (value, EXACT, SYMMETRY_MAPS[sym][cell])
+                return value
+        alpha_orig = alpha
+        best_value, best_cell = -100, None
+        for cell in self.ordered_moves(me, opp):
+            bit = 1 << cell
+            if empties == 1:
+                value = 0
+            else:
+                value = -self.negamax(opp, me | bit, -beta, -alpha)
+            if value > best_value:
+                best_value, best_cell = value, cell
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                break
+        if best_value <= alpha_orig:
+            flag = UPPER
+        elif best_value >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table[key] = (best_value, flag, SYMMETRY_MAPS[sym][best_cell])
+        return best_value
+
+# Shared so the transposition table survives across moves and games
+HARD_AI = MinimaxAI()
+
+# --- Solved Game Table ---
+# Every position reachable from the empty board, solved ahead of time by build_solved_table().
+# Layout: header, then one little-endian uint16 per base-3 position index (3**9 slots):
+#   bits 0-8 best moves, bits 9-13 negamax value + 9 (side to move), bit 15 set if reachable.
+SOLVED_TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'solved_table.bin')
+SOLVED_TABLE_HEADER = struct.Struct('<4sHHI')  # magic, version, record size, record count
+SOLVED_TABLE_MAGIC = b'TTTS'
+SOLVED_TABLE_VERSION = 1
+SOLVED_TABLE_RECORDS = 3 ** 9
+RECORD_VALID = 1 << 15
+TERNARY = [sum(3 ** c for c in range(9) if m >> c & 1) for m in range(FULL_MASK + 1)]
+
+def position_index(first, second):
+    # Perfect hash: empty = 0, first player's stone = 1, second player's stone = 2 per base-3 digit
+    return TERNARY[first] + 2 * TERNARY[second]
+
+def build_solved_table(path=SOLVED_TABLE_FILE):
+    solver = MinimaxAI()
+    records = [0] * SOLVED_TABLE_RECORDS
+    stack = [(0, 0)]
+    while stack:
+        first, second = stack.pop()
+        index = position_index(first, second)
+        if records[index]:
+            continue
+        occupied = first | second
+        first_to_move = bin(first).count("1") == bin(second).count("1")
+        me, opp = (first, second) if first_to_move else (second, first)
+        empties = 9 - bin(occupied).count("1")
+        if WINNING[opp]:
+            records[index] = RECORD_VALID | (-(empties + 1) + 9) << 9
+            continue
+        if occupied == FULL_MASK:
+            records[index] = RECORD_VALID | 9 << 9
+            continue
+        values = {}
+        for cell in range(9):
+            bit = 1 << cell
+            if occupied & bit:
+                continue
+            if WINNING[me | bit]:
+                values[cell] = empties
+            elif empties == 1:
+                values[cell] = 0
+            else:
+                values[cell] = -solver.value(opp, me | bit)
+            if first_to_move:
+                stack.append((first | bit, second))
+            else:
+                stack.append((first, second | bit))
+        best = max(values.values())
+        moves = sum(1 << cell for cell, value in values.items() if value == best)
+        records[index] = RECORD_VALID | (best + 9) << 9 | moves
+    with open(path, 'wb') as f:
+        f.write(SOLVED_TABLE_HEADER.pack(SOLVED_TABLE_MAGIC, SOLVED_TABLE_VERSION, 2, SOLVED_TABLE_RECORDS))
+        f.write(struct.pack(f'<{SOLVED_TABLE_RECORDS}H', *records))
+    return sum(1 for record in records if record)
+
+class SolvedTable:
+    # Read-only mmap of the solved table; processes mapping the same file share its pages.
+    def __init__(self, path=SOLVED_TABLE_FILE):
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, size, count = SOLVED_TABLE_HEADER.unpack_from(self.data, 0)
+        if magic != SOLVED_TABLE_MAGIC or version != SOLVED_TABLE_VERSION or size != 2 or count != SOLVED_TABLE_RECORDS:
+            self.data.close()
+            raise ValueError(f"{path} is not a solved table (version {SOLVED_TABLE_VERSION})")
+        self.hits = 0
+
+    def record(self, first, second):
+        return struct.unpack_from('<H', self.data, SOLVED_TABLE_HEADER.size + 2 * position_index(first, second))[0]
+
+    def lookup(self, me, opp):
+        # Returns (value, best cells) for the side to move, or None for unreachable positions
+        if bin(me).count("1") == bin(opp).count("1"):
+            record = self.record(me, opp)
+        else:
+            record = self.record(opp, me)
+        if not record & RECORD_VALID:
+            return None
+        self.hits += 1
+        return (record >> 9 & 0x1F) - 9, [cell for cell in range(9) if record >> cell & 1]
+
+    def close(self):
+        self.data.close()
+
+_solved_table = None
+
+def get_solved_table():
+    global _solved_table
+    if _solved_table is None and os.path.exists(SOLVED_TABLE_FILE):
+        try:
+            _solved_table = SolvedTable()
+        except (OSError, ValueError):
+            return None
+    return _solved_table
+
+def find_winning_cell(board, symbol):
+    cells = board.threat_cells(symbol)
+    return divmod(min(cells), board.cols) if cells else None
+
+def choose_hard_move(board, symbol, opponent):
+    if not board.is_classic():
+        # Exhaustive search is only practical on 3x3: take a win, else block, else play randomly
+        move = find_winning_cell(board, symbol) or find_winning_cell(board, opponent)
+        return move or random.choice(board.empty_cells())
+    table = get_solved_table()
+    if table is not None:
+        entry = table.lookup(board.masks.get(symbol, 0), board.masks.get(opponent, 0))
+        if entry is not None and entry[1]:
+            return divmod(random.choice(entry[1]), 3)
+    # No table shipped (or position not in it): search instead
+    return HARD_AI.choose(board, symbol, opponent)
+
+# --- Position Evaluation ---
+Evaluation = collections.namedtuple('Evaluation', 'to_move value outcome best_moves pv')
+
+def parse_position(board, to_move=None):
+    # Accepts "XO-......" strings, 3x3 nested lists, (x_mask, o_mask) pairs or a BitBoard.
+    # Returns (x_mask, o_mask, symbol to move); X is assumed to move first unless to_move says otherwise.
+    if isinstance(board, BitBoard):
+        if not board.is_classic():
+            raise ValueError("Only 3x3 boards can be evaluated")
+        x, o = board.masks.get('X', 0), board.masks.get('O', 0)
+    elif isinstance(board, tuple) and len(board) == 2 and all(isinstance(m, int) for m in board):
+        x, o = board
+    else:
+        if isinstance(board, str):
+            cells = [ch for ch in board.upper() if ch in 'XO-. _']
+        else:
+            cells = [str(cell).upper() for row in board for cell in row]
+        if len(cells) != 9:
+            raise ValueError(f"Expected 9 cells, got {len(cells)}")
+        x = sum(1 << i for i, ch in enumerate(cells) if ch == 'X')
+        o = sum(1 << i for i, ch in enumerate(cells) if ch == 'O')
+    if x & o or (x | o) & ~FULL_MASK:
+        raise ValueError("Overlapping or out-of-range masks")
+    if WINNING[x] and WINNING[o]:
+        raise ValueError("Both sides have a line")
+    x_count, o_count = bin(x).count("1"), bin(o).count("1")
+    if to_move is None:
+        to_move = 'O' if x_count > o_count else 'X'
+    return x, o, to_move
+
+class PositionEvaluator:
+    # Answers are computed and cached per symmetry-canonical position, in canonical
+    # orientation, and mapped back to each caller's orientation on the way out.
+    def __init__(self, maxsize=65536):
+        self.maxsize = maxsize
+        self.cache = collections.OrderedDict()  # canonical key -> (value, best cells, pv cells)
+        self.hits = 0
+        self.misses = 0
+        self.deduplicated = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'deduplicated': self.deduplicated,
+                'hit_rate': self.hits / lookups if lookups else 0.0, 'size': len(self.cache)}
+
+    def solve(self, me, opp):
+        # (value, best cells) for the side to move
+        empties = 9 - bin(me | opp).count("1")
+        if WINNING[opp]:
+            return -(empties + 1), []
+        if not empties:
+            return 0, []
+        table = get_solved_table()
+        entry = table.lookup(me, opp) if table is not None else None
+        if entry is not None:
+            return entry
+        values = {}
+        for cell in range(9):
+            bit = 1 << cell
+            if (me | opp) & bit:
+                continue
+            if WINNING[me | bit]:
+                values[cell] = empties
+            elif empties == 1:
+                values[cell] = 0
+            else:
+                values[cell] = -HARD_AI.value(opp, me | bit)
+        best = max(values.values())
+        return best, [cell for cell, value in values.items() if value == best]
+
+    def evaluate_key(self, key):
+        entry = self.cache.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return entry
+        self.misses += 1
+        me, opp = key >> 9, key & FULL_MASK
+        value, best = self.solve(me, opp)
+        # Principal variation: keep playing the first best move until the game ends
+        pv = []
+        line_best = best
+        while line_best:
+            pv.append(line_best[0])
+            me, opp = opp, me | 1 << line_best[0]
+            line_best = self.solve(me, opp)[1]
+        entry = (value, tuple(best), tuple(pv))
+        self.cache[key] = entry
+        if len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False)
+        return entry
+
+    def evaluate_many(self, boards, to_move=None):
+        positions = []
+        unique = {}
+        for board in boards:
+            x, o, mover = parse_position(board, to_move)
+            me, opp = (x, o) if mover == 'X' else (o, x)
+            key, sym = canonical_key(me, opp)
+            positions.append((key, sym, mover))
+            unique.setdefault(key, None)
+        self.deduplicated += len(positions) - len(unique)
+        for key in unique:
+            unique[key] = self.evaluate_key(key)
+        results = []
+        for key, sym, mover in positions:
+            value, best, pv = unique[key]
+            inverse = SYMMETRY_INVERSE[sym]
+            outcome = 'win' if value > 0 else 'loss' if value < 0 else 'draw'
+            results.append(Evaluation(mover, value, outcome,
+                                      [divmod(inverse[cell], 3) for cell in best],
+                                      [divmod(inverse[cell], 3) for cell in pv]))
+        return results
+
+DEFAULT_EVALUATOR = PositionEvaluator()
+
+def evaluate_many(boards, to_move=None):
+    return DEFAULT_EVALUATOR.evaluate_many(boards, to_move)
+
+# --- Ultimate Tic-Tac-Toe ---
+# Nine 3x3 boards; the cell you play picks the board your opponent must play in next
+# (any open board if that one is already won or full). Win three boards in a line.
+ULTIMATE = 0  # win_length value (board specs, archive records) that selects Ultimate tic-tac-toe
+# Public cells are row * 9 + col like any 9x9 board; internally cells are small board * 9 + cell
+# within it, so each small board is a 9-bit slice of one int and reuses the 3x3 tables.
+ULTIMATE_INTERNAL = [((r // 3) * 3 + c // 3) * 9 + (r % 3) * 3 + c % 3 for r in range(9) for c in range(9)]
+ULTIMATE_DISPLAY = [ULTIMATE_INTERNAL.index(i) for i in range(81)]
+# ULTIMATE_MOVES[board][its occupied mask] -> internal cells still free in that board
+ULTIMATE_MOVES = [[tuple(b * 9 + c for c in range(9) if not m >> c & 1) for m in range(FULL_MASK + 1)] for b in range(9)]
+# ULTIMATE_OPEN[closed boards mask] -> boards still in play
+ULTIMATE_OPEN = [tuple(b for b in range(9) if not m >> b & 1) for m in range(FULL_MASK + 1)]
+
+def make_board(rows=3, cols=3, win_length=3):
+    return UltimateBoard() if win_length == ULTIMATE else BitBoard(rows, cols, win_length)
+
+def board_lines(board):
+    # Console rows; Ultimate boards get rules between the small boards
+    if board.win_length != ULTIMATE:
+        return [" ".join(row) for row in board.grid()]
+    lines = []
+    for r, row in enumerate(board.grid()):
+        if r and r % 3 == 0:
+            lines.append("------+-------+------")
+        lines.append(" | ".join(" ".join(row[c:c + 3]) for c in (0, 3, 6)))
+    return lines
+
+class UltimateBoard:
+    # Same interface as BitBoard for the engine, front-ends and AIs
+    def __init__(self):
+        self.rows = self.cols = 9
+        self.win_length = ULTIMATE
+        self.size = 81
+        self.clear()
+
+    def clear(self):
+        self.masks = {}         # symbol -> internal 81-bit mask
+        self.meta = {}          # symbol -> 9-bit mask of small boards won (cached per board)
+        self.closed = 0         # small boards won or full
+        self.occupied = 0       # internal numbering
+        self.forced = None      # small board the next move must be in, None for any open board
+        self.moves = []         # internal cells in the order played
+        self.last_move = None   # (cell, symbol)
+        self.hash = 0
+
+    def is_classic(self):
+        return False
+
+    def cell(self, row, col):
+        return row * 9 + col
+
+    def is_taken(self, row, col):
+        return self.occupied >> ULTIMATE_INTERNAL[row * 9 + col] & 1 == 1
+
+    def legal_moves(self):
+        # Internal cells, read from the per-board tables
+        occupied = self.occupied
+        if self.forced is not None:
+            return list(ULTIMATE_MOVES[self.forced][occupied >> 9 * self.forced & FULL_MASK])
+        moves = []
+        for b in ULTIMATE_OPEN[self.closed]:
+            moves.extend(ULTIMATE_MOVES[b][occupied >> 9 * b & FULL_MASK])
+        return moves
+
+    def is_legal(self, cell):
+        i = ULTIMATE_INTERNAL[cell]
+        b = i // 9
+        return (not self.occupied >> i & 1 and not self.closed >> b & 1
+                and (self.forced is None or self.forced == b))
+
+    def empty_cells(self):
+        return [divmod(ULTIMATE_DISPLAY[i], 9) for i in self.legal_moves()]
+
+    def settle(self, b):
+        # Recompute the cached result of small board b
+        bit = 1 << b
+        self.closed &= ~bit
+        for symbol, mask in self.masks.items():
+            if WINNING[mask >> 9 * b & FULL_MASK]:
+                self.meta[symbol] = self.meta.get(symbol, 0) | bit
+                self.closed |= bit
+            elif symbol in self.meta:
+                self.meta[symbol] &= ~bit
+        if self.occupied >> 9 * b & FULL_MASK == FULL_MASK:
+            self.closed |= bit
+
+    def update_forced(self):
+        if not self.moves:
+            self.forced = None
+        else:
+            target = self.moves[-1] % 9
+            self.forced = None if self.closed >> target & 1 else target
+
+    def add_to_board(self, row, col, symbol):
+        cell = row * 9 + col
+        i = ULTIMATE_INTERNAL[cell]
+        self.masks[symbol] = self.masks.get(symbol, 0) | 1 << i
+        self.occupied |= 1 << i
+        self.hash ^= zobrist_key(cell, symbol)
+        self.moves.append(i)
+        self.settle(i // 9)
+        self.update_forced()
+        self.last_move = (cell, symbol)
+
+    def remove_from_board(self, row, col):
+        cell = row * 9 + col
+        i = ULTIMATE_INTERNAL[cell]
+        for symbol, mask in self.masks.items():
+            if mask >> i & 1:
+                self.masks[symbol] = mask & ~(1 << i)
+                self.hash ^= zobrist_key(cell, symbol)
+        self.occupied &= ~(1 << i)
+        if i in self.moves:
+            self.moves.remove(i)
+        self.settle(i // 9)
+        self.update_forced()
+        self.last_move = None
+
+    def symbol_at(self, row, col):
+        i = ULTIMATE_INTERNAL[row * 9 + col]
+        for symbol, mask in self.masks.items():
+            if mask >> i & 1:
+                return symbol
+        return "-"
+
+    def board_winner(self, b):
+        for symbol, won in self.meta.items():
+            if won >> b & 1:
+                return symbol
+        return None
+
+    def line_through(self, cell, symbol):
+        # Every cell of the three small boards in a completed meta line through cell's board
+        b = ULTIMATE_INTERNAL[cell] // 9
+        won = self.meta.get(symbol, 0)
+        for line in WIN_MASKS:
+            if line >> b & 1 and won & line == line:
+                return sorted(divmod(ULTIMATE_DISPLAY[i], 9) for i in range(81) if line >> (i // 9) & 1)
+        return []
+
+    def winning_line(self, symbol):
+        won = self.meta.get(symbol, 0)
+        for line in WIN_MASKS:
+            if won & line == line:
+                return sorted(divmod(ULTIMATE_DISPLAY[i], 9) for i in range(81) if line >> (i // 9) & 1)
+        return []
+
+    def is_win(self, symbol):
+        return bool(WINNING[self.meta.get(symbol, 0)])
+
+    def is_full(self):
+        return self.closed == FULL_MASK
+
+    def threat_cells(self, symbol):
+        # Legal cells that would win a small board for symbol
+        mask = self.masks.get(symbol, 0)
+        return {ULTIMATE_DISPLAY[i] for i in self.legal_moves() if WINNING[(mask >> (i - i % 9) & FULL_MASK) | 1 << i % 9]}
+
+    def fork_cells(self, symbol):
+        return set()
+
+    def center_cells(self):
+        return {ULTIMATE_DISPLAY[i] for i in self.legal_moves() if i % 9 == 4}
+
+    def copy(self):
+        board = UltimateBoard.__new__(UltimateBoard)
+        board.__dict__.update(self.__dict__)
+        board.masks = dict(self.masks)
+        board.meta = dict(self.meta)
+        board.moves = list(self.moves)
+        return board
+
+    def grid(self):
+        return [[self.symbol_at(r, c) for c in range(9)] for r in range(9)]
+
+# --- Monte Carlo Tree Search ---
+# UCT with the game rules behind a small interface (start, moves, play, rollout), so the
+# same search plays any rows x cols x win_length board and Ultimate tic-tac-toe.
+OPEN, WON, TIED = 0, 1, 2
+MCTS_KEPT_SUBTREES = 512  # reusable subtrees kept across all games being searched
+
+class MaskRules:
+    # State: (mover mask, other mask) in board cell numbering
+    def __init__(self, board):
+        self.size = board.size
+        self.full_mask = board.full_mask
+        self.tag = (board.rows, board.cols, board.win_length)
+        if board.is_classic():
+            self.wins = lambda mask, cell: WINNING[mask]
+        else:
+            self.wins = functools.partial(self.wins_through, self.tag)
+
+    @staticmethod
+    def wins_through(geometry, mask, cell):
+        return has_line(mask, cell, *geometry)
+
+    def start(self, board, symbol, opponent):
+        return board.masks.get(symbol, 0), board.masks.get(opponent, 0)
+
+    def moves(self, state):
+        occupied = state[0] | state[1]
+        return [c for c in range(self.size) if not occupied >> c & 1]
+
+    def play(self, state, move):
+        mover, other = state
+        mover |= 1 << move
+        if self.wins(mover, move):
+            outcome = WON
+        elif mover | other == self.full_mask:
+            outcome = TIED
+        else:
+            outcome = OPEN
+        return (other, mover), outcome
+
+    def advance(self, state, move):
+        # play() without the outcome, for walking down the tree
+        return state[1], state[0] | 1 << move
+
+    def rollout(self, state, moves):
+        # Uniformly random playout over the leaf's legal moves, checking only lines through each new stone
+        mover, other = state
+        cells = moves[:]
+        random.shuffle(cells)
+        wins = self.wins
+        side = 0
+        for cell in cells:
+            mover |= 1 << cell
+            if wins(mover, cell):
+                return side
+            mover, other = other, mover
+            side ^= 1
+        return None
+
+    def board_cell(self, move):
+        return move
+
+class UltimateRules:
+    # State: (mover cells, other cells, mover's boards, other's boards, closed boards, forced board or -1)
+    tag = ('ultimate',)
+
+    def start(self, board, symbol, opponent):
+        return (board.masks.get(symbol, 0), board.masks.get(opponent, 0), board.meta.get(symbol, 0),
+                board.meta.get(opponent, 0), board.closed, -1 if board.forced is None else board.forced)
+
+    def moves(self, state):
+        occupied = state[0] | state[1]
+        closed, forced = state[4], state[5]
+        if forced >= 0:
+            return list(ULTIMATE_MOVES[forced][occupied >> 9 * forced & FULL_MASK])
+        moves = []
+        for b in ULTIMATE_OPEN[closed]:
+            moves.extend(ULTIMATE_MOVES[b][occupied >> 9 * b & FULL_MASK])
+        return moves
+
+    def play(self, state, move):
+        mover, other, mover_won, other_won, closed, _ = state
+        mover |= 1 << move
+        b = move // 9
+        outcome = OPEN
+        if WINNING[mover >> 9 * b & FULL_MASK]:
+            mover_won |= 1 << b
+            closed |= 1 << b
+            if WINNING[mover_won]:
+                outcome = WON
+        elif (mover | other) >> 9 * b & FULL_MASK == FULL_MASK:
+            closed |= 1 << b
+        if outcome == OPEN and closed == FULL_MASK:
+            outcome = TIED
+        target = move % 9
+        return (other, mover, other_won, mover_won, closed, -1 if closed >> target & 1 else target), outcome
+
+    def advance(self, state, move):
+        return self.play(state, move)[0]
+
+    def rollout(self, state, moves):
+        # play() and moves() inlined, random() instead of choice(): rollouts run ~50 moves
+        # and dominate the search time
+        mover, other, mover_won, other_won, closed, _ = state
+        table, winning, rand = ULTIMATE_MOVES, WINNING, random.random
+        move = moves[int(rand() * len(moves))]
+        side = 0
+        while True:
+            mover |= 1 << move
+            b = move // 9
+            if winning[mover >> 9 * b & FULL_MASK]:
+                mover_won |= 1 << b
+                closed |= 1 << b
+                if winning[mover_won]:
+                    return side
+            elif (mover | other) >> 9 * b & FULL_MASK == FULL_MASK:
+                closed |= 1 << b
+            if closed == FULL_MASK:
+                return None
+            mover, other, mover_won, other_won = other, mover, other_won, mover_won
+            side ^= 1
+            occupied = mover | other
+            target = move % 9
+            if not closed >> target & 1:
+                moves = table[target][occupied >> 9 * target & FULL_MASK]
+            else:
+                moves = []
+                for b in ULTIMATE_OPEN[closed]:
+                    moves += table[b][occupied >> 9 * b & FULL_MASK]
+            move = moves[int(rand() * len(moves))]
+
+    def board_cell(self, move):
+        return ULTIMATE_DISPLAY[move]
+
+class MCTSNode:
+    __slots__ = ('move', 'children', 'untried', 'visits', 'wins', 'outcome')
+
+    def __init__(self, move, untried, outcome=OPEN):
+        self.move = move          # move played to reach this node
+        self.children = {}        # move -> MCTSNode
+        self.untried = untried    # legal moves not expanded yet
+        self.visits = 0
+        self.wins = 0.0           # from the side that played self.move; ties count half
+        self.outcome = outcome    # WON when self.move won the game
+
+class MCTSAI:
+    def __init__(self, time_limit=1.0, playouts=2000, exploration=1.4):
+        self.time_limit = time_limit  # seconds per move, or None
+        self.playouts = playouts      # playouts per move, or None; whichever runs out first
+        self.exploration = exploration
+        # Each search grows its own tree, so concurrent searches (server worker threads) only
+        # share the kept subtrees and the stats, and the lock guards just those
+        self.lock = threading.Lock()
+        # (rules tag, symbol to move, Zobrist hash, last cell) -> (subtree, keys kept by the same search)
+        self.reusable = collections.OrderedDict()
+        self.last_playouts = 0
+        self.last_elapsed = 0.0
+        self.total_playouts = 0
+        self.total_elapsed = 0.0
+        self.reused = 0
+
+    def reset_stats(self):
+        self.total_playouts = 0
+        self.total_elapsed = 0.0
+        self.reused = 0
+
+    def stats(self):
+        return {'playouts': self.total_playouts, 'seconds': self.total_elapsed, 'reused_trees': self.reused,
+                'playouts_per_second': self.total_playouts / self.total_elapsed if self.total_elapsed else 0.0,
+                'last_playouts': self.last_playouts}
+
+    def choose(self, board, symbol, opponent):
+        return divmod(self.search(board, symbol, opponent), board.cols)
+
+    def search(self, board, symbol, opponent):
+        rules = UltimateRules() if board.win_length == ULTIMATE else MaskRules(board)
+        state = rules.start(board, symbol, opponent)
+        # The board's Zobrist hash (plus the last move, which decides the Ultimate target board)
+        # finds the subtree kept from our previous move
+        last_cell = board.last_move[0] if board.last_move else None
+        with self.lock:
+            # Taking the subtree drops its siblings: that game has moved past them
+            kept = self.reusable.pop((rules.tag, symbol, board.hash, last_cell), None)
+            if kept is not None:
+                self.reused += 1
+                for key in kept[1]:
+                    self.reusable.pop(key, None)
+        root = kept[0] if kept is not None else MCTSNode(None, rules.moves(state))
+        start = time.perf_counter()
+        count = self.grow(rules, root, state, self.time_limit, self.playouts)
+        elapsed = time.perf_counter() - start
+        best = max(root.children.values(), key=lambda child: child.visits)
+        # Keep the subtrees for each opponent reply, keyed by the position they start from
+        best_cell = rules.board_cell(best.move)
+        after = board.hash ^ zobrist_key(best_cell, symbol)
+        replies = {(rules.tag, symbol, after ^ zobrist_key(rules.board_cell(move), opponent), rules.board_cell(move)): child
+                   for move, child in best.children.items() if child.outcome == OPEN}
+        with self.lock:
+            self.last_playouts, self.last_elapsed = count, elapsed
+            self.total_playouts += count
+            self.total_elapsed += elapsed
+            keys = tuple(replies)
+            for key, child in replies.items():
+                self.reusable[key] = (child, keys)
+            while len(self.reusable) > MCTS_KEPT_SUBTREES:
+                self.reusable.popitem(last=False)
+        return best_cell
+
+    def grow(self, rules, root, state, time_limit, playouts):
+        # Playouts from root until either budget runs out; returns how many ran
+        deadline = time.perf_counter() + time_limit if time_limit else None
+        count = 0
+        while True:
+            self.playout(rules, root, state)
+            count += 1
+            if playouts and count >= playouts:
+                return count
+            if deadline is not None and count & 15 == 0 and time.perf_counter() >= deadline:
+                return count
+
+    def playout(self, rules, root, state):
+        # Select, expand, simulate, backpropagate
+        node = root
+        path = [root]
+        c = self.exploration
+        while not node.untried and node.children:
+            log_visits = math.log(node.visits)
+            node = max(node.children.values(),
+                       key=lambda child: child.wins / child.visits + c * math.sqrt(log_visits / child.visits))
+            state = rules.advance(state, node.move)
+            path.append(node)
+        if node.untried:
+            untried = node.untried
+            i = random.randrange(len(untried))
+            move = untried[i]
+            untried[i] = untried[-1]
+            untried.pop()
+            state, outcome = rules.play(state, move)
+            child = MCTSNode(move, rules.moves(state) if outcome == OPEN else [], outcome)
+            node.children[move] = child
+            node = child
+            path.append(node)
+        # winner: 0 = the side to move at the leaf, 1 = the side that just moved, None = tie
+        if node.outcome == WON:
+            winner = 1
+        elif node.outcome == TIED:
+            winner = None
+        else:
+            winner = rules.rollout(state, node.untried)
+        side = 1
+        for node in reversed(path):
+            node.visits += 1
+            if winner is None:
+                node.wins += 0.5
+            elif winner == side:
+                node.wins += 1
+            side ^= 1
+
+MCTS_AI = MCTSAI()
+
+def choose_easy_move(board, symbol, opponent):
+    return random.choice(board.empty_cells())
+
+def medium_candidates(board, symbol, opponent):
+    # Win, else block, else fork, else take the center, else anywhere
+    for cells in (board.threat_cells(symbol), board.threat_cells(opponent), board.fork_cells(symbol), board.center_cells()):
+        if cells:
+            return sorted(cells)
+    return [board.cell(r, c) for r, c in board.empty_cells()]
+
+def choose_medium_move(board, symbol, opponent):
+    return divmod(random.choice(medium_candidates(board, symbol, opponent)), board.cols)
+
+# ai_mode -> move function(board, symbol, opponent_symbol) -> (row, col)
+AI_STRATEGIES = {
+    'easy': choose_easy_move,
+    'medium': choose_medium_move,
+    'hard': choose_hard_move,
+    'mcts': MCTS_AI.choose,
+}
+
+def register_ai(name, move_fn):
+    AI_STRATEGIES[name] = move_fn
+
+def ai_search_counts():
+    # (nodes searched, cache hits) so far across the built-in searching AIs
+    table_hits = _solved_table.hits if _solved_table is not None else 0
+    return HARD_AI.nodes + MCTS_AI.total_playouts, HARD_AI.cache_hits + table_hits
+
+def choose_ai_move(mode, board, symbol, opponent):
+    strategy = AI_STRATEGIES.get(mode, choose_easy_move)
+    if METRICS is None:
+        return strategy(board, symbol, opponent)
+    nodes, hits = ai_search_counts()
+    started = time.perf_counter()
+    move = strategy(board, symbol, opponent)
+    METRICS.timing('ai_think_seconds', time.perf_counter() - started, mode=mode)
+    after_nodes, after_hits = ai_search_counts()
+    METRICS.count('ai_moves_total', mode=mode)
+    METRICS.count('ai_nodes_total', after_nodes - nodes, mode=mode)
+    METRICS.count('ai_cache_hits_total', after_hits - hits, mode=mode)
+    return move
+
+def load_ai_plugin(spec):
+    # "name=package.module:function" registers function as the ai_mode "name"
+    name, _, target = spec.partition('=')
+    module_name, _, attr = target.partition(':')
+    if not name or not module_name or not attr:
+        raise ValueError(f"Invalid bot spec {spec!r}; expected name=module:function")
+    module = importlib.import_module(module_name)
+    register_ai(name, getattr(module, attr))
+    return name
+
+# --- Background AI Search ---
+# AISearch runs one AI move on a thread so the GUI (or a console progress line) keeps
+# going. With more than one worker, MCTS is root-parallel across a process pool: every
+# worker grows its own tree for the position in short slices and reports the root visits
+# gained since its last report, and the summed visits pick the move. Short slices are
+# what make the deadline, cancellation and best-move-so-far cheap.
+AI_WORKERS = 1       # processes per MCTS move for the console and command line; the GUI uses every core
+SEARCH_SLICE = 0.1   # seconds of search per worker task
+_search_pool = None  # (workers, ProcessPoolExecutor)
+_worker_tree = None  # in a worker process: [search id, rules, state, root, visits already reported]
+
+def get_search_pool(workers):
+    # Workers are spawned, not forked: the GUI asks for them from a process already running
+    # Tk and search threads, and a forked child would inherit their locks mid-use
+    global _search_pool
+    if _search_pool is None or _search_pool[0] != workers:
+        import concurrent.futures
+        import multiprocessing
+        if _search_pool is not None:
+            _search_pool[1].shutdown(wait=False, cancel_futures=True)
+        else:
+            atexit.register(lambda: _search_pool[1].shutdown(wait=False, cancel_futures=True))
+        _search_pool = (workers, concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')))
+    return _search_pool[1]
+
+def mcts_slice(search_id, board, symbol, opponent, seconds, seed):
+    # Worker: continue this process's tree for search_id for about seconds.
+    # Returns (playouts, {board cell: (new visits, new wins)}) for the root moves.
+    global _worker_tree
+    if _worker_tree is None or _worker_tree[0] != search_id:
+        rules = UltimateRules() if board.win_length == ULTIMATE else MaskRules(board)
+        state = rules.start(board, symbol, opponent)
+        _worker_tree = [search_id, rules, state, MCTSNode(None, rules.moves(state)), {}]
+    _, rules, state, root, reported = _worker_tree
+    random.seed(seed)
+    count = MCTS_AI.grow(rules, root, state, seconds, None)
+    gained = {}
+    for move, child in root.children.items():
+        visits, wins = reported.get(move, (0, 0.0))
+        if child.visits > visits:
+            gained[rules.board_cell(move)] = (child.visits - visits, child.wins - wins)
+            reported[move] = (child.visits, child.wins)
+    return count, gained
+
+class AISearch:
+    def __init__(self, mode, board, symbol, opponent, time_limit=None, workers=None):
+        self.mode = mode
+        self.board = board.copy()  # the caller's board may change while we search
+        self.symbol = symbol
+        self.opponent = opponent
+        self.time_limit = time_limit or MCTS_AI.time_limit or 1.0  # per-move deadline for the parallel search
+        self.workers = workers or AI_WORKERS
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+        self.move = None      # (row, col) once a serial search returns
+        self.visits = {}      # board cell -> [visits, wins] summed over the workers' trees
+        self.playouts = 0
+        self.started = time.perf_counter()
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def run(self):
+        try:
+            if self.mode == 'mcts' and self.workers > 1:
+                self.run_parallel()
+            else:
+                self.move = choose_ai_move(self.mode, self.board, self.symbol, self.opponent)
+        finally:
+            self.done.set()
+
+    def run_parallel(self):
+        import concurrent.futures
+        pool = get_search_pool(self.workers)
+        search_id = random.getrandbits(64)
+        deadline = self.started + self.time_limit
+        def submit():
+            seconds = max(0.001, min(SEARCH_SLICE, deadline - time.perf_counter()))
+            return pool.submit(mcts_slice, search_id, self.board, self.symbol, self.opponent, seconds, random.getrandbits(64))
+        pending = {submit() for _ in range(self.workers)}
+        while pending and not self.cancelled.is_set():
+            done, pending = concurrent.futures.wait(pending, timeout=SEARCH_SLICE, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                count, gained = future.result()
+                self.playouts += count
+                for cell, (visits, wins) in gained.items():
+                    totals = self.visits.setdefault(cell, [0, 0.0])
+                    totals[0] += visits
+                    totals[1] += wins
+                if deadline - time.perf_counter() > 0.005 and not self.cancelled.is_set():
+                    pending.add(submit())
+        # On cancel the slices still running end within SEARCH_SLICE; their results are dropped
+        elapsed = time.perf_counter() - self.started
+        with MCTS_AI.lock:
+            MCTS_AI.last_playouts, MCTS_AI.last_elapsed = self.playouts, elapsed
+            MCTS_AI.total_playouts += self.playouts
+            MCTS_AI.total_elapsed += elapsed
+        if METRICS is not None:
+            METRICS.timing('ai_think_seconds', elapsed, mode=self.mode)
+            METRICS.count('ai_moves_total', mode=self.mode)
+            METRICS.count('ai_nodes_total', self.playouts, mode=self.mode)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def best(self):
+        # The finished move, else the most visited root move so far, else a quick heuristic move
+        if self.move is not None:
+            return self.move
+        if self.visits:
+            return divmod(max(self.visits, key=lambda cell: self.visits[cell][0]), self.board.cols)
+        return choose_medium_move(self.board, self.symbol, self.opponent)
+
+    def wait(self):
+        self.done.wait()
+        return self.best()
+
+    def status(self):
+        # One line of progress for the GUI and console
+        elapsed = time.perf_counter() - self.started
+        if not self.visits:
+            return f"{elapsed:.1f}s"
+        cell = max(self.visits, key=lambda c: self.visits[c][0])
+        visits, wins = self.visits[cell]
+        return (f"{min(1.0, elapsed / self.time_limit):.0%}, {self.playouts:,} playouts, "
+                f"best {cell + 1} ({wins / visits:.0%})")
+
+def search_move(mode, board, symbol, opponent):
+    # choose_ai_move, split across AI_WORKERS processes for MCTS
+    if mode != 'mcts' or AI_WORKERS < 2:
+        return choose_ai_move(mode, board, symbol, opponent)
+    return AISearch(mode, board, symbol, opponent).wait()
+
+# --- Game Engine ---
+# The rules with no I/O. step() takes a cell, a (row, col) pair, 'undo' or 'redo' and
+# returns what happened as events; the console, GUI, server and simulator only render them.
+EVENT_MOVE, EVENT_WIN, EVENT_TIE, EVENT_UNDO, EVENT_REDO = 'move', 'win', 'tie', 'undo', 'redo'
+GameEvent = collections.namedtuple('GameEvent', 'kind player_index symbol cell line')
+
+class IllegalMove(ValueError):
+    pass
+
+class GameEngine:
+    def __init__(self, symbols=('X', 'O'), rows=3, cols=3, win_length=3):
+        self.board = make_board(rows, cols, win_length)
+        self.symbols = symbols
+        self.current = 0
+        self.turns = 0
+        self.over = False
+        self.winner = None  # index of the winning player once over, None for a tie
+        self.history = GameHistory()
+
+    @property
+    def move_history(self):
+        return self.history.moves(self.board.cols)
+
+    def is_taken(self, row, col):
+        return self.board.is_taken(row, col)
+
+    def is_win(self, symbol):
+        return self.board.is_win(symbol)
+
+    def is_tie(self):
+        return self.board.is_full()
+
+    def step(self, move):
+        if move == EVENT_UNDO:
+            return self.undo()
+        if move == EVENT_REDO:
+            return self.redo()
+        if self.over:
+            raise IllegalMove("The game is over.")
+        if isinstance(move, int):
+            cell = move
+        else:
+            row, col = move
+            # Check both coordinates: an out-of-range col would wrap onto another row's cell
+            if not (0 <= row < self.board.rows and 0 <= col < self.board.cols):
+                raise IllegalMove("Cell out of bounds.")
+            cell = row * self.board.cols + col
+        if not 0 <= cell < self.board.size:
+            raise IllegalMove("Cell out of bounds.")
+        if not self.board.is_legal(cell):
+            if self.board.is_taken(cell // self.board.cols, cell % self.board.cols):
+                raise IllegalMove("Position already taken.")
+            raise IllegalMove("That board is not in play.")
+        index = self.current
+        symbol = self.symbols[index]
+        self.board.add_to_board(cell // self.board.cols, cell % self.board.cols, symbol)
+        self.history.play(cell, symbol, index)
+        self.turns += 1
+        return [GameEvent(EVENT_MOVE, index, symbol, cell, None)] + self.outcome(index, symbol, cell)
+
+    def outcome(self, index, symbol, cell):
+        # Ends the game or passes the turn after index's stone at cell
+        line = self.board.line_through(cell, symbol)
+        if line:
+            self.over, self.winner = True, index
+            return [GameEvent(EVENT_WIN, index, symbol, cell, tuple(self.board.cell(r, c) for r, c in line))]
+        if self.board.is_full():
+            self.over, self.winner = True, None
+            return [GameEvent(EVENT_TIE, None, None, None, None)]
+        self.current = 1 - index
+        return []
+
+    def undo(self):
+        state = self.history.undo()
+        if state is None:
+            raise IllegalMove("Nothing to undo.")
+        self.board.remove_from_board(state.cell // self.board.cols, state.cell % self.board.cols)
+        self.turns -= 1
+        self.current = state.player_index
+        self.over, self.winner = False, None
+        return [GameEvent(EVENT_UNDO, state.player_index, state.symbol, state.cell, None)]
+
+    def redo(self):
+        if self.over:
+            raise IllegalMove("The game is over.")
+        state = self.history.redo()
+        if state is None:
+            raise IllegalMove("Nothing to redo.")
+        self.board.add_to_board(state.cell // self.board.cols, state.cell % self.board.cols, state.symbol)
+        self.turns += 1
+        return ([GameEvent(EVENT_REDO, state.player_index, state.symbol, state.cell, None)] +
+                self.outcome(state.player_index, state.symbol, state.cell))
+
+    def goto(self, state):
+        # Switch the board to any state in the history tree, e.g. another variation
+        undone, replayed = self.history.move_to(state)
+        for step in undone:
+            self.board.remove_from_board(*divmod(step.cell, self.board.cols))
+        for step in replayed:
+            self.board.add_to_board(*divmod(step.cell, self.board.cols), step.symbol)
+        self.turns = state.turns
+        self.current = 0 if state.parent is None else 1 - state.player_index
+        self.over, self.winner = False, None
+        if state.parent is not None:
+            self.outcome(state.player_index, state.symbol, state.cell)
+
+class TicTacToeGame(GameEngine):
+    # Console front-end: players, prompts and printing around the engine
+    def __init__(self, player1, player2, ai_mode=None, rows=3, cols=3, win_length=3):
+        super().__init__((player1.symbol, player2.symbol), rows, cols, win_length)
+        self.players = [player1, player2]
+        self.ai_mode = ai_mode  # None, 'easy', etc.
+
+    def print_board(self):
+        for line in board_lines(self.board):
+            print(line)
+        if self.board.win_length == ULTIMATE:
+            won = " ".join(self.board.board_winner(b) or "-" for b in range(9))
+            # No next-board hint once the game is over: there is no next move
+            forced = None if self.over else self.board.forced
+            print(f"Boards won: {won}" + ("" if forced is None else f"  (next move in board {forced + 1})"))
+        print()
+
+    def get_move(self, player):
+        last = self.board.size
+        while True:
+            user_input = input(f"{player.name} ({player.symbol}), enter position 1-{last}, 'undo', 'redo', or 'q' to quit: ")
+            if user_input.lower() == 'q':
+                print("Thanks for playing!")
+                return None
+            if user_input.lower() == 'undo':
+                return 'undo'
+            if user_input.lower() == 'redo':
+                return 'redo'
+            if not user_input.isdigit():
+                print(f"Invalid input. Enter a number 1-{last}, 'undo', 'redo', or 'q'.")
+                continue
+            pos = int(user_input)
+            if pos < 1 or pos > last:
+                print(f"Number out of bounds. Enter 1-{last}.")
+                continue
+            return divmod(pos - 1, self.board.cols)
+
+    def get_ai_move_easy(self):
+        return random.choice(self.board.empty_cells())
+
+    def get_ai_move_hard(self):
+        player = self.players[self.current]
+        opponent = self.players[1 - self.current]
+        return choose_hard_move(self.board, player.symbol, opponent.symbol)
+
+    def get_ai_move(self):
+        player = self.players[self.current]
+        opponent = self.players[1 - self.current]
+        mode = player.ai_mode or self.ai_mode
+        if mode != 'mcts' or AI_WORKERS < 2:
+            return choose_ai_move(mode, self.board, player.symbol, opponent.symbol)
+        search = AISearch(mode, self.board, player.symbol, opponent.symbol)
+        try:
+            while not search.done.wait(0.25):
+                print(f"\rAI thinking... {search.status()}  ", end="", flush=True)
+        except KeyboardInterrupt:
+            search.cancel()  # Ctrl+C plays the best move found so far
+            search.done.wait()
+        print()
+        return search.best()
+
+    def play_ai_game(self, strategies):
+        # Headless game between two move functions; returns the winner's index or None for a tie
+        while not self.over:
+            index = self.current
+            self.step(strategies[index](self.board, self.symbols[index], self.symbols[1 - index]))
+        game_finished(self.winner, 'headless')
+        return self.winner
+
+    def play(self):
+        while True:
+            self.print_board()
+            player = self.players[self.current]
+            if player.is_ai:
+                move = self.get_ai_move()
+                print(f"AI ({player.symbol}) chooses position {self.board.cell(*move) + 1}")
+            else:
+                started = time.perf_counter()
+                move = self.get_move(player)
+                if METRICS is not None:
+                    METRICS.timing('input_wait_seconds', time.perf_counter() - started, source='console')
+                if move is None:
+                    break
+            # Replaying a move that was undone earlier re-enters that variation, so redo continues along it
+            try:
+                events = self.step(move)
+            except IllegalMove as e:
+                print(e)
+                continue
+            for event in events:
+                if event.kind == EVENT_UNDO:
+                    print("Move undone.")
+                elif event.kind == EVENT_REDO:
+                    print("Move redone.")
+                elif event.kind == EVENT_WIN:
+                    winner = self.players[event.player_index]
+                    self.print_board()
+                    print(f"{winner.name} ({winner.symbol}) wins!")
+                    update_scoreboard(winner.name, self.players[0], self.players[1])
+                elif event.kind == EVENT_TIE:
+                    self.print_board()
+                    print("It's a tie!")
+                    update_scoreboard('tie', self.players[0], self.players[1])
+            if self.over:
+                record_game(self.players, self.board, self.move_history, self.winner)
+                game_finished(self.winner, 'console')
+                break
+
+# --- Batch Self-Play Simulator ---
+# Plays many classic 3x3 games at once: all boards live in one (2, N) uint16 array of
+# bitmasks, every move is applied with one vectorized OR and wins are checked with one
+# lookup into a table of the line-mask test precomputed for all 512 masks.
+# 2520 is divisible by 1..9, so "r % count" is an exactly uniform pick
+CHOICE_RANGE = 2520
+
+@functools.lru_cache(maxsize=None)
+def batch_tables():
+    winning = np.frombuffer(bytes(WINNING), dtype=np.uint8).astype(bool)
+    cell_bits = (1 << np.arange(9)).astype(np.uint16)
+    popcount = np.array([bin(m).count("1") for m in range(FULL_MASK + 1)], dtype=np.int64)
+    ternary = np.array(TERNARY, dtype=np.int64)
+    # nth_bit[mask, k] is the k-th set cell of mask
+    nth_bit = np.zeros((FULL_MASK + 1, 9), dtype=np.int64)
+    for mask in range(FULL_MASK + 1):
+        for k, cell in enumerate(c for c in range(9) if mask >> c & 1):
+            nth_bit[mask, k] = cell
+    return winning, cell_bits, popcount, ternary, nth_bit
+
+def pick_random_cells(masks, rng):
+    _, _, popcount, _, nth_bit = batch_tables()
+    r = rng.integers(0, CHOICE_RANGE, size=masks.shape[0])
+    return nth_bit[masks, r % popcount[masks]]
+
+def random_policy(me, opp, rng):
+    # Same distribution as get_ai_move_easy: uniform over empty cells
+    return pick_random_cells(FULL_MASK & ~(me | opp), rng)
+
+def make_table_policy(moves):
+    # moves: array of candidate-move masks indexed by position_index(first, second)
+    _, _, popcount, ternary, _ = batch_tables()
+    moves = np.asarray(moves, dtype=np.uint16) & FULL_MASK
+    def table_policy(me, opp, rng):
+        first_to_move = popcount[me] == popcount[opp]
+        index = np.where(first_to_move, ternary[me] + 2 * ternary[opp], ternary[opp] + 2 * ternary[me])
+        candidates = moves[index]
+        # Positions missing from the table fall back to any empty cell
+        candidates = np.where(candidates == 0, FULL_MASK & ~(me | opp), candidates)
+        return pick_random_cells(candidates, rng)
+    return table_policy
+
+def solved_table_policy():
+    table = get_solved_table()
+    if table is None:
+        raise RuntimeError(f"{SOLVED_TABLE_FILE} is missing; run build-table first")
+    records = np.frombuffer(table.data, dtype='<u2', count=SOLVED_TABLE_RECORDS, offset=SOLVED_TABLE_HEADER.size)
+    return make_table_policy(records)
+
+@functools.lru_cache(maxsize=None)
+def medium_move_table():
+    # medium_candidates for every legal 3x3 position, as cell masks indexed by position_index
+    moves = [0] * SOLVED_TABLE_RECORDS
+    for first in range(FULL_MASK + 1):
+        if WINNING[first]:
+            continue
+        for second in range(FULL_MASK + 1):
+            if first & second or WINNING[second] or (first | second) == FULL_MASK:
+                continue
+            lead = bin(first).count("1") - bin(second).count("1")
+            if lead not in (0, 1):
+                continue
+            board = BitBoard()
+            for symbol, mask in (('X', first), ('O', second)):
+                for cell in range(9):
+                    if mask >> cell & 1:
+                        board.add_to_board(cell // 3, cell % 3, symbol)
+            mover, other = ('X', 'O') if lead == 0 else ('O', 'X')
+            moves[position_index(first, second)] = sum(1 << cell for cell in medium_candidates(board, mover, other))
+    return moves
+
+BATCH_POLICIES = {
+    'easy': lambda: random_policy,
+    'medium': lambda: make_table_policy(medium_move_table()),
+    'hard': lambda: solved_table_policy(),
+}
+
+def simulate_batch(n_games, first='easy', second='easy', seed=None):
+    # Returns how many games the first player won, the second player won, and how many were tied
+    if not load_numpy():
+        raise RuntimeError("The batch simulator requires NumPy (pip install numpy)")
+    winning, cell_bits, _, _, _ = batch_tables()
+    policies = [BATCH_POLICIES[p]() if isinstance(p, str) else p for p in (first, second)]
+    rng = np.random.default_rng(seed)
+    boards = np.zeros((2, n_games), dtype=np.uint16)
+    wins = [0, 0]
+    active = np.arange(n_games)
+    for turn in range(9):
+        side = turn & 1
+        mover = boards[side, active]
+        cells = policies[side](mover, boards[1 - side, active], rng)
+        mover |= cell_bits[cells]
+        boards[side, active] = mover
+        won = winning[mover]
+        wins[side] += int(np.count_nonzero(won))
+        active = active[~won]
+        if not active.size:
+            break
+    return {'first': wins[0], 'second': wins[1], 'tie': n_games - wins[0] - wins[1]}
+
+def simulate_games(n_games, first='easy', second='easy', seed=None):
+    # simulate_batch when NumPy is installed, otherwise the same counts from a plain game loop
+    if load_numpy() and first in BATCH_POLICIES and second in BATCH_POLICIES:
+        return simulate_batch(n_games, first, second, seed)
+    random.seed(seed)
+    wins = [0, 0]
+    for _ in range(n_games):
+        game = TicTacToeGame(Player(first, 'X', is_ai=True), Player(second, 'O', is_ai=True))
+        winner = game.play_ai_game([AI_STRATEGIES[first], AI_STRATEGIES[second]])
+        if winner is not None:
+            wins[winner] += 1
+    return {'first': wins[0], 'second': wins[1], 'tie': n_games - wins[0] - wins[1]}
+
+# --- AI Tournament ---
+def play_pairing(name_a, name_b, games, seed, plugins=()):
+    # Worker: plays one chunk of a pairing headless, alternating who moves first.
+    # Returns (a wins, b wins, ties).
+    for spec in plugins:
+        load_ai_plugin(spec)
+    random.seed(seed)
+    tally = [0, 0, 0]
+    for i in range(games):
+        a_first = i % 2 == 0
+        first, second = (name_a, name_b) if a_first else (name_b, name_a)
+        game = TicTacToeGame(Player(first, 'X', is_ai=True), Player(second, 'O', is_ai=True), ai_mode=first)
+        winner = game.play_ai_game([AI_STRATEGIES[first], AI_STRATEGIES[second]])
+        if winner is None:
+            tally[2] += 1
+        elif (winner == 0) == a_first:
+            tally[0] += 1
+        else:
+            tally[1] += 1
+    return tuple(tally)
+
+def score_interval(wins, losses, ties, z=1.96):
+    # Mean score (win 1, tie 0.5, loss 0) with a normal-approximation confidence interval
+    n = wins + losses + ties
+    if n == 0:
+        return 0.0, 0.0, 0.0
+    p = (wins + 0.5 * ties) / n
+    variance = (wins * (1 - p) ** 2 + losses * p ** 2 + ties * (0.5 - p) ** 2) / n
+    margin = z * math.sqrt(variance / n)
+    return p, max(0.0, p - margin), min(1.0, p + margin)
+
+def run_tournament(bots, games=1000, workers=None, plugins=(), seed=None, chunks_per_worker=4):
+    workers = workers or os.cpu_count() or 1
+    pairings = [(a, b) for i, a in enumerate(bots) for b in bots[i + 1:]]
+    # Even-sized chunks keep each one balanced between moving first and second
+    chunk = max(2, games // (workers * chunks_per_worker) // 2 * 2)
+    base_seed = random.randrange(1 << 30) if seed is None else seed
+    results = {pairing: [0, 0, 0] for pairing in pairings}
+    import concurrent.futures
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for pairing in pairings:
+            for start in range(0, games, chunk):
+                size = min(chunk, games - start)
+                future = pool.submit(play_pairing, pairing[0], pairing[1], size, base_seed + len(futures), tuple(plugins))
+                futures[future] = pairing
+        for future in concurrent.futures.as_completed(futures):
+            tally = results[futures[future]]
+            for i, count in enumerate(future.result()):
+                tally[i] += count
+    return results
+
+def print_tournament(results):
+    print(f"{'Pairing':<24}{'Games':>8}{'W-L-T':>20}{'Score':>8}   95% CI")
+    for (a, b), (wins, losses, ties) in results.items():
+        p, low, high = score_interval(wins, losses, ties)
+        print(f"{a + ' vs ' + b:<24}{wins + losses + ties:>8}{f'{wins}-{losses}-{ties}':>20}{p:>8.3f}   [{low:.3f}, {high:.3f}]")
+
+# --- Session Store ---
+# Parked classic 3x3 games, 24 bytes each in parallel arrays (no object per game):
+#   state   64 bits: player 1 mask (0-8), player 2 mask (9-17), player to move (18),
+#           player 1 plays O (19), moves played (20-23), moves logged (24-27), then the
+#           log at 4 bits per cell (28-63); logged moves past the played ones are the redo line
+#   player1/player2  ids in the interned PlayerTable
+#   active  last use, in Unix seconds, for expiry
+#   tags    random per use of a slot, so a session id (tag << 24 | slot) can't be guessed
+#           and a stale id never reaches the slot's next game; 0 marks a free slot
+SESSION_MAGIC = b'TTSS\x01'  # unlike SOLVED_TABLE_MAGIC, which this must never prefix
+SESSION_HEADER = struct.Struct('<II')  # slots, players
+SESSION_TTL = 24 * 60 * 60
+SESSION_SLOT_BITS = 24
+
+class PlayerEntry:
+    __slots__ = ('name', 'ai_mode')
+
+    def __init__(self, name, ai_mode=None):
+        self.name = name
+        self.ai_mode = ai_mode  # None for a human
+
+class PlayerTable:
+    def __init__(self):
+        self.entries = []
+        self.ids = {}  # (name, ai_mode) -> index into entries
+
+    def intern(self, name, ai_mode=None):
+        key = (name, ai_mode)
+        player_id = self.ids.get(key)
+        if player_id is None:
+            player_id = self.ids[key] = len(self.entries)
+            self.entries.append(PlayerEntry(name, ai_mode))
+        return player_id
+
+    def __getitem__(self, player_id):
+        return self.entries[player_id]
+
+    def __len__(self):
+        return len(self.entries)
+
+def pack_game(game):
+    # TicTacToeGame on a 3x3 board -> 64-bit state (layout above)
+    history = game.history
+    cells = [state.cell for state in history.line()]
+    played = len(cells)
+    state = history.current
+    while state in history.redo_to:
+        state = history.redo_to[state]
+        cells.append(state.cell)
+    masks = [0, 0]
+    for i, cell in enumerate(cells[:played]):
+        masks[i & 1] |= 1 << cell
+    packed = masks[0] | masks[1] << 9 | game.current << 18 | (game.symbols[0] == 'O') << 19 | played << 20 | len(cells) << 24
+    for i, cell in enumerate(cells):
+        packed |= cell << (28 + 4 * i)
+    return packed
+
+def unpack_game(packed, player1, player2):
+    # Rebuilds the game (with its redo line) from pack_game's state and its two Players
+    played, logged = packed >> 20 & 0xF, packed >> 24 & 0xF
+    ai_mode = player1.ai_mode or player2.ai_mode
+    game = TicTacToeGame(player1, player2, ai_mode=ai_mode)
+    for i in range(logged):
+        game.step(packed >> (28 + 4 * i) & 0xF)
+    for _ in range(logged - played):
+        game.step(EVENT_UNDO)
+    masks = [game.board.masks.get(symbol, 0) for symbol in game.symbols]
+    if masks[0] | masks[1] << 9 != packed & 0x3FFFF or game.current != packed >> 18 & 1:
+        raise ValueError("Corrupt session state")
+    return game
+
+class SessionStore:
+    def __init__(self):
+        import array
+        self.states = array.array('Q')
+        self.player1 = array.array('I')
+        self.player2 = array.array('I')
+        self.active = array.array('I')
+        self.tags = array.array('I')
+        self.free = []  # slots to reuse
+        self.players = PlayerTable()
+
+    def __len__(self):
+        return len(self.tags) - len(self.free)
+
+    def slot(self, session_id):
+        # Slot of a live session id, else None
+        if not isinstance(session_id, int) or session_id < 0:
+            return None
+        slot = session_id & ((1 << SESSION_SLOT_BITS) - 1)
+        if slot >= len(self.tags) or not self.tags[slot] or self.tags[slot] != session_id >> SESSION_SLOT_BITS:
+            return None
+        return slot
+
+    def intern_players(self, game):
+        # An AI seat is stored with the game's ai_mode so a restored game knows how to move
+        return [self.players.intern(player.name, (player.ai_mode or game.ai_mode) if player.is_ai else None)
+                for player in game.players]
+
+    def put(self, game, now=None):
+        if not game.board.is_classic():
+            raise ValueError("Only 3x3 games can be stored")
+        first, second = self.intern_players(game)
+        tag = random.randrange(1, 1 << 32)
+        now = int(now or time.time())
+        if self.free:
+            slot = self.free.pop()
+            self.states[slot], self.player1[slot], self.player2[slot] = pack_game(game), first, second
+            self.active[slot], self.tags[slot] = now, tag
+        else:
+            slot = len(self.tags)
+            if slot >> SESSION_SLOT_BITS:
+                raise MemoryError("Session store is full")
+            self.states.append(pack_game(game))
+            self.player1.append(first)
+            self.player2.append(second)
+            self.active.append(now)
+            self.tags.append(tag)
+        return tag << SESSION_SLOT_BITS | slot
+
+    def update(self, session_id, game, now=None):
+        # Stores the game's current state; False if the session has expired or is unknown
+        slot = self.slot(session_id)
+        if slot is None:
+            return False
+        self.states[slot] = pack_game(game)
+        self.active[slot] = int(now or time.time())
+        return True
+
+    def get(self, session_id):
+        slot = self.slot(session_id)
+        if slot is None:
+            return None
+        symbols = ('O', 'X') if self.states[slot] >> 19 & 1 else ('X', 'O')
+        players = []
+        for player_id, symbol in zip((self.player1[slot], self.player2[slot]), symbols):
+            entry = self.players[player_id]
+            players.append(Player(entry.name, symbol, is_ai=entry.ai_mode is not None, ai_mode=entry.ai_mode))
+        return unpack_game(self.states[slot], *players)
+
+    def touch(self, session_id, now=None):
+        slot = self.slot(session_id)
+        if slot is not None:
+            self.active[slot] = int(now or time.time())
+        return slot is not None
+
+    def remove(self, session_id):
+        slot = self.slot(session_id)
+        if slot is not None:
+            self.tags[slot] = 0
+            self.free.append(slot)
+
+    def expire(self, max_idle=SESSION_TTL, now=None):
+        # Frees every session idle for more than max_idle seconds; returns how many
+        cutoff = int(now or time.time()) - max_idle
+        tags, active = self.tags, self.active
+        expired = [slot for slot in range(len(tags)) if tags[slot] and active[slot] < cutoff]
+        for slot in expired:
+            tags[slot] = 0
+        self.free.extend(expired)
+        return len(expired)
+
+    def save(self, path):
+        # Snapshot: header, the five arrays, then the player table as JSON
+        with open(path + '.tmp', 'wb') as f:
+            f.write(SESSION_MAGIC)
+            f.write(SESSION_HEADER.pack(len(self.tags), len(self.players)))
+            for column in (self.states, self.player1, self.player2, self.active, self.tags):
+                column.tofile(f)
+            f.write(json.dumps([[entry.name, entry.ai_mode] for entry in self.players.entries]).encode('utf-8'))
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path):
+        store = cls()
+        with open(path, 'rb') as f:
+            if f.read(len(SESSION_MAGIC)) != SESSION_MAGIC:
+                raise ValueError(f"{path} is not a session snapshot")
+            header = f.read(SESSION_HEADER.size)
+            columns = (store.states, store.player1, store.player2, store.active, store.tags)
+            if len(header) != SESSION_HEADER.size:
+                raise ValueError(f"{path} is truncated")
+            slots, players = SESSION_HEADER.unpack(header)
+            # Check the declared size before allocating anything for it
+            remaining = os.fstat(f.fileno()).st_size - f.tell()
+            if slots > 1 << SESSION_SLOT_BITS or slots * sum(column.itemsize for column in columns) > remaining:
+                raise ValueError(f"{path} is truncated or corrupt")
+            for column in columns:
+                column.fromfile(f, slots)
+            entries = json.loads(f.read().decode('utf-8'))
+            if len(entries) != players:
+                raise ValueError(f"{path} is truncated or corrupt")
+            for name, ai_mode in entries:
+                store.players.intern(name, ai_mode)
+        store.free = [slot for slot in range(slots) if not store.tags[slot]]
+        return store
+
+# --- Multiplayer Server ---
+# Newline-delimited JSON over TCP. Client requests:
+#   {"op": "join", "name": ..., "mode": "pvp" | "ai", "ai": "hard", "board": "3x3x3"}
+#   {"op": "move", "cell": 0-based cell}   {"op": "undo"}   {"op": "redo"}   {"op": "leave"}
+#   {"op": "resume", "session": id}  picks up a 3x3 AI game after a disconnect
+# Server events: waiting, start, move, win, tie, undo, redo, opponent_left, error.
+# "start" carries the cells played so far and, for resumable games, the session id.
+SESSION_SWEEP_INTERVAL = 60  # seconds between session expiry sweeps and snapshots
+SERVER_HOST = '127.0.0.1'
+SERVER_MAX_SIDE = 25  # boards are built on the event loop, so keep them small enough not to stall it
+SERVER_PORT = 8765
+
+class GameSession:
+    def __init__(self, seats, spec, ai_mode=None, record=False, server=None, game=None, session_id=None):
+        # seats[i] is a ClientConnection, or None for the AI seat
+        self.seats = seats
+        if game is None:
+            rows, cols, win_length = spec
+            players = [Player(seat.name if seat else f"AI ({ai_mode})", symbol, is_ai=seat is None) for seat, symbol in zip(seats, "XO")]
+            game = TicTacToeGame(players[0], players[1], ai_mode=ai_mode, rows=rows, cols=cols, win_length=win_length)
+        self.game = game
+        self.record = record
+        self.server = server
+        self.session_id = session_id  # id in server.sessions while the game can be resumed
+        self.finished = False
+        self.thinking = False
+
+    def broadcast(self, message):
+        for seat in self.seats:
+            if seat is not None:
+                seat.send(message)
+
+    def start(self):
+        game = self.game
+        if self.session_id is not None:
+            self.server.live[self.session_id] = self
+        moves = [state.cell for state in game.history.line()]
+        for index, seat in enumerate(self.seats):
+            if seat is not None:
+                seat.session, seat.seat = self, index
+                message = {'event': 'start', 'symbol': game.players[index].symbol, 'opponent': game.players[1 - index].name,
+                           'rows': game.board.rows, 'cols': game.board.cols, 'win_length': game.board.win_length,
+                           'your_turn': index == game.current, 'moves': moves}
+                if self.session_id is not None:
+                    message['session'] = self.session_id
+                seat.send(message)
+        self.schedule_ai()
+
+    def apply(self, move):
+        self.publish(self.game.step(move))
+        if not self.finished:
+            self.save()
+            self.schedule_ai()
+
+    def save(self):
+        # Mirror the game into the session store so it survives a disconnect
+        if self.session_id is not None:
+            self.server.sessions.update(self.session_id, self.game)
+
+    def close_session(self, keep):
+        if self.session_id is not None:
+            self.server.live.pop(self.session_id, None)
+            if keep:
+                self.server.sessions.update(self.session_id, self.game)
+            else:
+                self.server.sessions.remove(self.session_id)
+
+    def publish(self, events):
+        # Engine events -> protocol messages
+        game = self.game
+        for event in events:
+            if event.kind == EVENT_MOVE:
+                self.broadcast({'event': 'move', 'cell': event.cell, 'symbol': event.symbol})
+            elif event.kind == EVENT_WIN:
+                self.finish({'event': 'win', 'symbol': event.symbol, 'name': game.players[event.player_index].name,
+                             'line': list(event.line)}, event.player_index)
+            elif event.kind == EVENT_TIE:
+                self.finish({'event': 'tie'}, None)
+
+    def finish(self, message, winner_index):
+        self.finished = True
+        self.close_session(keep=False)
+        self.broadcast(message)
+        game_finished(winner_index, 'server')
+        if self.record:
+            game = self.game
+            update_scoreboard('tie' if winner_index is None else game.players[winner_index].name, game.players[0], game.players[1])
+            record_game(game.players, game.board, game.move_history, winner_index)
+        for seat in self.seats:
+            if seat is not None and seat.session is self:
+                seat.session = None
+
+    def schedule_ai(self):
+        import asyncio
+        if not self.finished and self.seats[self.game.current] is None:
+            self.thinking = True
+            asyncio.get_running_loop().create_task(self.ai_turn())
+
+    async def ai_turn(self):
+        import asyncio
+        game = self.game
+        player, opponent = game.players[game.current], game.players[1 - game.current]
+        # Search on a copy in a worker thread so the event loop keeps serving other sessions
+        board = game.board.copy()
+        try:
+            move = await asyncio.get_running_loop().run_in_executor(None, search_move, game.ai_mode, board, player.symbol, opponent.symbol)
+        except Exception:
+            move = choose_easy_move(board, player.symbol, opponent.symbol)  # A failed search must not stall the game
+        finally:
+            self.thinking = False
+        if not self.finished:
+            self.apply(move)
+
+    def handle_move(self, seat, cell):
+        if self.finished or self.thinking or seat != self.game.current:
+            return "Not your turn."
+        if not isinstance(cell, int) or isinstance(cell, bool):
+            return "Cell out of bounds."
+        try:
+            self.apply(cell)
+        except IllegalMove as e:
+            return str(e)
+        return None
+
+    def handle_undo(self, seat):
+        # Against the AI an undo takes back the AI's reply as well, so it is the human's turn again
+        game = self.game
+        if self.finished or self.thinking:
+            return "Cannot undo now."
+        count = 2 if None in self.seats else 1
+        state = game.history.current
+        if state.turns < count or (count == 1 and state.player_index != seat):
+            return "Nothing to undo."
+        cells = [event.cell for _ in range(count) for event in game.step(EVENT_UNDO)]
+        self.broadcast({'event': 'undo', 'cells': cells, 'current': game.current})
+        self.save()
+        return None
+
+    def handle_redo(self, seat):
+        game = self.game
+        if self.finished or self.thinking:
+            return "Cannot redo now."
+        count = 2 if None in self.seats else 1
+        states = game.history.peek_redo(count)
+        if states is None or states[0].player_index != seat:
+            return "Nothing to redo."
+        events = []
+        for _ in states:
+            if not game.over:
+                events += game.step(EVENT_REDO)
+        self.broadcast({'event': 'redo', 'cells': [event.cell for event in events if event.kind == EVENT_REDO], 'current': game.current})
+        self.publish(events)
+        if not self.finished:
+            self.save()
+        return None
+
+    def abandon(self, leaver):
+        if self.finished:
+            return
+        self.finished = True
+        self.close_session(keep=True)  # an AI game waits in the session store for a resume
+        for seat in self.seats:
+            if seat is not None and seat is not leaver:
+                seat.send({'event': 'opponent_left'})
+                seat.session = None
+
+class ClientConnection:
+    def __init__(self, server, reader, writer):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.name = "Player"
+        self.session = None
+        self.seat = None
+
+    def send(self, message):
+        if not self.writer.is_closing():
+            self.writer.write(json.dumps(message, separators=(',', ':')).encode() + b'\n')
+
+    async def run(self):
+        import asyncio
+        try:
+            while True:
+                try:
+                    line = await self.reader.readline()
+                except ValueError:
+                    # Longer than the stream limit; readline() has already dropped what it buffered
+                    self.send({'event': 'error', 'message': "Request too long."})
+                    await self.writer.drain()
+                    continue
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    self.send({'event': 'error', 'message': "Invalid JSON."})
+                    continue
+                if not isinstance(request, dict):
+                    self.send({'event': 'error', 'message': "Requests must be JSON objects."})
+                    continue
+                error = self.dispatch(request)
+                if error:
+                    self.send({'event': 'error', 'message': error})
+                await self.writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.server.disconnect(self)
+            self.writer.close()
+
+    def dispatch(self, request):
+        # One bad request must not take the connection (or the other sessions) down with it
+        try:
+            return self.handle(request)
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            return f"Server error: {type(e).__name__}."
+
+    def handle(self, request):
+        op = request.get('op')
+        if op == 'join':
+            return self.server.join(self, request)
+        if op == 'leave':
+            self.server.disconnect(self)
+            return None
+        if op == 'resume':
+            return self.server.resume(self, request)
+        if self.session is None:
+            return "Not in a game."
+        if op == 'move':
+            return self.session.handle_move(self.seat, request.get('cell'))
+        if op == 'undo':
+            return self.session.handle_undo(self.seat)
+        if op == 'redo':
+            return self.session.handle_redo(self.seat)
+        return f"Unknown op {op!r}."
+
+class GameServer:
+    def __init__(self, record=False, sessions_path=None, session_ttl=SESSION_TTL):
+        self.record = record
+        self.waiting = {}  # board spec -> client waiting for an opponent
+        self.sessions_started = 0
+        self.sessions_path = sessions_path
+        self.session_ttl = session_ttl
+        if sessions_path and os.path.exists(sessions_path):
+            self.sessions = SessionStore.load(sessions_path)
+        else:
+            self.sessions = SessionStore()
+        self.live = {}  # session id -> GameSession being played
+
+    def join(self, client, request):
+        if client.session is not None:
+            return "Already in a game."
+        board = request.get('board', '')
+        try:
+            if not isinstance(board, str):
+                raise ValueError(board)
+            spec = parse_board_spec(board)
+        except ValueError:
+            return "Invalid board size."
+        if spec[0] > SERVER_MAX_SIDE or spec[1] > SERVER_MAX_SIDE:
+            return f"Boards are at most {SERVER_MAX_SIDE}x{SERVER_MAX_SIDE} on this server."
+        ai_mode = request.get('ai', 'easy')
+        if request.get('mode') == 'ai' and (not isinstance(ai_mode, str) or ai_mode not in AI_STRATEGIES):
+            return f"Unknown AI {ai_mode!r}."
+        # A client re-joining (another board, or an AI game) gives up its place in the queue
+        self.unwait(client)
+        client.name = str(request.get('name') or "Player")[:32]
+        self.sessions_started += 1
+        if request.get('mode') == 'ai':
+            seats = [client, None] if random.random() < 0.5 else [None, client]
+            session = GameSession(seats, spec, ai_mode=ai_mode, record=self.record, server=self)
+            if session.game.board.is_classic():
+                session.session_id = self.sessions.put(session.game)
+            session.start()
+            return None
+        opponent = self.waiting.pop(spec, None)
+        if opponent is None or opponent is client:
+            self.waiting[spec] = client
+            client.send({'event': 'waiting'})
+            return None
+        GameSession([opponent, client], spec, record=self.record).start()
+        return None
+
+    def resume(self, client, request):
+        if client.session is not None:
+            return "Already in a game."
+        self.unwait(client)
+        session_id = request.get('session')
+        game = self.sessions.get(session_id)
+        if game is None:
+            return "Unknown or expired session."
+        if session_id in self.live:
+            return "That game is already being played."
+        seats = [None if player.is_ai else client for player in game.players]
+        client.name = game.players[seats.index(client)].name
+        self.sessions.touch(session_id)
+        GameSession(seats, None, ai_mode=game.ai_mode, record=self.record, server=self, game=game, session_id=session_id).start()
+        return None
+
+    def save_sessions(self):
+        if self.sessions_path:
+            self.sessions.save(self.sessions_path)
+
+    async def sweep_sessions(self):
+        import asyncio
+        while True:
+            await asyncio.sleep(SESSION_SWEEP_INTERVAL)
+            self.sessions.expire(self.session_ttl)
+            self.save_sessions()
+
+    def unwait(self, client):
+        for spec, waiting in list(self.waiting.items()):
+            if waiting is client:
+                del self.waiting[spec]
+
+    def disconnect(self, client):
+        self.unwait(client)
+        if client.session is not None:
+            client.session.abandon(client)
+            client.session = None
+
+    async def handle_client(self, reader, writer):
+        await ClientConnection(self, reader, writer).run()
+
+    async def serve(self, host=SERVER_HOST, port=SERVER_PORT):
+        import asyncio
+        server = await asyncio.start_server(self.handle_client, host, port, limit=4096)
+        self.sweeper = asyncio.get_running_loop().create_task(self.sweep_sessions())
+        async with server:
+            await server.serve_forever()
+
+def run_server(host=SERVER_HOST, port=SERVER_PORT, record=False, sessions_path=None, session_ttl=SESSION_TTL):
+    import asyncio
+    print(f"Serving Tic Tac Toe on {host}:{port}")
+    server = GameServer(record=record, sessions_path=sessions_path, session_ttl=session_ttl)
+    try:
+        asyncio.run(server.serve(host, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.save_sessions()
+
+# --- Load Generator ---
+async def loadgen_client(host, port, games, mode, ai_mode, latencies):
+    import asyncio
+    reader, writer = await asyncio.open_connection(host, port)
+    send = lambda message: writer.write(json.dumps(message).encode() + b'\n')
+    moves = 0
+    for _ in range(games):
+        send({'op': 'join', 'name': 'load', 'mode': mode, 'ai': ai_mode})
+        empty = symbol = sent_at = None
+        while True:
+            event = json.loads(await reader.readline())
+            kind = event['event']
+            if kind == 'start':
+                symbol = event['symbol']
+                empty = list(range(event['rows'] * event['cols']))
+                my_turn = event['your_turn']
+            elif kind == 'move':
+                empty.remove(event['cell'])
+                if event['symbol'] == symbol:
+                    latencies.append(time.perf_counter() - sent_at)
+                    moves += 1
+                my_turn = event['symbol'] != symbol
+            elif kind in ('win', 'tie', 'opponent_left'):
+                break
+            else:
+                continue
+            if my_turn and empty:
+                sent_at = time.perf_counter()
+                send({'op': 'move', 'cell': random.choice(empty)})
+                my_turn = False
+        await writer.drain()
+    writer.close()
+    return moves
+
+async def run_loadgen_async(host, port, clients, games, mode, ai_mode):
+    import asyncio
+    latencies = []
+    start = time.perf_counter()
+    counts = await asyncio.gather(*(loadgen_client(host, port, games, mode, ai_mode, latencies) for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    return sum(counts), elapsed, sorted(latencies)
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+def run_loadgen(host=SERVER_HOST, port=SERVER_PORT, clients=100, games=10, mode='ai', ai_mode='easy'):
+    import asyncio
+    moves, elapsed, latencies = asyncio.run(run_loadgen_async(host, port, clients, games, mode, ai_mode))
+    print(f"{clients} clients, {clients * games} games, {moves} moves in {elapsed:.2f}s")
+    print(f"{moves / elapsed:.0f} moves/s, latency p50 {percentile(latencies, 0.5) * 1000:.2f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.2f} ms")
+
+# --- GUI Classes and Logic (from tic_tac_toe_gui.py) ---
+@functools.lru_cache(maxsize=None)
+def hex_to_rgb(color):
+    color = color.lstrip('#')
+    return tuple(int(color[i:i+2], 16) for i in (0, 2, 4))
+
+@functools.lru_cache(maxsize=4096)
+def fade_color(start, end, t):
+    # start, end: hex color strings; t: 0.0-1.0
+    s, e = hex_to_rgb(start), hex_to_rgb(end)
+    return '#%02x%02x%02x' % tuple(int(s[i] + (e[i] - s[i]) * t) for i in range(3))
+
+@functools.lru_cache(maxsize=None)
+def color_ramp(start, end, steps):
+    return tuple(fade_color(start, end, i / (steps - 1)) for i in range(steps)) if steps > 1 else (end,)
+
+class AnimationScheduler:
+    # Drives animations from after() callbacks so the Tk main loop never sleeps.
+    # An animation is a generator that applies one frame per next() and may use
+    # try/finally to restore its end state when cancelled. Starting an animation
+    # under a key that is already running cancels the old one, so overlapping
+    # effects on one widget coalesce. Each tick only advances frames until the
+    # frame budget is spent; the rest wait for the next tick.
+    def __init__(self, root, interval=10, frame_budget=0.008):
+        self.root = root
+        self.interval = interval
+        self.frame_budget = frame_budget
+        self.animations = {}  # key -> [frames, delay in ms, due time, on_done]
+        self.tick_id = None
+
+    def animate(self, key, frames, delay=20, on_done=None):
+        self.cancel(key)
+        self.animations[key] = [frames, delay, time.perf_counter(), on_done]
+        if self.tick_id is None:
+            self.tick_id = self.root.after(0, self._tick)
+
+    def is_running(self, key):
+        return key in self.animations
+
+    def cancel(self, key):
+        animation = self.animations.pop(key, None)
+        if animation is not None:
+            try:
+                animation[0].close()
+            except tk.TclError:
+                pass  # Widget already destroyed
+
+    def cancel_all(self):
+        for key in list(self.animations):
+            self.cancel(key)
+
+    def _tick(self):
+        start = time.perf_counter()
+        for key, animation in list(self.animations.items()):
+            now = time.perf_counter()
+            if now - start > self.frame_budget:
+                break
+            if animation[2] > now or self.animations.get(key) is not animation:
+                continue
+            try:
+                next(animation[0])
+                animation[2] = now + animation[1] / 1000
+                continue
+            except StopIteration:
+                pass
+            except tk.TclError:
+                pass  # Widget destroyed mid-animation
+            del self.animations[key]
+            if animation[3] is not None:
+                animation[3]()
+        self.tick_id = self.root.after(self.interval, self._tick) if self.animations else None
+
+# Spectator: archived or live self-play games played back at 1x-1000x
+SPECTATOR_SPEEDS = (1, 2, 5, 10, 100, 1000)
+SPECTATOR_FPS = 30
+REPLAY_MOVE_SECONDS = 0.6   # one move per this many seconds at 1x
+SPECTATOR_MAX_CATCHUP = 0.25  # seconds of playback one frame may catch up on after a stall
+
+class PlaybackCursor:
+    # Plays a stream of game records forward in time without touching Tk. advance() applies
+    # as many moves as the elapsed time allows (each game ends with one beat on its final
+    # position) and only marks cells dirty; the view repaints the dirty cells whose net
+    # content differs from what it shows. At 1000x a frame covers dozens of moves, but a
+    # cell that is filled, cleared and filled again between frames costs nothing.
+    def __init__(self, next_record, speed=1):
+        self.next_record = next_record  # returns the next GameRecord, or None if none is ready
+        self.speed = speed
+        self.record = None
+        self.board = None
+        self.geometry = None  # (rows, cols, win length) of the current game
+        self.turn = 0
+        self.due = 0.0        # moves owed to the clock
+        self.cells = []       # cell -> (text, color role) that should be on screen
+        self.dirty = set()
+        self.games = 0
+        self.tally = collections.Counter()  # winner's name (None for ties) -> games
+
+    def advance(self, seconds):
+        self.due += min(seconds, SPECTATOR_MAX_CATCHUP) * self.speed / REPLAY_MOVE_SECONDS
+        while True:
+            if self.record is None or self.turn > len(self.record.moves):
+                record = self.next_record()
+                if record is None:
+                    self.due = 0.0  # Nothing to show yet; don't bank the wait
+                    return
+                self.start(record)
+            if self.due < 1:
+                return
+            self.due -= 1
+            moves = self.record.moves
+            if self.turn < len(moves):
+                self.play(moves[self.turn])
+                self.turn += 1
+                if self.turn == len(moves):
+                    self.finish()
+            else:
+                self.turn += 1  # The beat on the final position
+
+    def start(self, record):
+        geometry = (record.rows, record.cols, record.win_length)
+        if geometry != self.geometry:
+            self.geometry = geometry
+            self.cells = [('', 'btn')] * (record.rows * record.cols)
+            self.dirty = set(range(len(self.cells)))
+        else:
+            for cell, shown in enumerate(self.cells):
+                if shown != ('', 'btn'):
+                    self.mark(cell, '', 'btn')
+        self.record = record
+        self.board = make_board(*geometry)
+        self.turn = 0
+
+    def mark(self, cell, text, role):
+        self.cells[cell] = (text, role)
+        self.dirty.add(cell)
+
+    def play(self, cell):
+        record = self.record
+        symbol = (record.symbol1, record.symbol2)[self.turn % 2]
+        self.board.add_to_board(cell // record.cols, cell % record.cols, symbol)
+        self.mark(cell, symbol, 'btn')
+
+    def finish(self):
+        record = self.record
+        self.games += 1
+        if record.result == RESULT_TIE:
+            self.tally[None] += 1
+            return
+        symbol = (record.symbol1, record.symbol2)[record.result - 1]
+        self.tally[(record.player1, record.player2)[record.result - 1]] += 1
+        for row, col in self.board.winning_line(symbol):
+            cell = row * record.cols + col
+            self.mark(cell, self.cells[cell][0], 'win')
+
+    def take_dirty(self):
+        dirty, self.dirty = self.dirty, set()
+        return dirty
+
+    def status(self):
+        record = self.record
+        if record is None:
+            return "Waiting for games..."
+        names = (record.player1, record.player2)
+        symbols = (record.symbol1, record.symbol2)
+        if self.turn < len(record.moves):
+            return f"Game {self.games + 1}: {names[0]} ({symbols[0]}) vs {names[1]} ({symbols[1]}), move {self.turn}"
+        if record.result == RESULT_TIE:
+            return f"Game {self.games}: it was a tie!"
+        winner = record.result - 1
+        return f"Game {self.games}: {names[winner]} ({symbols[winner]}) won!"
+
+    def tally_text(self):
+        if self.record is None:
+            return ""
+        names = (self.record.player1, self.record.player2)
+        return "   ".join([f"{name}: {self.tally[name]}" for name in names] + [f"Ties: {self.tally[None]}"])
+
+def self_play_feed(first, second, spec, stop, backlog=256):
+    # Plays AI-vs-AI games on a background thread until stop is set, swapping who moves
+    # first each game; returns a next_record() for PlaybackCursor that never blocks
+    import queue
+    records = queue.Queue(backlog)
+    modes = (first, second)
+    names = (f"AI ({first})", f"AI ({second})") if first != second else (f"AI ({first}) 1", f"AI ({second}) 2")
+    def run():
+        order = (0, 1)
+        while not stop.is_set():
+            bots = [Player(names[i], symbol, is_ai=True, ai_mode=modes[i]) for i, symbol in zip(order, 'XO')]
+            game = GameEngine(('X', 'O'), *spec)
+            while not game.over and not stop.is_set():
+                index = game.current
+                game.step(choose_ai_move(bots[index].ai_mode, game.board, game.symbols[index], game.symbols[1 - index]))
+            record = make_game_record(bots, game.board, game.move_history, game.winner)
+            while game.over and not stop.is_set():
+                try:
+                    records.put(record, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+            order = order[::-1]
+    threading.Thread(target=run, daemon=True).start()
+    def next_record():
+        try:
+            return records.get_nowait()
+        except queue.Empty:
+            return None
+    return next_record
+
+class TicTacToeGUI:
+    def __init__(self, root):
+        self.root = root
+        self.root.title("Tic Tac Toe")
+        self.animations = AnimationScheduler(root)
+        self.ai_after_id = None
+        self.search = None  # AISearch running for the AI's move
+        self.themed_widgets = {}  # widget -> {option: color role}, recolored in place on theme change
+        self.themed_items = []    # (canvas, item id, {option: color role})
+        self.gradients = {}       # theme -> cached menu background PhotoImage
+        self.menu_build_ms = 0.0
+        self.theme = 'light'
+        self.colors = {
+            'light': {
+                'bg': '#f7fafc',
+                'fg': '#22223b',
+                'btn': '#e0e1dd',
+                'btn_active': '#a9def9',
+                'win': '#b5ead7',
+                'border': '#a3cef1',
+                'logo': '#22223b',
+            },
+            'dark': {
+                'bg': '#22223b',
+                'fg': '#f7fafc',
+                'btn': '#393e46',
+                'btn_active': '#00adb5',
+                'win': '#00b894',
+                'border': '#00adb5',
+                'logo': '#f7fafc',
+            }
+        }
+        self.score = {"X": 0, "O": 0}
+        self.board_size = (3, 3, 3)  # rows, cols, win length
+        self.game = GameEngine()
+        self.board = self.game.board
+        self.setup_menu()
+
+    def fade_in(self, widget, steps=10, delay=20):
+        self._fade(widget, [(i + 1) / steps for i in range(steps)], delay)
+
+    def fade_out(self, widget, steps=10, delay=20):
+        self._fade(widget, [(steps - i - 1) / steps for i in range(steps)], delay)
+
+    def _fade(self, widget, alphas, delay):
+        def frames():
+            for alpha in alphas:
+                try:
+                    widget.attributes('-alpha', alpha)
+                except (AttributeError, tk.TclError):
+                    return  # Frames have no alpha; only toplevels fade
+                yield
+        self.animations.animate(('alpha', widget), frames(), delay)
+
+    def themed(self, widget, **roles):
+        # Register widget options (bg='bg', fg='fg', ...) to follow the current theme
+        self.themed_widgets.setdefault(widget, {}).update(roles)
+        widget.config(**{option: self.colors[self.theme][role] for option, role in roles.items()})
+        return widget
+
+    def themed_item(self, canvas, item, **roles):
+        self.themed_items.append((canvas, item, roles))
+        canvas.itemconfig(item, **{option: self.colors[self.theme][role] for option, role in roles.items()})
+        return item
+
+    def gradient_image(self, theme, width=420, height=540):
+        # One column of the gradient, zoomed to full width; built once per theme
+        image = self.gradients.get(theme)
+        if image is None:
+            column = tk.PhotoImage(width=1, height=height)
+            ramp = color_ramp(self.colors[theme]['bg'], self.colors[theme]['btn_active'], height)
+            column.put(" ".join("{%s}" % color for color in ramp))
+            image = self.gradients[theme] = column.zoom(width, 1)
+        return image
+
+    def setup_menu(self):
+        started = time.perf_counter()
+        self.clear_window()
+        self.menu_frame = self.themed(tk.Frame(self.root), bg='bg')
+        self.menu_frame.pack(expand=True, fill='both')
+        # Subtle background gradient (cached image per theme)
+        bg_canvas = tk.Canvas(self.menu_frame, width=420, height=540, highlightthickness=0)
+        self.menu_gradient = (bg_canvas, bg_canvas.create_image(0, 0, anchor='nw', image=self.gradient_image(self.theme)))
+        bg_canvas.place(x=0, y=0, relwidth=1, relheight=1)
+        logo = self.themed(tk.Canvas(self.menu_frame, width=80, height=80, highlightthickness=0), bg='bg')
+        self.themed_item(logo, logo.create_oval(10, 10, 70, 70, width=4), fill='logo', outline='border')
+        self.themed_item(logo, logo.create_text(40, 40, text="❌⭕", font=("Segoe UI Emoji", 28, "bold")), fill='bg')
+        logo.pack(pady=(30, 10))
+        self.themed(tk.Label(self.menu_frame, text="Tic Tac Toe", font=("Segoe UI", 28, "bold")), bg='bg', fg='fg').pack(pady=(0, 20))
+        btn_style = {
+            'font': ("Segoe UI", 16, "bold"),
+            'bd': 0,
+            'relief': 'flat',
+            'highlightthickness': 0,
+            'cursor': 'hand2',
+            'height': 2,
+            'width': 20,
+        }
+        def animate_btn(e, b):
+            b.config(bg=self.colors[self.theme]['btn_active'])
+            b.config(font=("Segoe UI", 18, "bold"))
+        def reset_btn(e, b):
+            b.config(bg=self.colors[self.theme]['btn'])
+            b.config(font=("Segoe UI", 16, "bold"))
+        for text, cmd in [
+            ("Single Player vs AI", self.setup_single_player),
+            ("Two Player (Local)", self.setup_two_player),
+            ("Board Size", self.choose_board_size),
+            ("Replay Last Game", self.replay_last_game),
+            ("Watch Games", self.watch_games),
+            ("View Scoreboard", self.show_scoreboard),
+            ("Player Customization", self.player_customization),
+            ("View Features/Help", self.show_features),
+            ("Exit", self.root.quit)
+        ]:
+            btn = self.themed(tk.Button(self.menu_frame, text=text, command=cmd, **btn_style), bg='btn', fg='fg', activebackground='btn_active')
+            btn.pack(pady=10)
+            btn.bind('<Enter>', lambda e, b=btn: animate_btn(e, b))
+            btn.bind('<Leave>', lambda e, b=btn: reset_btn(e, b))
+        self.fade_in(self.menu_frame)
+        self.menu_build_ms = (time.perf_counter() - started) * 1000
+
+    def info_label_highlight(self):
+        # Highlight active player
+        label = self.info_label
+        orig_fg = label.cget('fg')
+        def frames():
+            try:
+                for i in range(3):
+                    label.config(fg=self.colors[self.theme]['btn_active'])
+                    yield
+                    label.config(fg=orig_fg)
+                    yield
+            finally:
+                if label.winfo_exists():
+                    label.config(fg=orig_fg)
+        self.animations.animate(('fg', label), frames(), 80)
+
+    def setup_single_player(self):
+        name = simpledialog.askstring("Player Name", "Enter your name:", parent=self.root)
+        if not name:
+            return
+        symbol = simpledialog.askstring("Symbol", "Choose your symbol (X/O):", parent=self.root)
+        if not symbol or symbol.upper() not in ['X', 'O']:
+            symbol = 'X'
+        else:
+            symbol = symbol.upper()
+        ai_symbol = 'O' if symbol == 'X' else 'X'
+        ai_choice = simpledialog.askinteger("AI Difficulty", "Select AI Difficulty:\n1. Easy (Random)\n2. Medium (Rule-based)\n3. Hard (Minimax)\n4. MCTS (Monte Carlo)", parent=self.root, minvalue=1, maxvalue=4)
+        ai_mode = { 1: 'easy', 2: 'medium', 3: 'hard', 4: 'mcts' }.get(ai_choice, 'easy')
+        self.player1 = Player(name, symbol)
+        self.player2 = Player(f"AI ({ai_mode})", ai_symbol, is_ai=True)
+        self.ai_mode = ai_mode
+        self.start_game()
+
+    def choose_board_size(self):
+        rows, cols, win_length = self.board_size
+        spec = simpledialog.askstring("Board Size", "Rows x cols x win length (e.g. 15x15x5) or 'ultimate':", initialvalue="ultimate" if win_length == ULTIMATE else f"{rows}x{cols}x{win_length}", parent=self.root)
+        if spec is None:
+            return
+        try:
+            self.board_size = parse_board_spec(spec)
+        except ValueError:
+            self.show_popup("Invalid board size.")
+
+    def setup_two_player(self):
+        name1 = simpledialog.askstring("Player 1 Name", "Enter Player 1 name:", parent=self.root)
+        if not name1:
+            return
+        symbol1 = simpledialog.askstring("Symbol", "Player 1, choose your symbol (X/O):", parent=self.root)
+        if not symbol1 or symbol1.upper() not in ['X', 'O']:
+            symbol1 = 'X'
+        else:
+            symbol1 = symbol1.upper()
+        symbol2 = 'O' if symbol1 == 'X' else 'X'
+        name2 = simpledialog.askstring("Player 2 Name", "Enter Player 2 name:", parent=self.root)
+        if not name2:
+            return
+        self.player1 = Player(name1, symbol1)
+        self.player2 = Player(name2, symbol2)
+        self.ai_mode = None
+        self.start_game()
+
+    def start_game(self):
+        self.clear_window()
+        rows, cols, win_length = self.board_size
+        self.game = GameEngine((self.player1.symbol, self.player2.symbol), rows, cols, win_length)
+        self.board = self.game.board
+        self.turn_started = time.perf_counter()
+        self.game_frame = self.themed(tk.Frame(self.root), bg='bg')
+        self.game_frame.pack(expand=True, fill='both')
+        self.info_label = self.themed(tk.Label(self.game_frame, text=self.get_turn_text(), font=("Segoe UI", 18, "bold")), bg='bg', fg='fg')
+        self.info_label.pack(pady=(20, 10))
+        self.score_label = self.themed(tk.Label(self.game_frame, text=self.get_score_text(), font=("Segoe UI", 13, "bold")), bg='bg', fg='fg')
+        self.score_label.pack(pady=(0, 10))
+        self.grid_frame = self.themed(tk.Frame(self.game_frame), bg='bg')
+        self.grid_frame.pack(pady=10)
+        # Shrink cells so larger boards still fit the window
+        cell_font = max(8, 36 * 3 // max(rows, cols))
+        cell_pad = max(1, 8 * 3 // max(rows, cols))
+        # Ultimate: wider gaps between the 3x3 small boards
+        gap = 4 * cell_pad if win_length == ULTIMATE else cell_pad
+        self.buttons = [[None for _ in range(cols)] for _ in range(rows)]
+        for r in range(rows):
+            for c in range(cols):
+                btn = tk.Button(self.grid_frame, text="", font=("Segoe UI", cell_font, "bold"), width=3, height=1,
+                                command=lambda row=r, col=c: self.click(row, col),
+                                bd=0, relief='flat', highlightthickness=0, cursor='hand2')
+                self.themed(btn, bg='btn', fg='fg', activebackground='btn_active')
+                btn.grid(row=r, column=c, padx=(gap if c and c % 3 == 0 else cell_pad, cell_pad),
+                         pady=(gap if r and r % 3 == 0 else cell_pad, cell_pad), ipadx=cell_pad, ipady=cell_pad)
+                self.buttons[r][c] = btn
+                btn.bind('<Enter>', lambda e, b=btn: b.config(bg=self.colors[self.theme]['btn_active']))
+                btn.bind('<Leave>', lambda e, b=btn: b.config(bg=self.colors[self.theme][self.themed_widgets[b]['bg']]))
+        control_frame = self.themed(tk.Frame(self.game_frame), bg='bg')
+        control_frame.pack(pady=18)
+        btn_style = {
+            'font': ("Segoe UI", 12, "bold"),
+            'bd': 0,
+            'relief': 'flat',
+            'highlightthickness': 0,
+            'cursor': 'hand2',
+            'width': 10,
+        }
+        for text, cmd in [("Undo", self.undo), ("Redo", self.redo), ("Restart", self.start_game),
+                          ("Menu", self.setup_menu), ("Theme", self.toggle_theme)]:
+            btn = self.themed(tk.Button(control_frame, text=text, command=cmd, **btn_style), bg='btn', fg='fg', activebackground='btn_active')
+            btn.pack(side='left', padx=6)
+        if self.get_current_player().is_ai:
+            self.schedule_ai_move()
+
+    def schedule_ai_move(self, delay=500):
+        self.cancel_ai_move()
+        self.ai_after_id = self.root.after(delay, self.ai_move)
+
+    def cancel_ai_move(self):
+        if self.ai_after_id is not None:
+            self.root.after_cancel(self.ai_after_id)
+            self.ai_after_id = None
+        if self.search is not None:
+            self.search.cancel()
+            self.search = None
+
+    def click(self, row, col):
+        # Board clicks are ignored while the AI is on the move
+        if not self.game.over and not self.get_current_player().is_ai:
+            self.animated_handle_move(row, col)
+
+    def animated_handle_move(self, row, col):
+        btn = self.buttons[row][col]
+        # Animate button press (color flash); the move itself is applied right away
+        orig_bg = self.colors[self.theme]['btn']
+        def frames():
+            try:
+                btn.config(bg=self.colors[self.theme]['btn_active'])
+                yield
+            finally:
+                if btn.winfo_exists() and btn.cget('bg') == self.colors[self.theme]['btn_active']:
+                    btn.config(bg=orig_bg)
+        self.animations.animate(('bg', btn), frames(), 80)
+        self.handle_move(row, col)
+
+    def get_turn_text(self):
+        p = self.get_current_player()
+        if self.board.win_length == ULTIMATE and self.board.forced is not None:
+            return f"{p.name}'s Turn ({p.symbol}) - board {self.board.forced + 1}"
+        return f"{p.name}'s Turn ({p.symbol})"
+
+    def get_score_text(self):
+        return f"Score: {self.player1.name} (X): {self.score['X']}   {self.player2.name} (O): {self.score['O']}"
+
+    def get_current_player(self):
+        return self.player1 if self.game.current == 0 else self.player2
+
+    def handle_move(self, row, col):
+        waited = time.perf_counter() - self.turn_started
+        try:
+            events = self.game.step((row, col))
+        except IllegalMove:
+            return
+        if METRICS is not None and not self.get_current_player().is_ai:
+            METRICS.timing('input_wait_seconds', waited, source='gui')
+        self.render_events(events)
+        if not self.game.over:
+            self.turn_started = time.perf_counter()
+            if self.get_current_player().is_ai:
+                self.schedule_ai_move()
+
+    def render_events(self, events):
+        # Draw what the engine reports; the GUI keeps no rules of its own
+        players = (self.player1, self.player2)
+        for event in events:
+            if event.kind in (EVENT_MOVE, EVENT_REDO):
+                row, col = divmod(event.cell, self.board.cols)
+                self.buttons[row][col].config(text=event.symbol, fg=self.colors[self.theme]['fg'])
+            elif event.kind == EVENT_UNDO:
+                # Undo is refused once the game is over, so no other cell can still be highlighted
+                row, col = divmod(event.cell, self.board.cols)
+                self.themed(self.buttons[row][col], bg='btn').config(text="")
+            elif event.kind == EVENT_WIN:
+                player = players[event.player_index]
+                self.win_line = [divmod(cell, self.board.cols) for cell in event.line]
+                self.score[player.symbol] += 1
+                self.info_label.config(text=f"{player.name} ({player.symbol}) wins!")
+                self.animated_highlight_win(player.symbol)
+                self.score_label.config(text=self.get_score_text())
+                self.show_popup(f"🎉 {player.name} ({player.symbol}) wins! 🎉")
+                update_scoreboard(player.name, self.player1, self.player2)
+            elif event.kind == EVENT_TIE:
+                self.info_label.config(text="It's a tie!")
+                self.show_popup("🤝 It's a tie! 🤝")
+                update_scoreboard('tie', self.player1, self.player2)
+        if self.game.over:
+            record_game(list(players), self.board, self.game.move_history, self.game.winner)
+            game_finished(self.game.winner, 'gui')
+        else:
+            self.info_label.config(text=self.get_turn_text())
+
+    def ai_move(self):
+        # Search on a background thread (MCTS across every core) and poll it from the Tk loop
+        self.ai_after_id = None
+        if self.game.over:
+            return
+        player = self.get_current_player()
+        opponent = self.player2 if self.game.current == 0 else self.player1
+        self.search = AISearch(self.ai_mode, self.board, player.symbol, opponent.symbol, workers=os.cpu_count())
+        self.poll_ai_move()
+
+    def poll_ai_move(self):
+        self.ai_after_id = None
+        search = self.search
+        if search is None:
+            return
+        if not search.done.is_set():
+            self.info_label.config(text=f"AI thinking... {search.status()}")
+            self.ai_after_id = self.root.after(50, self.poll_ai_move)
+            return
+        self.search = None
+        row, col = search.best()
+        self.animated_handle_move(row, col)
+
+    def animated_highlight_win(self, symbol):
+        # Animate the winning line highlight (fade-in effect)
+        cells = [self.buttons[r][c] for r, c in getattr(self, 'win_line', [])]
+        def frames():
+            try:
+                for color in color_ramp(self.colors[self.theme]['btn'], self.colors[self.theme]['win'], 8)[1:]:
+                    for btn in cells:
+                        btn.config(bg=color)
+                    yield
+            finally:
+                for btn in cells:
+                    if btn.winfo_exists() and self.game.over:
+                        self.themed(btn, bg='win')
+        for btn in cells:
+            self.animations.cancel(('bg', btn))
+        self.animations.animate('win_line', frames(), 40)
+
+    def undo(self):
+        # Against the AI, take moves back until a human is to move (the AI's reply and the
+        # move it answered), as the server does
+        if self.game.over:
+            return
+        events = []
+        while True:
+            try:
+                events += self.game.step(EVENT_UNDO)
+            except IllegalMove:
+                break
+            if not self.get_current_player().is_ai:
+                break
+        if events:
+            self.cancel_ai_move()
+            self.render_events(events)
+            self.resume_ai()
+
+    def redo(self):
+        # Replays the AI's recorded reply along with the human move before it
+        events = []
+        while not self.game.over:
+            try:
+                events += self.game.step(EVENT_REDO)
+            except IllegalMove:
+                break
+            if not self.get_current_player().is_ai:
+                break
+        if events:
+            self.cancel_ai_move()
+            self.render_events(events)
+            self.resume_ai()
+
+    def resume_ai(self):
+        # A new turn after undo/redo; the AI may be the side to move (e.g. it moved first)
+        self.turn_started = time.perf_counter()
+        if not self.game.over and self.get_current_player().is_ai:
+            self.schedule_ai_move()
+
+    def toggle_theme(self):
+        # Fade every registered widget to the new theme in place; the board and menu stay as they are
+        if self.animations.is_running('theme'):
+            return
+        old_theme = self.theme
+        new_theme = 'dark' if self.theme == 'light' else 'light'
+        old_colors, new_colors = self.colors[old_theme], self.colors[new_theme]
+        steps = 10
+        self.theme = new_theme
+        def frames():
+            for step in range(1, steps + 1):
+                for widget, roles in list(self.themed_widgets.items()):
+                    if not widget.winfo_exists():
+                        del self.themed_widgets[widget]
+                        continue
+                    widget.config(**{option: color_ramp(old_colors[role], new_colors[role], steps + 1)[step]
+                                     for option, role in roles.items()})
+                yield
+        def done():
+            for canvas, item, roles in self.themed_items:
+                if canvas.winfo_exists():
+                    canvas.itemconfig(item, **{option: new_colors[role] for option, role in roles.items()})
+            if hasattr(self, 'menu_frame') and self.menu_frame.winfo_exists():
+                canvas, item = self.menu_gradient
+                canvas.itemconfig(item, image=self.gradient_image(new_theme))
+        self.animations.animate('theme', frames(), 20, on_done=done)
+
+    def show_popup(self, message):
+        popup = tk.Toplevel(self.root)
+        popup.title("")
+        popup.geometry("300x120")
+        popup.configure(bg=self.colors[self.theme]['bg'])
+        tk.Label(popup, text=message, font=("Segoe UI Emoji", 20, "bold"), bg=self.colors[self.theme]['bg'], fg=self.colors[self.theme]['fg']).pack(expand=True, pady=20)
+        btn = tk.Button(popup, text="OK", font=("Segoe UI", 12, "bold"), command=popup.destroy, bg=self.colors[self.theme]['btn'], fg=self.colors[self.theme]['fg'], activebackground=self.colors[self.theme]['btn_active'], bd=0, relief='flat', highlightthickness=0, cursor='hand2')
+        btn.pack(pady=5)
+        self.fade_in(popup)
+        popup.transient(self.root)
+        popup.grab_set()
+        self.root.wait_window(popup)
+
+    def clear_window(self):
+        self.cancel_ai_move()
+        self.animations.cancel_all()
+        self.themed_widgets.clear()
+        self.themed_items.clear()
+        for widget in self.root.winfo_children():
+            widget.destroy()
+
+    def show_features(self):
+        features = "\n".join([f"• {feat}" for feat in FEATURES_LIST])
+        self.show_popup(f"Features:\n{features}")
+
+    def player_customization(self):
+        self.show_popup("Player Customization: Change names, symbols, and (in future) colors/avatars!")
+
+    def replay_last_game(self):
+        record = get_archive().last()
+        if record is None:
+            self.show_popup("No finished games to replay yet.")
+            return
+        self.replay_game(record)
+
+    def replay_game(self, record):
+        records = iter([record])
+        self.spectate(lambda: next(records, None))
+
+    def watch_games(self):
+        spec = simpledialog.askstring("Watch Games", "'archive' to watch recorded games, or two AI modes\n(e.g. 'hard mcts') to watch live self-play:", initialvalue="archive", parent=self.root)
+        if spec is None:
+            return
+        modes = spec.lower().split()
+        if modes == ['archive']:
+            self.watch_archive()
+        elif len(modes) == 2 and all(mode in AI_STRATEGIES for mode in modes):
+            self.watch_self_play(*modes)
+        else:
+            self.show_popup(f"Choose 'archive' or two of: {', '.join(AI_STRATEGIES)}")
+
+    def watch_archive(self, speed=100):
+        archive = GameArchive()
+        if not archive.segments():
+            self.show_popup("No finished games to watch yet.")
+            return
+        records = iter(archive)
+        self.spectate(lambda: next(records, None), speed)
+
+    def watch_self_play(self, first, second, speed=10):
+        stop = threading.Event()
+        self.spectate(self_play_feed(first, second, self.board_size, stop), speed, stop)
+
+    def spectate(self, next_record, speed=1, stop=None):
+        # Plays games back through a PlaybackCursor, one frame per 1/SPECTATOR_FPS s at most.
+        # A frame reconfigures only the cells whose net content changed, so high speeds skip
+        # intermediate positions instead of queueing a Tk call per move.
+        self.clear_window()
+        cursor = PlaybackCursor(next_record, speed)
+        bg, fg = self.colors[self.theme]['bg'], self.colors[self.theme]['fg']
+        frame = tk.Frame(self.root, bg=bg)
+        frame.pack(expand=True, fill='both')
+        info = tk.Label(frame, text=cursor.status(), font=("Segoe UI", 15, "bold"), bg=bg, fg=fg, wraplength=400)
+        info.pack(pady=(20, 4))
+        tally = tk.Label(frame, text="", font=("Segoe UI", 11, "bold"), bg=bg, fg=fg, wraplength=400)
+        tally.pack(pady=(0, 6))
+        grid = tk.Frame(frame, bg=bg)
+        grid.pack(pady=10)
+        btn_style = dict(font=("Segoe UI", 12, "bold"), bg=self.colors[self.theme]['btn'], fg=fg, activebackground=self.colors[self.theme]['btn_active'], bd=0, relief='flat', highlightthickness=0, cursor='hand2')
+        controls = tk.Frame(frame, bg=bg)
+        controls.pack(pady=(12, 4))
+        speed_label = tk.Label(frame, text="", font=("Segoe UI", 11), bg=bg, fg=fg)
+        speed_label.pack()
+        speed_index = [SPECTATOR_SPEEDS.index(speed) if speed in SPECTATOR_SPEEDS else 0]
+        paused = [False]
+        def set_speed(step=0, pause=False):
+            speed_index[0] = min(max(speed_index[0] + step, 0), len(SPECTATOR_SPEEDS) - 1)
+            paused[0] = paused[0] != pause
+            cursor.speed = 0 if paused[0] else SPECTATOR_SPEEDS[speed_index[0]]
+            speed_label.config(text="Paused" if paused[0] else f"Speed: {SPECTATOR_SPEEDS[speed_index[0]]}x")
+        for text, cmd in [("Slower", lambda: set_speed(-1)), ("Pause", lambda: set_speed(pause=True)),
+                          ("Faster", lambda: set_speed(1)), ("Menu", self.setup_menu)]:
+            tk.Button(controls, text=text, command=cmd, width=7, **btn_style).pack(side='left', padx=4)
+        set_speed()
+        cells = []
+        shown = []  # cell -> (text, color role) currently on screen
+        def build(rows, cols, win_length):
+            for widget in grid.winfo_children():
+                widget.destroy()
+            cell_font = max(8, 36 * 3 // max(rows, cols))
+            pad = max(1, 4 * 3 // max(rows, cols))
+            gap = 3 * pad if win_length == ULTIMATE else pad
+            cells[:] = []
+            for r in range(rows):
+                for c in range(cols):
+                    label = tk.Label(grid, text="", font=("Segoe UI", cell_font, "bold"), width=3, bg=self.colors[self.theme]['btn'], fg=fg)
+                    label.grid(row=r, column=c, padx=(gap if c and c % 3 == 0 else pad, pad), pady=(gap if r and r % 3 == 0 else pad, pad), ipadx=pad, ipady=pad)
+                    cells.append(label)
+            shown[:] = [('', 'btn')] * len(cells)
+        def frames():
+            built = None
+            texts = (None, None)
+            last = time.perf_counter()
+            try:
+                while True:
+                    now = time.perf_counter()
+                    cursor.advance(now - last)
+                    last = now
+                    dirty = cursor.take_dirty()
+                    if cursor.geometry != built:
+                        built = cursor.geometry
+                        build(*built)
+                        dirty = range(len(cells))
+                    colors = self.colors[self.theme]
+                    for cell in dirty:
+                        target = cursor.cells[cell]
+                        if shown[cell] != target:
+                            shown[cell] = target
+                            cells[cell].config(text=target[0], bg=colors[target[1]])
+                    status = (cursor.status(), cursor.tally_text())
+                    if status != texts:
+                        texts = status
+                        info.config(text=status[0])
+                        tally.config(text=status[1])
+                    yield
+            finally:
+                if stop is not None:
+                    stop.set()
+        self.animations.animate('spectator', frames(), 1000 // SPECTATOR_FPS)
+
+    def show_scoreboard(self):
+        store = get_scoreboard()
+        first_page = store.page(None, SCOREBOARD_PAGE_SIZE)
+        if not first_page:
+            self.show_popup("No games played yet.")
+            return
+        popup = tk.Toplevel(self.root)
+        popup.title("")
+        popup.geometry("350x520")
+        popup.configure(bg=self.colors[self.theme]['bg'])
+        tk.Label(popup, text="Scoreboard", font=("Segoe UI", 18, "bold"), bg=self.colors[self.theme]['bg'], fg=self.colors[self.theme]['fg']).pack(pady=10)
+        rows_frame = tk.Frame(popup, bg=self.colors[self.theme]['bg'])
+        rows_frame.pack(fill='both', expand=True)
+        starts = [None]  # page start keys, so "Prev" can step back
+        def show_page(rows):
+            for widget in rows_frame.winfo_children():
+                widget.destroy()
+            for player, stats in rows:
+                tk.Label(rows_frame, text=format_score(player, stats), font=("Segoe UI", 13), bg=self.colors[self.theme]['bg'], fg=self.colors[self.theme]['fg']).pack(anchor='w', padx=20)
+            current_rows[:] = rows
+        def next_page():
+            if len(current_rows) < SCOREBOARD_PAGE_SIZE:
+                return
+            rows = store.page(current_rows[-1][0], SCOREBOARD_PAGE_SIZE)
+            if rows:
+                starts.append(current_rows[-1][0])
+                show_page(rows)
+        def prev_page():
+            if len(starts) > 1:
+                starts.pop()
+                show_page(store.page(starts[-1], SCOREBOARD_PAGE_SIZE))
+        current_rows = []
+        show_page(first_page)
+        nav = tk.Frame(popup, bg=self.colors[self.theme]['bg'])
+        nav.pack(pady=10)
+        btn_style = dict(font=("Segoe UI", 12, "bold"), bg=self.colors[self.theme]['btn'], fg=self.colors[self.theme]['fg'], activebackground=self.colors[self.theme]['btn_active'], bd=0, relief='flat', highlightthickness=0, cursor='hand2')
+        tk.Button(nav, text="Prev", command=prev_page, **btn_style).pack(side='left', padx=6)
+        tk.Button(nav, text="OK", command=popup.destroy, **btn_style).pack(side='left', padx=6)
+        tk.Button(nav, text="Next", command=next_page, **btn_style).pack(side='left', padx=6)
+        self.fade_in(popup)
+        popup.transient(self.root)
+        popup.grab_set()
+        self.root.wait_window(popup)
+
+# --- Startup Menu ---
+def main_menu():
+    print("Welcome to Tic Tac Toe!")
+    print("\nFeatures:")
+    for feat in FEATURES_LIST:
+        print(f"- {feat}")
+    print("\n1. Console Version")
+    gui_available = load_tk()
+    if gui_available:
+        print("2. GUI Version")
+    while True:
+        choice = input("Select mode (1 for Console{}): ".format(", 2 for GUI" if gui_available else ""))
+        if choice == '1':
+            console_main_menu()
+            break
+        elif choice == '2' and gui_available:
+            run_gui()
+            break
+        else:
+            print("Invalid choice. Please enter a valid option.")
+
+# --- Console Game Menu ---
+def ask_board_size():
+    while True:
+        spec = input("Board size as rows x cols x win length (e.g. 15x15x5) or 'ultimate', Enter for 3x3: ")
+        try:
+            return parse_board_spec(spec)
+        except ValueError:
+            print("Invalid board size. Try again.")
+
+def console_menu():
+    print("Console Tic Tac Toe!")
+    print("1. Single Player vs AI")
+    print("2. Two Player (Local)")
+    while True:
+        choice = input("Select game mode (1 or 2): ")
+        if choice == '1':
+            name = input("Enter your name: ")
+            symbol = input("Choose your symbol (X/O): ").upper()
+            if symbol not in ['X', 'O']:
+                print("Invalid symbol. Defaulting to X.")
+                symbol = 'X'
+            ai_symbol = 'O' if symbol == 'X' else 'X'
+            print("Select AI Difficulty:")
+            print("1. Easy (Random)")
+            print("2. Medium (Rule-based)")
+            print("3. Hard (Minimax)")
+            print("4. MCTS (Monte Carlo)")
+            while True:
+                ai_choice = input("Enter 1, 2, 3, or 4: ")
+                if ai_choice in ['1', '2', '3', '4']:
+                    break
+                print("Invalid choice. Please enter 1, 2, 3, or 4.")
+            ai_mode = { '1': 'easy', '2': 'medium', '3': 'hard', '4': 'mcts' }[ai_choice]
+            rows, cols, win_length = ask_board_size()
+            player1 = Player(name, symbol)
+            player2 = Player(f"AI ({ai_mode})", ai_symbol, is_ai=True)
+            game = TicTacToeGame(player1, player2, ai_mode=ai_mode, rows=rows, cols=cols, win_length=win_length)
+            game.play()
+            break
+        elif choice == '2':
+            name1 = input("Player 1, enter your name: ")
+            symbol1 = input("Player 1, choose your symbol (X/O): ").upper()
+            if symbol1 not in ['X', 'O']:
+                print("Invalid symbol. Defaulting to X.")
+                symbol1 = 'X'
+            symbol2 = 'O' if symbol1 == 'X' else 'X'
+            name2 = input("Player 2, enter your name: ")
+            rows, cols, win_length = ask_board_size()
+            player1 = Player(name1, symbol1)
+            player2 = Player(name2, symbol2)
+            game = TicTacToeGame(player1, player2, rows=rows, cols=cols, win_length=win_length)
+            game.play()
+            break
+        else:
+            print("Invalid choice. Please enter 1 or 2.")
+
+# --- Console Main Menu ---
+def console_main_menu():
+    while True:
+        print("\n==== TIC TAC TOE ====")
+        print("1. Start Game")
+        print("2. Replay Last Game")
+        print("3. View Scoreboard")
+        print("4. Player Customization")
+        print("5. View Features/Help")
+        print("6. Exit")
+        choice = input("Select an option (1-6): ")
+        if choice == '1':
+            console_menu()
+        elif choice == '2':
+            replay_last_game()
+        elif choice == '3':
+            print_scoreboard()
+        elif choice == '4':
+            print("Player Customization feature coming soon!")
+        elif choice == '5':
+            print("\nFeatures:")
+            for feat in FEATURES_LIST:
+                print(f"- {feat}")
+        elif choice == '6':
+            print("Goodbye!")
+            exit()
+        else:
+            print("Invalid choice. Please enter a valid option.")
+
+# --- GUI Runner ---
+def run_gui(watch=None, speed=None, spec=None):
+    # watch: None for the menu, 'archive', or two AI modes to watch live self-play
+    if not load_tk():
+        print("tkinter is not available. Please install it to use the GUI version.")
+        return
+    root = tk.Tk()
+    root.geometry("420x540")
+    app = TicTacToeGUI(root)
+    if spec is not None:
+        app.board_size = spec
+    if watch == 'archive':
+        app.watch_archive(speed or 100)
+    elif watch is not None:
+        app.watch_self_play(*watch, speed=speed or 10)
+    root.mainloop()
+
+# --- Benchmarks ---
+# Metric names ending in _per_s are throughputs (higher is better); everything else is a latency in ms.
+# Each metric is the median of BENCH_REPEATS runs after a warmup run; latency changes smaller than
+# BENCH_NOISE_FLOOR_MS are never reported as regressions.
+BENCH_PLAYER_COUNTS = (100, 1000, 10000)
+BENCH_REPEATS = 5
+BENCH_NOISE_FLOOR_MS = 0.05
+
+def random_positions(count, rows=3, cols=3, win_length=3):
+    # Boards from random games, stopped before a random unfinished move, with the side to move
+    positions = []
+    while len(positions) < count:
+        board = BitBoard(rows, cols, win_length)
+        stop = random.randrange(board.size)
+        symbols = ('X', 'O')
+        for turn in range(board.size):
+            if turn == stop:
+                positions.append((board, symbols[turn % 2], symbols[1 - turn % 2]))
+                break
+            row, col = random.choice(board.empty_cells())
+            board.add_to_board(row, col, symbols[turn % 2])
+            if board.is_win(symbols[turn % 2]):
+                break
+    return positions
+
+def bench_is_win(calls):
+    boards = [board for board, _, _ in random_positions(256)]
+    for board in boards:
+        if board.last_move is None:
+            board.add_to_board(*board.empty_cells()[0], 'X')
+    started = time.perf_counter()
+    for i in range(calls):
+        board = boards[i & 255]
+        board.is_win(board.last_move[1])
+    return calls / (time.perf_counter() - started)
+
+def bench_ai_latency(mode, moves):
+    strategy = AI_STRATEGIES[mode]
+    samples = []
+    for board, symbol, opponent in random_positions(moves):
+        MCTS_AI.reusable.clear()  # A subtree kept from an earlier position would skew the timing
+        started = time.perf_counter()
+        strategy(board, symbol, opponent)
+        samples.append((time.perf_counter() - started) * 1000)
+    return latency_percentiles(samples)
+
+def latency_percentiles(samples):
+    # {'p50': ms, ...} for the percentiles with at least ten samples beyond them; a p99 from
+    # 200 samples is just the second slowest one and would only measure noise
+    samples = sorted(samples)
+    return {f'p{round(q * 100)}': percentile(samples, q) for q in (0.5, 0.9, 0.99)
+            if q == 0.5 or len(samples) * (1 - q) >= 10}
+
+def bench_games(games, mode='easy'):
+    strategies = [AI_STRATEGIES[mode], AI_STRATEGIES[mode]]
+    started = time.perf_counter()
+    for _ in range(games):
+        TicTacToeGame(Player(mode, 'X', is_ai=True), Player(mode, 'O', is_ai=True)).play_ai_game(strategies)
+    return games / (time.perf_counter() - started)
+
+def bench_scoreboard(players, updates):
+    # Per-game commit latency (batch_size=1) on a database already holding `players` names
+    import tempfile
+    with tempfile.TemporaryDirectory() as directory:
+        store = ScoreboardStore(os.path.join(directory, 'bench.db'), batch_size=1, flush_interval=3600)
+        try:
+            with store.lock:
+                store.conn.execute("BEGIN")
+                store.conn.executemany("INSERT INTO scores (name) VALUES (?)", ((f"player{i}",) for i in range(players)))
+                store.conn.execute("COMMIT")
+            samples = []
+            for i in range(updates):
+                a, b = f"player{random.randrange(players)}", f"player{random.randrange(players)}"
+                started = time.perf_counter()
+                store.record(random.choice((a, b, 'tie')), a, b)
+                samples.append((time.perf_counter() - started) * 1000)
+        finally:
+            store.close()
+    return latency_percentiles(samples)
+
+def start_virtual_display():
+    # Xvfb on the first free display number, or None if it is not installed
+    import shutil
+    import subprocess
+    if not shutil.which('Xvfb'):
+        return None
+    for number in range(99, 120):
+        if os.path.exists(f"/tmp/.X11-unix/X{number}"):
+            continue
+        process = subprocess.Popen(['Xvfb', f":{number}", '-screen', '0', '1024x768x24'],
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for _ in range(50):
+            if os.path.exists(f"/tmp/.X11-unix/X{number}") or process.poll() is not None:
+                break
+            time.sleep(0.1)
+        if process.poll() is None:
+            os.environ['DISPLAY'] = f":{number}"
+            return process
+    return None
+
+def bench_menu_build(repeats):
+    # Median setup_menu time, or None when there is no display (real or virtual) to build it on
+    if not load_tk():
+        return None
+    display = None
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        display = start_virtual_display()
+        if display is None:
+            return None
+        root = tk.Tk()
+    try:
+        app = TicTacToeGUI(root)
+        samples = []
+        for _ in range(repeats):
+            app.setup_menu()
+            root.update_idletasks()
+            samples.append(app.menu_build_ms)
+        samples.sort()
+        return samples[len(samples) // 2]
+    finally:
+        root.destroy()
+        if display is not None:
+            display.terminate()
+
+def run_benchmarks(quick=False, seed=0, repeats=BENCH_REPEATS):
+    # A warmup run (caches, solved table, imports) is thrown away; then each metric is the
+    # median over the repeats, every one of them on the same seeded positions
+    import statistics
+    scale = 10 if quick else 1
+    random.seed(seed)
+    run_benchmark_suite(scale * 10)
+    runs = []
+    for _ in range(repeats):
+        random.seed(seed)
+        runs.append(run_benchmark_suite(scale))
+    return {name: statistics.median(run[name] for run in runs) for name in runs[0]}
+
+def run_benchmark_suite(scale):
+    results = {'is_win_per_s': bench_is_win(1000000 // scale)}
+    for mode in AI_STRATEGIES:
+        for name, value in bench_ai_latency(mode, max(2, 200 // scale)).items():
+            results[f'ai_{mode}_{name}_ms'] = value
+    results['games_per_s'] = bench_games(max(1, 20000 // scale))
+    if load_numpy():
+        started = time.perf_counter()
+        simulate_batch(1000000 // scale)
+        results['batch_games_per_s'] = 1000000 // scale / (time.perf_counter() - started)
+    for players in BENCH_PLAYER_COUNTS:
+        for name, value in bench_scoreboard(players, max(2, 200 // scale)).items():
+            results[f'scoreboard_{players}_players_{name}_ms'] = value
+    menu_ms = bench_menu_build(max(1, 20 // scale))
+    if menu_ms is not None:
+        results['menu_build_ms'] = menu_ms
+    return results
+
+def compare_benchmarks(baseline, current, threshold=0.10, floor_ms=BENCH_NOISE_FLOOR_MS):
+    # (metric, baseline, current, relative change) for every metric that got worse by more than
+    # threshold; latencies that moved by less than floor_ms are noise at any relative change
+    regressions = []
+    for name, old in baseline.items():
+        new = current.get(name)
+        if new is None or not old:
+            continue
+        if not name.endswith('_per_s') and abs(new - old) < floor_ms:
+            continue
+        change = (new - old) / old
+        worse = -change if name.endswith('_per_s') else change
+        if worse > threshold:
+            regressions.append((name, old, new, change))
+    return regressions
+
+def print_benchmarks(results, baseline=None):
+    for name, value in results.items():
+        line = f"{name:40} {value:>14,.3f}" if value < 1000 else f"{name:40} {value:>14,.0f}"
+        if baseline and baseline.get(name):
+            line += f"   ({(value - baseline[name]) / baseline[name]:+.1%} vs baseline)"
+        print(line)
+
+# --- Command Line ---
+def parse_player_spec(spec, symbol, default_name):
+    # "ai:hard" or "human:Alice"
+    kind, _, value = spec.partition(':')
+    if kind == 'ai':
+        mode = value or 'easy'
+        if mode not in AI_STRATEGIES:
+            raise ValueError(f"unknown ai mode {mode!r} (choose from {', '.join(AI_STRATEGIES)})")
+        return Player(f"AI ({mode})", symbol, is_ai=True, ai_mode=mode)
+    if kind == 'human':
+        return Player(value or default_name, symbol)
+    raise ValueError(f"invalid player {spec!r}; expected ai:MODE or human:NAME")
+
+def play_cli_games(player1, player2, spec, games=1, record=True, show=True):
+    rows, cols, win_length = spec
+    if not (player1.is_ai and player2.is_ai):
+        for _ in range(games):
+            TicTacToeGame(player1, player2, rows=rows, cols=cols, win_length=win_length).play()
+        return
+    # Both seats are AI: no prompts and no per-move output
+    tally = [0, 0, 0]  # player 1 wins, player 2 wins, ties
+    strategies = [functools.partial(search_move, player1.ai_mode), functools.partial(search_move, player2.ai_mode)]
+    for _ in range(games):
+        game = TicTacToeGame(player1, player2, rows=rows, cols=cols, win_length=win_length)
+        winner = game.play_ai_game(strategies)
+        tally[2 if winner is None else winner] += 1
+        if record:
+            update_scoreboard('tie' if winner is None else game.players[winner].name, player1, player2)
+            record_game(game.players, game.board, game.move_history, winner)
+        if show and games == 1:
+            game.print_board()
+            print("It's a tie!" if winner is None else f"{game.players[winner].name} ({game.players[winner].symbol}) wins!")
+    if games > 1:
+        print(f"{player1.name} ({player1.symbol}) wins: {tally[0]}, {player2.name} ({player2.symbol}) wins: {tally[1]}, ties: {tally[2]}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tic Tac Toe")
+    parser.add_argument('--metrics', action='store_true', help="collect metrics and print a summary on exit")
+    parser.add_argument('--metrics-jsonl', metavar='FILE', help="append every metric observation to FILE as JSON lines")
+    parser.add_argument('--metrics-port', type=int, metavar='PORT', help=f"serve Prometheus metrics on localhost (e.g. {METRICS_PORT})")
+    commands = parser.add_subparsers(dest='command')
+    play = commands.add_parser('play', help="play from the command line; all-AI games never prompt")
+    play.add_argument('--p1', default='human:Player 1', help="ai:MODE or human:NAME (default: human)")
+    play.add_argument('--p2', default='ai:easy', help="ai:MODE or human:NAME (default: ai:easy)")
+    play.add_argument('--board', default='3x3x3', help="rows x cols x win length, or 'ultimate'")
+    play.add_argument('--games', type=int, default=1)
+    play.add_argument('--no-record', action='store_true', help="skip the scoreboard and game archive (all-AI games)")
+    play.add_argument('--mcts-time', type=float, default=MCTS_AI.time_limit, help="seconds per ai:mcts move (0 for no limit)")
+    play.add_argument('--mcts-playouts', type=int, default=MCTS_AI.playouts, help="playouts per ai:mcts move (0 for no limit)")
+    play.add_argument('--workers', type=int, default=AI_WORKERS, help="split each ai:mcts move across N processes for --mcts-time seconds (0 = all cores)")
+    simulate = commands.add_parser('simulate', help="headless self-play statistics")
+    simulate.add_argument('--games', type=int, default=100000)
+    simulate.add_argument('--first', default='easy', help="ai mode moving first")
+    simulate.add_argument('--second', default='easy', help="ai mode moving second")
+    simulate.add_argument('--seed', type=int, default=None)
+    scoreboard = commands.add_parser('scoreboard', help="print the scoreboard")
+    scoreboard.add_argument('--page-size', type=int, default=SCOREBOARD_PAGE_SIZE)
+    leaderboard = commands.add_parser('leaderboard', help="players ranked by Elo rating")
+    leaderboard.add_argument('--top', type=int, default=10, help="how many players to list")
+    leaderboard.add_argument('--player', help="show one player's rank instead")
+    leaderboard.add_argument('--range', nargs=2, type=float, metavar=('LOW', 'HIGH'), help="only ratings in [LOW, HIGH]")
+    commands.add_parser('rerate', help="recompute every rating from the game archive")
+    analytics = commands.add_parser('analytics', help="opening and result statistics over the game archive")
+    analytics.add_argument('--board', help="only this board (e.g. 3x3x3 or ultimate)")
+    analytics.add_argument('--opening', default='', help="positions played so far, e.g. 5,1: results by the next move")
+    analytics.add_argument('--player', help="losing openings for one player")
+    analytics.add_argument('--top', type=int, default=9, help="rows per table")
+    analytics.add_argument('--depth', type=int, default=OPENING_DEPTH, help="moves kept in the opening trie")
+    analytics.add_argument('--rebuild', action='store_true', help="ignore the cached aggregates and rescan every game")
+    analytics.add_argument('--workers', type=int, default=None, help="processes for scanning segments (default: all cores)")
+    replay = commands.add_parser('replay', help="replay the last finished game")
+    replay.add_argument('--delay', type=float, default=0.5, help="seconds between moves")
+    commands.add_parser('gui', help="open the GUI")
+    watch = commands.add_parser('watch', help="watch archived or live self-play games in the GUI")
+    watch.add_argument('--live', nargs=2, metavar=('AI1', 'AI2'), help="play these two AI modes against each other live")
+    watch.add_argument('--board', default='3x3x3', help="board for live games: ROWSxCOLSxWIN or 'ultimate'")
+    watch.add_argument('--speed', type=int, choices=SPECTATOR_SPEEDS, help="playback speed (default 100 for the archive, 10 live)")
+    commands.add_parser('build-table', help="rebuild the solved-position table")
+    tournament = commands.add_parser('tournament', help="round-robin between AI players")
+    tournament.add_argument('bots', nargs='*', help="ai modes to include (default: all registered)")
+    tournament.add_argument('--games', type=int, default=1000, help="games per pairing")
+    tournament.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    tournament.add_argument('--bot', action='append', default=[], metavar='NAME=MODULE:FUNCTION', help="load a plugin bot")
+    tournament.add_argument('--seed', type=int, default=None)
+    serve = commands.add_parser('serve', help="host multiplayer games over TCP")
+    serve.add_argument('--host', default=SERVER_HOST)
+    serve.add_argument('--port', type=int, default=SERVER_PORT)
+    serve.add_argument('--record', action='store_true', help="update the scoreboard and game archive")
+    serve.add_argument('--sessions', metavar='FILE', help="load 3x3 AI games from FILE and snapshot them there every minute and on exit")
+    serve.add_argument('--session-ttl', type=int, default=SESSION_TTL, help="seconds before an idle game is dropped")
+    loadgen = commands.add_parser('loadgen', help="drive a running server with simulated clients")
+    loadgen.add_argument('--host', default=SERVER_HOST)
+    loadgen.add_argument('--port', type=int, default=SERVER_PORT)
+    loadgen.add_argument('--clients', type=int, default=100)
+    loadgen.add_argument('--games', type=int, default=10, help="games per client")
+    loadgen.add_argument('--mode', choices=['ai', 'pvp'], default='ai')
+    loadgen.add_argument('--ai', default='easy', help="server-side ai mode for --mode ai")
+    bench = commands.add_parser('bench', help="run the benchmark suite")
+    bench.add_argument('--quick', action='store_true', help="a tenth of the iterations")
+    bench.add_argument('--seed', type=int, default=0)
+    bench.add_argument('--repeats', type=int, default=BENCH_REPEATS, help=f"runs per metric; the median is reported (default: {BENCH_REPEATS})")
+    bench.add_argument('--save', metavar='FILE', help="write the results as a JSON baseline")
+    bench.add_argument('--compare', metavar='FILE', help="fail if a metric regressed against this baseline")
+    bench.add_argument('--threshold', type=float, default=0.10, help="allowed relative regression (default: 0.10)")
+    args = parser.parse_args(argv)
+    if args.metrics or args.metrics_jsonl or args.metrics_port:
+        enable_metrics(args.metrics_jsonl, args.metrics_port)
+    try:
+        run_command(parser, args)
+    finally:
+        if METRICS is not None:
+            if args.metrics:
+                print(json.dumps(METRICS.snapshot(), indent=2))
+            disable_metrics()
+
+def run_command(parser, args):
+    global AI_WORKERS
+    if args.command == 'play':
+        try:
+            player1 = parse_player_spec(args.p1, 'X', "Player 1")
+            player2 = parse_player_spec(args.p2, 'O', "Player 2")
+            spec = parse_board_spec(args.board)
+        except ValueError as e:
+            parser.error(str(e))
+        if not (player1.is_ai and player2.is_ai) and not sys.stdin.isatty():
+            parser.error("human players need an interactive terminal; use ai:MODE for scripted runs")
+        if 'mcts' in (player1.ai_mode, player2.ai_mode):
+            if not args.mcts_time and not args.mcts_playouts:
+                parser.error("ai:mcts needs a time or playout budget")
+            MCTS_AI.time_limit = args.mcts_time or None
+            MCTS_AI.playouts = args.mcts_playouts or None
+        AI_WORKERS = args.workers or os.cpu_count() or 1
+        play_cli_games(player1, player2, spec, games=args.games, record=not args.no_record)
+        if MCTS_AI.total_playouts:
+            stats = MCTS_AI.stats()
+            print(f"MCTS: {stats['playouts']:,} playouts at {stats['playouts_per_second']:,.0f} playouts/s, {stats['reused_trees']} reused trees")
+    elif args.command == 'simulate':
+        for mode in (args.first, args.second):
+            if mode not in AI_STRATEGIES:
+                parser.error(f"unknown ai mode {mode!r}")
+        started = time.perf_counter()
+        result = simulate_games(args.games, args.first, args.second, seed=args.seed)
+        elapsed = time.perf_counter() - started
+        print(f"{args.first} (first) wins: {result['first']}, {args.second} (second) wins: {result['second']}, ties: {result['tie']}")
+        print(f"{args.games} games in {elapsed:.2f}s ({args.games / elapsed:,.0f} games/s)")
+    elif args.command == 'scoreboard':
+        print_scoreboard(args.page_size, interactive=False)
+    elif args.command == 'leaderboard':
+        print_leaderboard(args.top, args.player, args.range)
+    elif args.command == 'rerate':
+        count = get_scoreboard().rerate(GameArchive())
+        print(f"Re-rated {count} players from {GAME_ARCHIVE_DIR}/")
+    elif args.command == 'analytics':
+        try:
+            geometry = geometry_name(*parse_board_spec(args.board)) if args.board else None
+            prefix = tuple(int(p) - 1 for p in args.opening.replace(' ', '').split(',') if p)
+        except ValueError as e:
+            parser.error(str(e))
+        if len(prefix) >= args.depth:
+            parser.error(f"--opening can be at most {args.depth - 1} moves with --depth {args.depth}")
+        started = time.perf_counter()
+        analytics, new_games = update_analytics(depth=args.depth, rebuild=args.rebuild, workers=args.workers)
+        print(f"Read {new_games:,} new games in {time.perf_counter() - started:.2f}s")
+        print_analytics(analytics, args.top, geometry, prefix, args.player)
+    elif args.command == 'replay':
+        record = get_archive().last()
+        if record is None:
+            print("No finished games to replay yet.")
+        else:
+            replay_console(record, delay=args.delay)
+    elif args.command == 'gui':
+        run_gui()
+    elif args.command == 'watch':
+        try:
+            spec = parse_board_spec(args.board)
+        except ValueError as e:
+            parser.error(str(e))
+        unknown = [mode for mode in args.live or () if mode not in AI_STRATEGIES]
+        if unknown:
+            parser.error(f"unknown ai mode {unknown[0]!r} (choose from {', '.join(AI_STRATEGIES)})")
+        run_gui(args.live or 'archive', args.speed, spec)
+    elif args.command == 'build-table':
+        count = build_solved_table()
+        print(f"Solved {count} positions into {SOLVED_TABLE_FILE}")
+    elif args.command == 'tournament':
+        for spec in args.bot:
+            load_ai_plugin(spec)
+        bots = args.bots or list(AI_STRATEGIES)
+        unknown = [bot for bot in bots if bot not in AI_STRATEGIES]
+        if unknown or len(bots) < 2:
+            parser.error(f"need at least two known bots (unknown: {', '.join(unknown) or 'none'})")
+        results = run_tournament(bots, games=args.games, workers=args.workers, plugins=args.bot, seed=args.seed)
+        print_tournament(results)
+    elif args.command == 'serve':
+        run_server(args.host, args.port, record=args.record, sessions_path=args.sessions, session_ttl=args.session_ttl)
+    elif args.command == 'loadgen':
+        run_loadgen(args.host, args.port, args.clients, args.games, args.mode, args.ai)
+    elif args.command == 'bench':
+        baseline = None
+        if args.compare:
+            with open(args.compare, 'r') as f:
+                saved = json.load(f)
+            if saved.get('quick', False) != args.quick:
+                parser.error(f"{args.compare} was recorded {'with' if saved.get('quick') else 'without'} --quick; "
+                             "compare runs of the same mode")
+            baseline = saved['results']
+        results = run_benchmarks(quick=args.quick, seed=args.seed, repeats=args.repeats)
+        print_benchmarks(results, baseline)
+        if args.save:
+            with open(args.save, 'w') as f:
+                json.dump({'python': sys.version.split()[0], 'platform': sys.platform, 'quick': args.quick, 'repeats': args.repeats,
+                           'created': int(time.time()), 'results': results}, f, indent=2)
+            print(f"Baseline saved to {args.save}")
+        if baseline is not None:
+            regressions = compare_benchmarks(baseline, results, args.threshold)
+            for name, old, new, change in regressions:
+                print(f"REGRESSION {name}: {old:,.3f} -> {new:,.3f} ({change:+.1%})")
+            if regressions:
+                sys.exit(1)
+            print(f"No regressions beyond {args.threshold:.0%}")
+    else:
+        main_menu()
+
+if __name__ == "__main__":
+    main()
+ 
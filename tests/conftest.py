@@ -0,0 +1,15 @@
+import importlib.util
+import os
+
+import pytest
+
+GAME_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "TIC TAC TOE.py")
+
+
+@pytest.fixture(scope="session")
+def ttt():
+    # The game is a single script with a space in its name, so load it by path
+    spec = importlib.util.spec_from_file_location("tic_tac_toe", GAME_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
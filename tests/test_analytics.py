@@ -0,0 +1,68 @@
+import os
+
+
+def make_record(ttt, moves, result, names=("Ann", "Bob"), rows=3, cols=3, win_length=3):
+    return ttt.GameRecord(1700000000, names[0], names[1], "X", "O", result, rows, cols, win_length, moves)
+
+
+def fill(ttt, archive):
+    archive.append(make_record(ttt, [4, 0, 8, 2, 1, 7, 6], ttt.RESULT_PLAYER2))
+    archive.append(make_record(ttt, [4, 0, 8], ttt.RESULT_PLAYER1))
+    archive.append(make_record(ttt, [0, 4], ttt.RESULT_TIE, names=("Bob", "Cy")))
+    archive.append(make_record(ttt, [40, 41], ttt.RESULT_PLAYER1, names=("Cy", "Ann"), rows=9, cols=9, win_length=ttt.ULTIMATE))
+
+
+def test_openings_and_player_tallies(ttt, tmp_path):
+    archive = ttt.GameArchive(str(tmp_path / "archive"))
+    fill(ttt, archive)
+    analytics = ttt.ArchiveAnalytics(depth=2)
+    assert analytics.update(archive) == 4
+    assert analytics.opening("3x3x3")[:3] == [1, 1, 1]
+    assert analytics.opening("3x3x3", (4,))[:3] == [1, 1, 0]
+    assert analytics.opening("3x3x3", (4, 0))[:3] == [1, 1, 0]
+    assert analytics.opening("3x3x3", (4, 0, 8)) is None  # deeper than depth
+    assert analytics.opening("ultimate", (40, 41))[:3] == [1, 0, 0]
+    assert analytics.players == {"Ann": [1, 2, 0], "Bob": [1, 1, 1], "Cy": [1, 0, 1]}
+    assert analytics.losing["Ann"] == {("3x3x3", (4, 0)): 1, ("ultimate", (40, 41)): 1}
+
+
+def test_update_reads_only_new_games(ttt, tmp_path):
+    # Several small segments, scanned in this process (workers=1)
+    archive = ttt.GameArchive(str(tmp_path / "archive"), segment_size=64)
+    fill(ttt, archive)
+    assert len(archive.segments()) > 1
+    _, new_games = ttt.update_analytics(archive, depth=3, workers=1)
+    assert new_games == 4
+    assert os.path.exists(os.path.join(archive.directory, ttt.ANALYTICS_FILE))
+    archive.append(make_record(ttt, [4, 0, 8], ttt.RESULT_PLAYER1))
+    cached, new_games = ttt.update_analytics(archive, depth=3, workers=1)
+    assert new_games == 1 and cached.games == 5
+    rebuilt, _ = ttt.update_analytics(archive, depth=3, rebuild=True, workers=1)
+    assert rebuilt.openings == cached.openings and rebuilt.players == cached.players
+    assert rebuilt.losing == cached.losing
+
+
+def test_partial_record_waits_for_the_next_update(ttt, tmp_path):
+    archive = ttt.GameArchive(str(tmp_path / "archive"))
+    archive.append(make_record(ttt, [4, 0, 8], ttt.RESULT_PLAYER1))
+    data = ttt.encode_game_record(make_record(ttt, [0, 4], ttt.RESULT_TIE))
+    with open(archive.segments()[-1], "ab") as f:
+        f.write(data[:5])
+    analytics = ttt.ArchiveAnalytics()
+    assert analytics.update(archive) == 1
+    with open(archive.segments()[-1], "ab") as f:
+        f.write(data[5:])
+    assert analytics.update(archive) == 1
+    assert analytics.opening("3x3x3")[:3] == [1, 0, 1]
+
+
+def test_losing_lines_are_bounded(ttt):
+    analytics = ttt.ArchiveAnalytics()
+    for i in range(ttt.LOSING_LINES_KEPT * 3):
+        analytics.add("5x5x4", (i,), ttt.RESULT_PLAYER2, "Ann", "Bob")
+    for _ in range(5):
+        analytics.add("5x5x4", (0, 1), ttt.RESULT_PLAYER2, "Ann", "Bob")
+    lines = analytics.losing["Ann"]
+    assert len(lines) <= ttt.LOSING_LINES_KEPT
+    # Misra-Gries keeps the frequent line, with a lower-bound count
+    assert 0 < lines[("5x5x4", (0, 1))] <= 5
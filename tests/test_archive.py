@@ -0,0 +1,72 @@
+import io
+
+import pytest
+
+
+def make_record(ttt, rows, cols, win_length, moves, result=1, names=("Ann", "Bob"), symbol1="X"):
+    symbol2 = "O" if symbol1 == "X" else "X"
+    return ttt.GameRecord(1700000000, names[0], names[1], symbol1, symbol2, result, rows, cols, win_length, moves)
+
+
+@pytest.mark.parametrize("rows, cols, win_length, moves", [
+    (3, 3, 3, [4, 0, 8, 2, 6, 3, 5]),        # nibbles, odd count
+    (4, 4, 4, [15, 0, 14, 1]),               # nibbles, largest cell
+    (9, 9, 0, [40, 4, 80]),                  # one byte per move
+    (16, 16, 5, [255, 0, 17]),               # largest one-byte board
+    (255, 255, 5, [0, 65024, 255 * 255 - 1]),  # two bytes per move, largest board
+])
+def test_records_round_trip(ttt, rows, cols, win_length, moves):
+    record = make_record(ttt, rows, cols, win_length, moves, result=ttt.RESULT_PLAYER2, symbol1="O")
+    data = ttt.encode_game_record(record)
+    header = ttt.RECORD_HEADER.unpack_from(data)
+    assert len(data) == ttt.RECORD_HEADER.size + ttt.record_body_size(header[1], len(moves), 3, 3)
+    assert ttt.read_game_record(io.BytesIO(data)) == record
+
+
+def test_truncated_record_reads_as_end(ttt):
+    data = ttt.encode_game_record(make_record(ttt, 3, 3, 3, [0, 1, 2]))
+    assert ttt.read_game_record(io.BytesIO(data[:-1])) is None
+    assert ttt.read_game_record(io.BytesIO(b"")) is None
+
+
+def test_board_specs_fit_a_record(ttt):
+    assert ttt.parse_board_spec("255x255x5") == (255, 255, 5)
+    assert ttt.parse_board_spec("15x15x5") == (15, 15, 5)
+    assert ttt.parse_board_spec("ultimate") == (9, 9, ttt.ULTIMATE)
+    for spec in ("256x3x3", "3x256x3", "300x1x1"):
+        with pytest.raises(ValueError, match="at most"):
+            ttt.parse_board_spec(spec)
+    with pytest.raises(ValueError, match="Win length"):
+        ttt.parse_board_spec("3x3x4")
+
+
+def test_archive_appends_iterates_and_finds_the_last_game(ttt, tmp_path):
+    directory = str(tmp_path / "archive")
+    archive = ttt.GameArchive(directory, segment_size=64)
+    records = [make_record(ttt, 3, 3, 3, list(range(n))) for n in range(1, 8)]
+    for record in records:
+        archive.append(record)
+    assert len(archive.segments()) > 1
+    assert list(archive) == records
+    assert archive.last() == records[-1]
+    # A fresh archive finds it by walking the newest segment
+    assert ttt.GameArchive(directory).last() == records[-1]
+
+
+def test_last_skips_a_partly_written_record(ttt, tmp_path):
+    directory = str(tmp_path / "archive")
+    archive = ttt.GameArchive(directory)
+    first, second = make_record(ttt, 3, 3, 3, [0]), make_record(ttt, 3, 3, 3, [0, 1])
+    archive.append(first)
+    with open(archive.segments()[-1], "ab") as f:
+        f.write(ttt.encode_game_record(second)[:-2])
+    assert ttt.GameArchive(directory).last() == first
+    assert list(ttt.GameArchive(directory)) == [first]
+
+
+def test_segments_are_checked_for_the_magic(ttt, tmp_path):
+    directory = tmp_path / "archive"
+    directory.mkdir()
+    (directory / "games-000001.bin").write_bytes(b"nope")
+    with pytest.raises(ValueError, match="not a game archive"):
+        list(ttt.GameArchive(str(directory)))
@@ -0,0 +1,82 @@
+import pytest
+
+
+def play(engine, cells):
+    events = []
+    for cell in cells:
+        events = engine.step(cell)
+    return events
+
+
+def test_row_win_ends_the_game(ttt):
+    engine = ttt.GameEngine()
+    events = play(engine, [0, 3, 1, 4, 2])
+    assert [event.kind for event in events] == [ttt.EVENT_MOVE, ttt.EVENT_WIN]
+    assert events[1].line == (0, 1, 2)
+    assert engine.over and engine.winner == 0
+    with pytest.raises(ttt.IllegalMove, match="over"):
+        engine.step(8)
+
+
+def test_full_board_is_a_tie(ttt):
+    engine = ttt.GameEngine()
+    events = play(engine, [0, 1, 2, 4, 3, 5, 7, 6, 8])
+    assert events[-1].kind == ttt.EVENT_TIE
+    assert engine.over and engine.winner is None
+
+
+def test_taken_and_out_of_range_moves_are_rejected(ttt):
+    engine = ttt.GameEngine()
+    engine.step((1, 1))
+    with pytest.raises(ttt.IllegalMove, match="taken"):
+        engine.step(4)
+    # (0, 3) would wrap onto cell 3 if only the flat index were checked
+    for move in (9, -1, (0, 3), (3, 0), (-1, 2)):
+        with pytest.raises(ttt.IllegalMove, match="out of bounds"):
+            engine.step(move)
+    assert engine.turns == 1 and engine.current == 1
+
+
+def test_undo_and_redo_walk_the_history(ttt):
+    engine = ttt.GameEngine()
+    with pytest.raises(ttt.IllegalMove, match="undo"):
+        engine.step(ttt.EVENT_UNDO)
+    play(engine, [4, 0, 8])
+    engine.step(ttt.EVENT_UNDO)
+    engine.step(ttt.EVENT_UNDO)
+    assert engine.turns == 1 and engine.current == 1
+    assert not engine.is_taken(0, 0) and engine.is_taken(1, 1)
+    engine.step(ttt.EVENT_REDO)
+    assert engine.is_taken(0, 0) and engine.current == 0
+    # A new move after undo starts a variation; redo then has nothing to replay
+    engine.step(2)
+    with pytest.raises(ttt.IllegalMove, match="redo"):
+        engine.step(ttt.EVENT_REDO)
+    assert [state.cell for state in engine.history.line()] == [4, 0, 2]
+
+
+def test_undo_reopens_a_finished_game(ttt):
+    engine = ttt.GameEngine()
+    play(engine, [0, 3, 1, 4, 2])
+    events = engine.step(ttt.EVENT_UNDO)
+    assert events[0].kind == ttt.EVENT_UNDO and events[0].cell == 2
+    assert not engine.over and engine.winner is None and engine.current == 0
+    events = engine.step(ttt.EVENT_REDO)
+    assert [event.kind for event in events] == [ttt.EVENT_REDO, ttt.EVENT_WIN]
+
+
+def test_larger_board_needs_the_full_win_length(ttt):
+    engine = ttt.GameEngine(rows=5, cols=5, win_length=4)
+    events = play(engine, [0, 5, 1, 6, 2, 7])
+    assert not engine.over
+    events = play(engine, [3])
+    assert events[-1].kind == ttt.EVENT_WIN and events[-1].line == (0, 1, 2, 3)
+
+
+def test_ultimate_forces_the_next_board(ttt):
+    engine = ttt.GameEngine(rows=9, cols=9, win_length=ttt.ULTIMATE)
+    engine.step((0, 1))  # top-middle cell of the top-left board sends O to the top-middle board
+    with pytest.raises(ttt.IllegalMove, match="not in play"):
+        engine.step((4, 4))
+    engine.step((0, 3))
+    assert engine.board.forced == 0
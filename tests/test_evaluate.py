@@ -0,0 +1,55 @@
+import pytest
+
+
+def rotate(cells):
+    # Quarter turn clockwise of a 9-character position
+    return "".join(cells[6 - 3 * (i % 3) + i // 3] for i in range(9))
+
+
+def test_known_positions(ttt):
+    empty, win, lost = ttt.evaluate_many(["---------", "XX-OO----", "XX-OO-X--"])
+    assert (empty.to_move, empty.outcome, empty.value) == ("X", "draw", 0)
+    assert len(empty.best_moves) == 9
+    assert (win.to_move, win.outcome, win.best_moves) == ("X", "win", [(0, 2)])
+    assert win.pv == [(0, 2)]
+    assert (lost.to_move, lost.outcome, lost.best_moves) == ("O", "win", [(1, 2)])
+    # X can only block one of two threats
+    fork = ttt.evaluate_many(["X---O---X"], to_move="O")[0]
+    assert fork.outcome == "draw"
+    assert ttt.evaluate_many(["X---O---X"], to_move="X")[0].outcome == "win"
+
+
+def test_input_forms_agree(ttt):
+    x, o = 1 << 0 | 1 << 4, 1 << 8
+    forms = ["X---X---O", [["X", "-", "-"], ["-", "X", "-"], ["-", "-", "O"]], (x, o)]
+    board = ttt.BitBoard()
+    for cell, symbol in ((0, "X"), (8, "O"), (4, "X")):
+        board.add_to_board(*divmod(cell, 3), symbol)
+    forms.append(board)
+    results = ttt.evaluate_many(forms)
+    assert all(result == results[0] for result in results)
+
+
+def test_symmetric_positions_share_one_search(ttt):
+    evaluator = ttt.PositionEvaluator()
+    position = "XO--X----"
+    turned = [position]
+    for _ in range(3):
+        turned.append(rotate(turned[-1]))
+    results = evaluator.evaluate_many(turned)
+    assert evaluator.misses == 1 and evaluator.deduplicated == 3
+    assert len({result.value for result in results}) == 1
+    # Best moves come back in each caller's orientation
+    for cells, result in zip(turned, results):
+        for row, col in result.best_moves:
+            assert cells[row * 3 + col] == "-"
+    assert evaluator.evaluate_many([position])[0] == results[0]
+    assert evaluator.hits == 1
+
+
+def test_bad_positions_are_rejected(ttt):
+    for board in ("XXX", "XXXOOO---", (1, 1), [["X"] * 3] * 2):
+        with pytest.raises(ValueError):
+            ttt.evaluate_many([board])
+    with pytest.raises(ValueError, match="3x3"):
+        ttt.evaluate_many([ttt.BitBoard(4, 4, 3)])
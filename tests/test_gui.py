@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+
+@pytest.fixture
+def gui(ttt):
+    if not ttt.load_tk():
+        pytest.skip("tkinter is not installed")
+    try:
+        root = ttt.tk.Tk()
+    except ttt.tk.TclError:
+        pytest.skip("no display available")
+    root.withdraw()
+    app = ttt.TicTacToeGUI(root)
+    yield app
+    app.clear_window()
+    root.destroy()
+
+
+def pump(app, until, timeout=10.0):
+    # Runs the Tk loop until the condition holds, so after() callbacks and AI polls fire
+    deadline = time.monotonic() + timeout
+    while not until():
+        assert time.monotonic() < deadline, "timed out waiting for the GUI"
+        app.root.update()
+        time.sleep(0.005)
+
+
+def start_vs_ai(ttt, app, human_first):
+    human, ai = ttt.Player("Human", "X" if human_first else "O"), ttt.Player("AI (easy)", "O" if human_first else "X", is_ai=True)
+    app.player1, app.player2 = (human, ai) if human_first else (ai, human)
+    app.ai_mode = 'easy'
+    app.start_game()
+
+
+def test_undo_then_redo_against_the_ai(ttt, gui):
+    start_vs_ai(ttt, gui, human_first=True)
+    gui.click(1, 1)
+    pump(gui, lambda: gui.game.turns == 2)
+    ai_cell = gui.game.history.current.cell
+
+    # Undo takes back the AI's reply and the human move, leaving the human to move
+    gui.undo()
+    assert gui.game.turns == 0
+    assert not gui.get_current_player().is_ai
+    assert gui.ai_after_id is None and gui.search is None
+
+    # Redo replays both, and the human can move again
+    gui.redo()
+    assert gui.game.turns == 2
+    assert gui.game.history.current.cell == ai_cell
+    assert not gui.get_current_player().is_ai
+    assert gui.buttons[1][1].cget('text') == 'X'
+
+    # Undo while the AI is about to answer takes back just the human move
+    free = next((r, c) for r in range(3) for c in range(3) if not gui.game.is_taken(r, c))
+    gui.click(*free)
+    assert gui.get_current_player().is_ai
+    gui.undo()
+    assert gui.game.turns == 2
+    assert not gui.get_current_player().is_ai
+    gui.click(*free)
+    pump(gui, lambda: gui.game.turns == 4)
+
+
+def test_undo_restarts_the_ai_when_it_moved_first(ttt, gui):
+    start_vs_ai(ttt, gui, human_first=False)
+    pump(gui, lambda: gui.game.turns == 1)
+    gui.undo()
+    assert gui.game.turns == 0
+    # The AI is to move again and must not be left waiting
+    assert gui.ai_after_id is not None or gui.search is not None
+    pump(gui, lambda: gui.game.turns == 1)
+    assert not gui.get_current_player().is_ai
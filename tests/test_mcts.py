@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+
+@pytest.fixture
+def mcts(ttt):
+    # A fixed playout budget keeps the tests quick and independent of machine speed
+    random.seed(0)
+    return ttt.MCTSAI(time_limit=None, playouts=300)
+
+
+def play_out(mcts, engine, limit):
+    # MCTS plays both sides; every move must be accepted by the engine
+    symbols = engine.symbols
+    for _ in range(limit):
+        if engine.over:
+            break
+        move = mcts.choose(engine.board, symbols[engine.current], symbols[1 - engine.current])
+        engine.step(move)
+
+
+def test_classic_games_are_legal_and_take_wins(ttt, mcts):
+    engine = ttt.GameEngine()
+    play_out(mcts, engine, 9)
+    assert engine.over
+    # X to move with two in a row takes the third
+    engine = ttt.GameEngine()
+    for cell in (0, 3, 1, 4):
+        engine.step(cell)
+    assert mcts.choose(engine.board, "X", "O") == (0, 2)
+
+
+def test_large_board_moves_are_legal(ttt, mcts):
+    engine = ttt.GameEngine(rows=15, cols=15, win_length=5)
+    play_out(mcts, engine, 12)
+    assert engine.turns == 12
+
+
+def test_ultimate_moves_respect_the_forced_board(ttt, mcts):
+    engine = ttt.GameEngine(rows=9, cols=9, win_length=ttt.ULTIMATE)
+    for _ in range(30):
+        if engine.over:
+            break
+        forced = engine.board.forced
+        move = mcts.choose(engine.board, engine.symbols[engine.current], engine.symbols[1 - engine.current])
+        if forced is not None:
+            assert (move[0] // 3) * 3 + move[1] // 3 == forced
+        engine.step(move)
+
+
+def test_subtrees_are_reused_and_bounded(ttt, mcts, monkeypatch):
+    play_out(mcts, ttt.GameEngine(rows=4, cols=4, win_length=3), 16)
+    assert mcts.reused > 0
+    monkeypatch.setattr(ttt, "MCTS_KEPT_SUBTREES", 4)
+    play_out(mcts, ttt.GameEngine(rows=4, cols=4, win_length=3), 16)
+    assert len(mcts.reusable) <= 4
@@ -0,0 +1,84 @@
+import re
+
+METRIC_NAME = re.compile(r"[a-zA-Z_:][a-zA-Z0-9_:]*")
+SAMPLE = re.compile(r"(?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(?P<labels>[^}]*)\})? (?P<value>\S+)(?: (?P<timestamp>-?\d+))?")
+LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\\n]|\\[\\"n])*)"')
+TYPES = {"counter", "gauge", "summary", "histogram", "untyped"}
+
+
+def family_of(sample_name, declared_type, family):
+    # Sample names a family of the given type may use (text exposition format 0.0.4)
+    if declared_type == "summary":
+        return sample_name in (family, family + "_sum", family + "_count")
+    if declared_type == "histogram":
+        return sample_name in (family + "_bucket", family + "_sum", family + "_count")
+    return sample_name == family
+
+
+def parse_exposition(text):
+    # Strict parser: every family is declared once, before its samples, and its
+    # samples form one contiguous block. Returns {family: (type, [(name, labels, value)])}.
+    assert text.endswith("\n")
+    families = {}
+    current = None
+    closed = set()
+    for line in text[:-1].split("\n"):
+        assert line, "blank lines are not expected"
+        if line.startswith("#"):
+            parts = line.split(" ", 3)
+            if parts[1] == "TYPE":
+                assert len(parts) == 4, line
+                name, kind = parts[2], parts[3]
+                assert METRIC_NAME.fullmatch(name) and kind in TYPES, line
+                assert name not in families, f"{name} declared twice"
+                if current is not None:
+                    closed.add(current)
+                families[name] = (kind, [])
+                current = name
+            continue
+        match = SAMPLE.fullmatch(line)
+        assert match, f"malformed sample: {line!r}"
+        name = match.group("name")
+        labels = {}
+        if match.group("labels"):
+            raw = match.group("labels")
+            pairs = LABEL.findall(raw)
+            assert ",".join(f'{k}="{v}"' for k, v in pairs) == raw, f"malformed labels: {raw!r}"
+            labels = dict(pairs)
+            assert len(labels) == len(pairs), "duplicate label"
+        float(match.group("value"))
+        assert current is not None, f"sample before any TYPE: {line!r}"
+        kind, samples = families[current]
+        assert family_of(name, kind, current), f"{name} is outside the {current} block"
+        assert not any(family_of(name, families[f][0], f) for f in closed), f"{name} reopens a closed family"
+        samples.append((name, labels, float(match.group("value"))))
+    return families
+
+
+def test_prometheus_text_families_are_contiguous(ttt):
+    registry = ttt.MetricsRegistry()
+    registry.count("games_finished_total", source="gui")
+    registry.count("games_finished_total", 2, source="server")
+    registry.count("ai_moves_total", mode="hard")
+    registry.timing("ai_think_seconds", 0.5, mode="hard")
+    registry.timing("ai_think_seconds", 0.25, mode="mcts")
+    registry.timing("ai_think_seconds", 0.75, mode="mcts")
+    registry.timing("scoreboard_write_seconds", 0.001)
+    registry.timing("input_wait_seconds", 2.0, source='say "hi"\\')
+
+    families = parse_exposition(registry.prometheus_text())
+
+    assert families["tictactoe_games_finished_total"][0] == "counter"
+    kind, samples = families["tictactoe_ai_think_seconds"]
+    assert kind == "summary"
+    assert ("tictactoe_ai_think_seconds_count", {"mode": "mcts"}, 2.0) in samples
+    assert ("tictactoe_ai_think_seconds_sum", {"mode": "mcts"}, 1.0) in samples
+    kind, samples = families["tictactoe_ai_think_seconds_max"]
+    assert kind == "gauge"
+    assert samples == [("tictactoe_ai_think_seconds_max", {"mode": "hard"}, 0.5),
+                               ("tictactoe_ai_think_seconds_max", {"mode": "mcts"}, 0.75)]
+    assert families["tictactoe_input_wait_seconds_max"][1][0][1] == {"source": 'say \\"hi\\"\\\\'}
+
+
+def test_prometheus_text_empty_registry(ttt):
+    assert ttt.MetricsRegistry().prometheus_text() == ""
@@ -0,0 +1,93 @@
+import gc
+import random
+import sqlite3
+import weakref
+
+import pytest
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    # No legacy scoreboard.json gets imported from the working directory
+    monkeypatch.chdir(tmp_path)
+    return str(tmp_path / "scores.db")
+
+
+def brute_rank(path, name):
+    ratings = dict(sqlite3.connect(path).execute("SELECT name, rating FROM scores"))
+    if name not in ratings:
+        return None
+    return 1 + sum(1 for rating in ratings.values() if rating > ratings[name])
+
+
+def test_elo_deltas(ttt):
+    assert ttt.elo_deltas(1500, 1500, 1.0) == (16.0, -16.0)
+    assert ttt.elo_deltas(1500, 1500, 0.5) == (0.0, 0.0)
+    up, down = ttt.elo_deltas(1400, 1600, 1.0)
+    assert up == -down and up > 16
+    # The favourite gains little from a win and loses a lot from a loss
+    assert ttt.elo_deltas(1600, 1400, 1.0)[0] < 16 < -ttt.elo_deltas(1600, 1400, 0.0)[0]
+
+
+def test_record_updates_counts_and_ratings(ttt, db_path):
+    store = ttt.ScoreboardStore(db_path, batch_size=4)
+    try:
+        store.record("Ann", "Ann", "Bob")
+        store.record("tie", "Ann", "Bob")
+        rating = 1516 + ttt.elo_deltas(1516, 1484, 0.5)[0]
+        assert store.get("Ann") == {"wins": 1, "losses": 0, "ties": 1, "rating": pytest.approx(rating)}
+        assert store.get("Bob")["losses"] == 1
+        assert store.count() == 2
+        assert [name for name, _ in store.top(2)] == ["Ann", "Bob"]
+    finally:
+        store.close()
+
+
+def test_rank_matches_a_full_scan(ttt, db_path):
+    store = ttt.ScoreboardStore(db_path, batch_size=3)
+    names = [f"p{i}" for i in range(30)]
+    rng = random.Random(1)
+    try:
+        for i in range(400):
+            a, b = rng.sample(names, 2)
+            store.record(rng.choice((a, b, "tie")), a, b)
+            if i % 5 == 0:
+                name = rng.choice(names + ["nobody"])
+                assert store.rank(name) == brute_rank(db_path, name)
+    finally:
+        store.close()
+
+
+def test_rank_follows_another_writer(ttt, db_path):
+    # The second store stands in for another process writing to the same database
+    mine = ttt.ScoreboardStore(db_path, batch_size=1)
+    theirs = ttt.ScoreboardStore(db_path, batch_size=1)
+    names = [f"p{i}" for i in range(20)]
+    rng = random.Random(2)
+    try:
+        mine.record("p0", "p0", "p1")
+        mine.rank("p0")
+        built = mine.rank_index
+        for _ in range(200):
+            a, b = rng.sample(names, 2)
+            rng.choice((mine, theirs)).record(rng.choice((a, b, "tie")), a, b)
+            name = rng.choice(names)
+            assert mine.rank(name) == brute_rank(db_path, name)
+        # Caught up from the changed rows rather than rebuilt
+        assert mine.rank_index is built
+        theirs.rerate([])
+        assert all(mine.rank(name) == 1 for name in names)
+    finally:
+        mine.close()
+        theirs.close()
+
+
+def test_closed_stores_are_released(ttt, db_path):
+    store = ttt.ScoreboardStore(db_path)
+    store.record("Ann", "Ann", "Bob")
+    ref = weakref.ref(store)
+    store.close()
+    store.close()
+    del store
+    gc.collect()
+    assert ref() is None
@@ -0,0 +1,111 @@
+import struct
+
+import pytest
+
+
+def new_game(ttt, cells=(), undo=0):
+    game = ttt.TicTacToeGame(ttt.Player("Ann", "X"), ttt.Player("AI (hard)", "O", is_ai=True), ai_mode="hard")
+    for cell in cells:
+        game.step(cell)
+    for _ in range(undo):
+        game.step(ttt.EVENT_UNDO)
+    return game
+
+
+def same_game(a, b):
+    return (a.board.masks == b.board.masks and a.current == b.current and a.turns == b.turns
+            and [s.cell for s in a.history.line()] == [s.cell for s in b.history.line()])
+
+
+@pytest.mark.parametrize("cells, undo", [((), 0), ((4, 0, 8), 0), ((4, 0, 8, 2, 6), 2), ((0, 3, 1, 4, 2), 0)])
+def test_pack_round_trips_with_the_redo_line(ttt, cells, undo):
+    game = new_game(ttt, cells, undo)
+    restored = ttt.unpack_game(ttt.pack_game(game), *game.players)
+    assert same_game(game, restored)
+    assert restored.over == game.over
+    for _ in range(undo):
+        restored.step(ttt.EVENT_REDO)
+    assert [s.cell for s in restored.history.line()] == list(cells)
+
+
+def test_corrupt_state_is_rejected(ttt):
+    game = new_game(ttt, (4, 0))
+    with pytest.raises(ValueError, match="Corrupt"):
+        ttt.unpack_game(ttt.pack_game(game) ^ 1 << 8, *game.players)
+
+
+def test_store_put_get_update_and_remove(ttt):
+    store = ttt.SessionStore()
+    game = new_game(ttt, (4,))
+    session_id = store.put(game, now=1000)
+    assert len(store) == 1
+    restored = store.get(session_id)
+    assert same_game(game, restored)
+    assert restored.players[1].is_ai and restored.players[1].ai_mode == "hard"
+    game.step(0)
+    assert store.update(session_id, game, now=1001)
+    assert same_game(game, store.get(session_id))
+    store.remove(session_id)
+    assert store.get(session_id) is None and not store.update(session_id, game)
+    # The slot is reused, but the old id does not reach the new game
+    other = store.put(new_game(ttt), now=1002)
+    assert other & 0xFFFFFF == session_id & 0xFFFFFF
+    assert store.get(session_id) is None and store.get(other) is not None
+    for bad in (None, -1, "1", 1 << 60):
+        assert store.get(bad) is None
+
+
+def test_only_classic_games_are_stored(ttt):
+    game = ttt.TicTacToeGame(ttt.Player("Ann", "X"), ttt.Player("Bob", "O"), rows=4, cols=4, win_length=3)
+    with pytest.raises(ValueError, match="3x3"):
+        ttt.SessionStore().put(game)
+
+
+def test_expire_frees_idle_sessions(ttt):
+    store = ttt.SessionStore()
+    old = store.put(new_game(ttt), now=1000)
+    fresh = store.put(new_game(ttt), now=5000)
+    assert store.expire(max_idle=3000, now=6000) == 1
+    assert store.get(old) is None and store.get(fresh) is not None
+
+
+def test_snapshot_round_trip(ttt, tmp_path):
+    path = str(tmp_path / "sessions.bin")
+    store = ttt.SessionStore()
+    ids = [store.put(new_game(ttt, cells), now=1000) for cells in ((), (4,), (4, 0, 8))]
+    store.remove(ids[1])
+    store.save(path)
+    loaded = ttt.SessionStore.load(path)
+    assert len(loaded) == 2 and loaded.get(ids[1]) is None
+    for session_id in (ids[0], ids[2]):
+        assert same_game(store.get(session_id), loaded.get(session_id))
+    assert loaded.put(new_game(ttt)) & 0xFFFFFF == ids[1] & 0xFFFFFF
+
+
+def test_load_rejects_other_files(ttt, tmp_path):
+    # The solved table's header starts with a similar magic
+    solved = str(tmp_path / "solved.bin")
+    ttt.build_solved_table(solved)
+    with pytest.raises(ValueError, match="not a session snapshot"):
+        ttt.SessionStore.load(solved)
+
+
+@pytest.mark.parametrize("corrupt", ["slots", "players", "truncated"])
+def test_load_checks_declared_sizes(ttt, tmp_path, corrupt):
+    path = str(tmp_path / "sessions.bin")
+    store = ttt.SessionStore()
+    store.put(new_game(ttt, (4,)))
+    store.save(path)
+    with open(path, "rb") as f:
+        data = bytearray(f.read())
+    offset = len(ttt.SESSION_MAGIC)
+    if corrupt == "slots":
+        data[offset:offset + 4] = struct.pack("<I", 1 << 30)
+    elif corrupt == "players":
+        data[offset + 4:offset + 8] = struct.pack("<I", 7)
+    else:
+        data = data[:offset + 6]
+    with open(path, "wb") as f:
+        f.write(data)
+    with pytest.raises(ValueError, match="truncated"):
+        ttt.SessionStore.load(path)